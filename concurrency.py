@@ -0,0 +1,179 @@
+"""
+📈 ADAPTIVE CONCURRENCY - v11.2
+AIMD controller for in-flight fragment / range requests
+- Additive increase while goodput keeps rising
+- Multiplicative decrease on errors, 429/503 or falling throughput
+- Learned windows are remembered per host for the next download
+- Every slot is also a permit from the process-wide host scheduler
+"""
+
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from config import (
+    DYNAMIC_WORKERS, WORKER_ADJUST_THRESHOLD,
+    AIMD_INCREASE, AIMD_DECREASE, AIMD_DROP_RATIO
+)
+from host_scheduler import HostLease, host_of
+
+logger = logging.getLogger(__name__)
+
+# (host, kind) -> last settled window / goodput
+_host_state: Dict[tuple, dict] = {}
+_active: Dict[int, 'AIMDController'] = {}
+
+THROTTLE_STATUSES = (429, 503)
+
+
+class AIMDController:
+    """Per-download adaptive window of in-flight requests"""
+    
+    def __init__(self, url: str, kind: str, initial: int, minimum: int, maximum: int):
+        self.host = host_of(url)
+        self.kind = kind
+        self.minimum = minimum
+        self.maximum = maximum
+        
+        learned = _host_state.get((self.host, kind), {}).get('window')
+        self.window = max(minimum, min(learned or initial, maximum))
+        
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.errors = 0
+        self.throttled = False
+        self.interval_bytes = 0
+        self.interval_start = time.time()
+        self.last_goodput = 0.0
+        self.goodput = 0.0
+        self._condition = asyncio.Condition()
+        self.lease = HostLease(url)
+    
+    def start(self) -> 'AIMDController':
+        """Register as live (shown in /stats)"""
+        _active[id(self)] = self
+        return self
+    
+    async def finish(self):
+        """Unregister, give back the host lease, remember the settled window"""
+        _active.pop(id(self), None)
+        await self.lease.close()
+        _host_state[(self.host, self.kind)] = {
+            'window': self.window,
+            'goodput': self.goodput,
+            'updated': time.time()
+        }
+    
+    @property
+    def over_window(self) -> bool:
+        """True when the window shrank below the requests already running"""
+        return self.in_flight > self.window
+    
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.window)
+            self.in_flight += 1
+        
+        try:
+            await self.lease.acquire()
+        except BaseException:
+            await self._release_window()
+            raise
+        
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+    
+    async def _release_window(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+    
+    async def release(self):
+        await self.lease.release()
+        await self._release_window()
+    
+    async def throttle(self, nbytes: int):
+        """Honour the host bandwidth cap"""
+        await self.lease.throttle(nbytes)
+    
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            await self.release()
+    
+    def record_bytes(self, count: int):
+        self.interval_bytes += count
+        self._maybe_adjust()
+    
+    def record_error(self, status: Optional[int] = None):
+        self.errors += 1
+        if status in THROTTLE_STATUSES:
+            self.throttled = True
+        self._maybe_adjust()
+    
+    def _maybe_adjust(self):
+        now = time.time()
+        elapsed = now - self.interval_start
+        
+        if elapsed < WORKER_ADJUST_THRESHOLD:
+            return
+        
+        self.goodput = self.interval_bytes / elapsed
+        old = self.window
+        
+        if DYNAMIC_WORKERS:
+            if self.throttled or self.errors:
+                self.window = max(self.minimum, int(self.window * AIMD_DECREASE))
+            elif self.last_goodput and self.goodput < self.last_goodput * AIMD_DROP_RATIO:
+                self.window = max(self.minimum, int(self.window * AIMD_DECREASE))
+            elif self.peak_in_flight >= self.window and self.goodput >= self.last_goodput:
+                # Only grow a window that is actually being used
+                self.window = min(self.maximum, self.window + AIMD_INCREASE)
+        
+        if self.window != old:
+            arrow = "📈" if self.window > old else "📉"
+            logger.info(
+                f"{arrow} {self.host} {self.kind}: {old} → {self.window} "
+                f"({self.goodput / 1048576:.1f} MB/s, errors={self.errors})"
+            )
+            asyncio.ensure_future(self._notify())
+        
+        self.last_goodput = self.goodput
+        self.interval_bytes = 0
+        self.interval_start = now
+        self.errors = 0
+        self.throttled = False
+        self.peak_in_flight = self.in_flight
+    
+    async def _notify(self):
+        async with self._condition:
+            self._condition.notify_all()
+
+
+def learned_window(url: str, kind: str, default: int) -> int:
+    """Last settled window for this host (used to seed yt-dlp)"""
+    return _host_state.get((host_of(url), kind), {}).get('window') or default
+
+
+def host_metrics() -> Dict[str, dict]:
+    """Snapshot for /stats: live controllers + remembered host windows"""
+    metrics = {}
+    
+    for (host, kind), state in _host_state.items():
+        metrics[f"{host} [{kind}]"] = {
+            'window': state['window'],
+            'goodput': state['goodput'],
+            'active': 0
+        }
+    
+    for controller in list(_active.values()):
+        key = f"{controller.host} [{controller.kind}]"
+        entry = metrics.setdefault(key, {'window': 0, 'goodput': 0.0, 'active': 0})
+        entry['window'] = controller.window
+        entry['goodput'] = controller.goodput
+        entry['active'] += 1
+    
+    return metrics
@@ -66,23 +66,104 @@ MAX_CONCURRENT_DOWNLOADS = 5  # Parallel downloads
 BUFFER_SIZE = 524288  # 512KB buffer
 HTTP_CHUNK_SIZE = 2097152  # 2MB chunks
 
+# v11.2 - Batch Execution Settings
+# 'serial'   → one item at a time (download → process → upload)
+# 'pipeline' → stages overlap: item N+1 downloads while item N uploads
+# 'workers'  → per-type worker pools, delivery reordered to range order
+BATCH_MODE = os.getenv("BATCH_MODE", "pipeline")
+PIPELINE_QUEUE_SIZE = 2  # Items buffered between stages (bounds disk usage)
+
+# Worker mode limits (MAX_CONCURRENT_DOWNLOADS caps all types together)
+VIDEO_WORKERS = 2
+IMAGE_WORKERS = 5
+DOCUMENT_WORKERS = 4
+REORDER_WINDOW = 20  # Max items fetched ahead of the next one to deliver
+
+# v11.2 - Segmented Range Downloads (direct videos & files)
+RANGE_CONNECTIONS = 8  # Initial parallel byte ranges per file
+RANGE_MIN_CONNECTIONS = 2  # AIMD floor / ceiling for ranges
+RANGE_MAX_CONNECTIONS = 16
+RANGE_MIN_SIZE = 8 * 1024 * 1024  # Smaller files use a single stream
+RANGE_MIN_STEAL = 4 * 1024 * 1024  # Don't split ranges below 2x this
+RANGE_RETRIES = 5  # Retries per range before the file fails
+PROGRESS_REPORT_INTERVAL = 2  # Seconds between progress reports
+RESUME_ATTEMPTS = 4  # Resumed attempts (from the sidecar) before giving up
+RESUME_STATE_SUFFIX = ".state.json"  # Sidecar next to a partial download
+
+# v11.2 - Native Streaming Engines (yt-dlp remains the fallback)
+USE_NATIVE_HLS = True
+USE_NATIVE_DASH = True
+DASH_RANGE_CHUNK = 4 * 1024 * 1024  # SegmentBase files are fetched in ranges of this size
+SEGMENT_CONCURRENCY = 16  # Parallel segment fetches per stream
+SEGMENT_RETRIES = 8  # Retries per segment before falling back
+SEGMENT_BUFFER_SIZE = 64 * 1024 * 1024  # Max bytes fetched ahead of the writer, per stream
+SEGMENT_SIZE_HINT = 2 * 1024 * 1024  # Assumed size of an unranged (HLS/template) segment
+
 # Upload Settings - SUPERCHARGED
-UPLOAD_CHUNK_SIZE = 1048576  # 1MB chunks
+UPLOAD_CHUNK_SIZE = 1048576  # 1MB chunks (clamped to MTProto's 512KB part limit)
+PARALLEL_PART_UPLOADS = 3  # split parts uploaded at once (1 = serial)
+
+# v11.2 - Parallel Chunk Upload Engine (one file over several media-DC connections)
+MAX_UPLOAD_PART_SIZE = 524288  # MTProto upload.saveBigFilePart limit
+BIG_FILE_THRESHOLD = 10 * 1024 * 1024  # smaller files use pyrogram's single stream
+UPLOAD_SESSIONS = 4
+UPLOAD_WORKERS_PER_SESSION = 2
+UPLOAD_PART_RETRIES = 5
+UPLOAD_RESUME_TTL = 3600  # seconds a partial upload's parts are reused on retry
 MAX_RETRIES = 25
 FRAGMENT_RETRIES = 25
 CONNECTION_TIMEOUT = 3600  # 60 minutes
 
-# Advanced Speed Settings
+# Advanced Speed Settings - v11.2 live AIMD control
 DYNAMIC_WORKERS = True
 MIN_WORKERS = 8
 MAX_WORKERS = 32
-WORKER_ADJUST_THRESHOLD = 5
+WORKER_ADJUST_THRESHOLD = 5  # Seconds per AIMD evaluation
+AIMD_INCREASE = 2  # Workers added while goodput rises
+AIMD_DECREASE = 0.5  # Window multiplier on errors / 429 / throughput drop
+AIMD_DROP_RATIO = 0.7  # Goodput below this share of the last interval = drop
 
 # Connection Pool Settings
 CONNECTION_POOL_SIZE = 100
 CONNECTION_POOL_PER_HOST = 50
 DNS_CACHE_TTL = 600
 
+# v11.2 - Global Host Scheduler (shared by every user's downloads)
+HOST_MAX_CONNECTIONS = 24  # Connection budget per host, split fairly between jobs
+HOST_CONNECTION_LIMITS = {}  # Per-host overrides: {"cdn.example.com": 8}
+HOST_BANDWIDTH_LIMIT = 0  # Bytes/s per host, 0 = unlimited
+HOST_BANDWIDTH_LIMITS = {}  # Per-host overrides: {"cdn.example.com": 10 * 1024 * 1024}
+KEEPALIVE_TIMEOUT = 300  # Idle pooled connections kept open (seconds)
+
+# v11.2 - FFmpeg Runner (async subprocesses)
+SUBPROCESS_STDERR_TAIL = 64 * 1024  # Bytes of ffmpeg stderr kept per call
+
+# v11.2 - Transcode Scheduler (CPU-aware encoder pool)
+TRANSCODE_SLOTS = 0  # Concurrent encodes, 0 = usable cores // TRANSCODE_THREADS_PER_JOB
+TRANSCODE_THREADS_PER_JOB = 4  # libx264 scales well up to a few threads per encode
+TRANSCODE_RESERVED_CORES = 1  # Cores kept free of encoders for the event loop
+TRANSCODE_NICE = 10  # Niceness added to encoder processes
+
+# v11.2 - Media Probe Cache
+PROBE_CACHE_SIZE = 256  # ffprobe results kept, keyed by (path, size, mtime)
+
+# v11.2 - Transcode-skip Decisions
+SMART_TRANSCODE = True  # False = re-encode whenever height != target (pre-v11.2)
+TRANSCODE_HEIGHT_TOLERANCE = 0.05  # Short side may exceed the target by 5% untouched
+TRANSCODE_BITRATE_HEADROOM = 2.0  # Re-encode only above 2x the quality's bitrate
+
+# v11.2 - Fused Post-processing (encode + thumbnail + parts in one decode)
+FUSED_POSTPROCESS = True
+FUSED_SIZE_MARGIN = 0.9  # Parts are planned from the bitrate cap - keep slack for the muxer
+
+# v11.2 - Send Scheduler (Telegram message limits)
+SEND_GLOBAL_RATE = 25  # messages/s across all chats (Telegram: ~30)
+SEND_GLOBAL_BURST = 30
+SEND_PRIVATE_RATE = 1.0  # messages/s per private chat
+SEND_GROUP_RATE = 20 / 60  # messages/s per group/channel (Telegram: 20/min)
+SEND_CHAT_BURST = 3
+SEND_MAX_RETRIES = 5
+
 # Thumbnail Settings
 THUMBNAIL_TIME = "00:00:05"
 THUMBNAIL_SIZE = "640:360"
@@ -95,7 +176,11 @@ MIN_PART_SIZE = 100  # Minimum 100MB per part
 
 # FFMPEG split method (copy codec - INSTANT splitting)
 USE_FFMPEG_SPLIT = True
-SPLIT_METHOD = 'copy'
+# 'segment' → one pass, cuts at keyframes by cumulative size (fewest parts)
+# 'copy'    → one ffmpeg per equal-duration part
+SPLIT_METHOD = 'segment'
+SPLIT_SIZE_MARGIN = 0.98  # share of SAFE_SPLIT_SIZE the packet bytes may fill
+SPLIT_TIMEOUT_PER_GB = 120  # Stream-copy split timeout, scaled by bytes cut (min 120s)
 
 # Text Overlay Settings
 WATERMARK_ENABLED = True
@@ -109,12 +194,28 @@ WATERMARK_OPACITY = 0.8
 PROGRESS_UPDATE_INTERVAL = 0.5
 UPLOAD_PROGRESS_INTERVAL = 2
 
+# v11.2 - Progress Renderer (one coalescing editor for all progress messages)
+PROGRESS_EDIT_INTERVAL = 4  # Min seconds between edits of the same message
+PROGRESS_MAX_EDITS_PER_MINUTE = 40  # Across every progress message
+PROGRESS_IDLE_EXPIRY = 120  # Forget messages idle this long
+BATCH_DASHBOARD = True  # One live dashboard per batch instead of per-item messages
+DASHBOARD_MAX_ITEMS = 8  # In-flight items listed on the dashboard
+
+# v11.2 - Album Batching
+ALBUM_BATCHING = True  # Send runs of consecutive images as media groups
+ALBUM_SIZE = 10  # Telegram's media group limit
+
 # Session Management
 SESSION_TIMEOUT = 3600  # 1 hour
 
 # Destination Channel Settings
 DESTINATION_STORAGE_FILE = Path("destination_channels.json")
 
+# v11.2 - Telegram file_id Cache (known URLs are re-sent, not re-downloaded)
+USE_MEDIA_CACHE = True
+MEDIA_CACHE_FILE = Path("media_cache.json")
+MEDIA_CACHE_MAX_ENTRIES = 50000
+
 # v11.0 - Compare Mode Settings
 COMPARE_CACHE_DIR = Path("compare_cache")
 COMPARE_CACHE_DIR.mkdir(exist_ok=True)
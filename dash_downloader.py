@@ -0,0 +1,359 @@
+"""
+📡 NATIVE DASH DOWNLOADER - v11.2
+In-process asyncio engine for .mpd manifests
+- SegmentTemplate (+ SegmentTimeline), SegmentList and SegmentBase
+- Representation chosen by QUALITY_SETTINGS height
+- Video and audio adaptation sets fetched concurrently
+- One ffmpeg copy step muxes them into MP4
+Live, multi-period and DRM manifests fall back to yt-dlp
+"""
+
+import os
+import re
+import math
+import asyncio
+import logging
+import xml.etree.ElementTree as ET
+from urllib.parse import urljoin
+from typing import Optional, Dict, List
+from pyrogram.types import Message
+from config import QUALITY_SETTINGS, DASH_RANGE_CHUNK
+from segments import fetch_text, fetch_segments, mux_to_mp4, render_segment_progress
+from range_downloader import probe_range_support
+from utils import format_size
+import send_scheduler
+import progress_renderer
+
+logger = logging.getLogger(__name__)
+
+DURATION_RE = re.compile(
+    r'P(?:(?P<d>[\d.]+)D)?(?:T(?:(?P<h>[\d.]+)H)?(?:(?P<m>[\d.]+)M)?(?:(?P<s>[\d.]+)S)?)?'
+)
+TEMPLATE_RE = re.compile(r'\$(RepresentationID|Number|Time|Bandwidth)(%0(\d+)d)?\$')
+
+
+def _tag(element) -> str:
+    return element.tag.split('}', 1)[-1]
+
+
+def _child(element, name: str):
+    return next((c for c in element if _tag(c) == name), None)
+
+
+def _children(element, name: str) -> list:
+    return [c for c in element if _tag(c) == name]
+
+
+def parse_duration(value: str) -> float:
+    """ISO 8601 duration (PT1H2M3.5S) → seconds"""
+    match = DURATION_RE.fullmatch(value or '')
+    if not match:
+        return 0.0
+    parts = {k: float(v) for k, v in match.groupdict().items() if v}
+    return (
+        parts.get('d', 0) * 86400 + parts.get('h', 0) * 3600
+        + parts.get('m', 0) * 60 + parts.get('s', 0)
+    )
+
+
+def fill_template(template: str, rep_id: str, bandwidth: int, number: int = 0, time: int = 0) -> str:
+    """Expand $RepresentationID$ / $Number%05d$ / $Time$ / $Bandwidth$"""
+    values = {'RepresentationID': rep_id, 'Number': number, 'Time': time, 'Bandwidth': bandwidth}
+    
+    def replace(match):
+        value = values[match.group(1)]
+        if match.group(3) and match.group(1) != 'RepresentationID':
+            return f"{value:0{int(match.group(3))}d}"
+        return str(value)
+    
+    return TEMPLATE_RE.sub(replace, template).replace('$$', '$')
+
+
+def _base_url(base: str, element) -> str:
+    node = _child(element, 'BaseURL')
+    if node is not None and node.text:
+        return urljoin(base, node.text.strip())
+    return base
+
+
+def _merged_attrs(*elements) -> dict:
+    """Inherit attributes down AdaptationSet → Representation"""
+    merged = {}
+    for element in elements:
+        if element is not None:
+            merged.update(element.attrib)
+    return merged
+
+
+def parse_mpd(text: str, manifest_url: str) -> Optional[dict]:
+    """
+    Returns {'video': [reps], 'audio': [reps], 'duration': seconds}
+    Each rep: {'id', 'height', 'bandwidth', 'base', 'template', 'timeline',
+               'segment_list'}
+    None when the manifest is live, multi-period, DRM-protected or not an MPD
+    """
+    root = ET.fromstring(text)
+    
+    if _tag(root) != 'MPD':
+        return None
+    
+    if root.get('type') == 'dynamic':
+        logger.info("📡 Live DASH manifest - leaving it to yt-dlp")
+        return None
+    
+    periods = _children(root, 'Period')
+    if len(periods) != 1:
+        logger.info(f"📡 {len(periods)} periods - leaving it to yt-dlp")
+        return None
+    
+    period = periods[0]
+    duration = parse_duration(period.get('duration') or root.get('mediaPresentationDuration'))
+    base = _base_url(_base_url(manifest_url, root), period)
+    
+    result = {'video': [], 'audio': [], 'duration': duration}
+    
+    for adaptation in _children(period, 'AdaptationSet'):
+        if _child(adaptation, 'ContentProtection') is not None:
+            logger.info("📡 DRM-protected adaptation set - leaving it to yt-dlp")
+            return None
+        
+        adaptation_base = _base_url(base, adaptation)
+        
+        for rep in _children(adaptation, 'Representation'):
+            if _child(rep, 'ContentProtection') is not None:
+                return None
+            
+            attrs = _merged_attrs(adaptation, rep)
+            mime = attrs.get('mimeType', '')
+            kind = attrs.get('contentType') or mime.split('/')[0]
+            if kind not in ('video', 'audio'):
+                continue
+            
+            template_nodes = [
+                _child(adaptation, 'SegmentTemplate'), _child(rep, 'SegmentTemplate')
+            ]
+            template = _merged_attrs(*template_nodes) if any(n is not None for n in template_nodes) else None
+            
+            timeline = None
+            for node in reversed(template_nodes):
+                if node is not None and _child(node, 'SegmentTimeline') is not None:
+                    timeline = [
+                        {k: int(v) for k, v in s.attrib.items() if k in ('t', 'd', 'r')}
+                        for s in _children(_child(node, 'SegmentTimeline'), 'S')
+                    ]
+                    break
+            
+            segment_list = _child(rep, 'SegmentList')
+            if segment_list is None:
+                segment_list = _child(adaptation, 'SegmentList')
+            
+            result[kind].append({
+                'id': attrs.get('id', ''),
+                'height': int(attrs.get('height', 0) or 0),
+                'bandwidth': int(attrs.get('bandwidth', 0) or 0),
+                'base': _base_url(adaptation_base, rep),
+                'template': template,
+                'timeline': timeline,
+                'segment_list': segment_list
+            })
+    
+    return result
+
+
+def _parse_range(value: Optional[str]) -> Optional[tuple]:
+    if not value:
+        return None
+    start, _, end = value.partition('-')
+    return (int(start), int(end))
+
+
+async def build_segments(rep: dict, duration: float, headers: Dict[str, str]) -> List[dict]:
+    """Turn a representation into an ordered [{'url', 'range'}] list"""
+    rep_id, bandwidth, base = rep['id'], rep['bandwidth'], rep['base']
+    segments = []
+    
+    if rep['template']:
+        template = rep['template']
+        timescale = int(template.get('timescale', 1))
+        number = int(template.get('startNumber', 1))
+        media = template.get('media', '')
+        
+        if template.get('initialization'):
+            segments.append({
+                'url': urljoin(base, fill_template(template['initialization'], rep_id, bandwidth)),
+                'range': None
+            })
+        
+        if rep['timeline']:
+            time = 0
+            for entry in rep['timeline']:
+                time = entry.get('t', time)
+                repeat = entry.get('r', 0)
+                if repeat < 0:
+                    # r=-1 repeats until the end of the period
+                    end = duration * timescale
+                    repeat = max(math.ceil((end - time) / entry['d']) - 1, 0)
+                for _ in range(repeat + 1):
+                    segments.append({
+                        'url': urljoin(base, fill_template(media, rep_id, bandwidth, number, time)),
+                        'range': None
+                    })
+                    time += entry['d']
+                    number += 1
+        else:
+            seg_duration = int(template.get('duration', 0))
+            if not seg_duration or not duration:
+                return []
+            count = math.ceil(duration * timescale / seg_duration)
+            for i in range(count):
+                segments.append({
+                    'url': urljoin(base, fill_template(
+                        media, rep_id, bandwidth, number + i, i * seg_duration
+                    )),
+                    'range': None
+                })
+        
+        return segments
+    
+    if rep['segment_list'] is not None:
+        seg_list = rep['segment_list']
+        init = _child(seg_list, 'Initialization')
+        if init is not None:
+            segments.append({
+                'url': urljoin(base, init.get('sourceURL', '')),
+                'range': _parse_range(init.get('range'))
+            })
+        for seg in _children(seg_list, 'SegmentURL'):
+            segments.append({
+                'url': urljoin(base, seg.get('media', '')),
+                'range': _parse_range(seg.get('mediaRange'))
+            })
+        return segments
+    
+    # SegmentBase / plain BaseURL: one file, fetched as parallel byte ranges
+    remote = await probe_range_support(base, headers)
+    if not remote:
+        # One unranged GET would sit in memory whole - leave it to yt-dlp
+        logger.info("📡 DASH: BaseURL without Range support")
+        return []
+    
+    total = remote['total']
+    return [
+        {'url': base, 'range': (start, min(start + DASH_RANGE_CHUNK, total) - 1)}
+        for start in range(0, total, DASH_RANGE_CHUNK)
+    ]
+
+
+def select_video(reps: List[dict], quality: str) -> Optional[dict]:
+    """Best representation not above the requested height (lowest otherwise)"""
+    if not reps:
+        return None
+    
+    target = QUALITY_SETTINGS.get(quality, {}).get('height', 720)
+    fitting = [r for r in reps if r['height'] and r['height'] <= target]
+    if fitting:
+        return max(fitting, key=lambda r: (r['height'], r['bandwidth']))
+    
+    sized = [r for r in reps if r['height']]
+    if sized:
+        return min(sized, key=lambda r: (r['height'], -r['bandwidth']))
+    
+    return max(reps, key=lambda r: r['bandwidth'])
+
+
+async def download_dash(
+    url: str,
+    quality: str,
+    output_base: str,
+    progress_msg: Message,
+    user_id: int,
+    active_downloads: Dict[int, bool]
+) -> Optional[str]:
+    """
+    🚀 Native DASH download
+    Returns output_base + '.mp4' on success, None to fall back to yt-dlp
+    """
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        'Accept': '*/*',
+        'Connection': 'keep-alive',
+    }
+    
+    downloaded = []
+    
+    try:
+        text, final_url = await fetch_text(url, headers)
+        manifest = parse_mpd(text, final_url)
+        
+        if not manifest:
+            return None
+        
+        video = select_video(manifest['video'], quality)
+        audio = max(manifest['audio'], key=lambda r: r['bandwidth'], default=None)
+        
+        if not video and not audio:
+            return None
+        
+        logger.info(
+            f"📡 DASH: video {video['height'] if video else '-'}p, "
+            f"audio {audio['bandwidth'] // 1000 if audio else '-'}kbps"
+        )
+        
+        async def fetch_rep(rep: dict, suffix: str, label: str) -> Optional[str]:
+            segments = await build_segments(rep, manifest['duration'], headers)
+            if not segments:
+                return None
+            
+            path = output_base + suffix
+            
+            async def report(done: int, total: int, size: int, speed: float, workers: int):
+                progress_renderer.update(
+                    progress_msg,
+                    render_segment_progress(
+                        f"📡 **DASH DOWNLOAD** {label}", done, total, size, speed, workers
+                    )
+                )
+            
+            ok = await fetch_segments(
+                segments, path, headers, user_id, active_downloads, progress=report
+            )
+            if ok:
+                return path
+            
+            # Failed/stopped - the caller only cleans up successful reps
+            if os.path.exists(path):
+                os.remove(path)
+            return None
+        
+        jobs = []
+        if video:
+            jobs.append(fetch_rep(video, '.video.mp4', ''))
+        if audio:
+            jobs.append(fetch_rep(audio, '.audio.mp4', '(audio)'))
+        
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+        downloaded = [r for r in results if isinstance(r, str)]
+        
+        if len(downloaded) != len(jobs):
+            return None
+        
+        await send_scheduler.edit(progress_msg, "📡 Muxing audio + video...")
+        output_path = output_base + '.mp4'
+        
+        if not await mux_to_mp4(downloaded, output_path):
+            return None
+        
+        logger.info(f"✅ Native DASH complete: {format_size(os.path.getsize(output_path))}")
+        return output_path
+        
+    except Exception as e:
+        logger.error(f"Native DASH error: {e}")
+        return None
+        
+    finally:
+        for path in downloaded:
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError:
+                pass
@@ -1,65 +1,102 @@
 import os
-import ssl
 import asyncio
-import aiohttp
 import aiofiles
 import yt_dlp
 import logging
 import time
-import subprocess
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, AsyncIterator
 from pyrogram.types import Message
 from config import (
     DOWNLOAD_DIR, CHUNK_SIZE, CONCURRENT_FRAGMENTS, 
     MAX_RETRIES, FRAGMENT_RETRIES, CONNECTION_TIMEOUT,
-    HTTP_CHUNK_SIZE, BUFFER_SIZE, DYNAMIC_WORKERS,
-    MIN_WORKERS, MAX_WORKERS, WORKER_ADJUST_THRESHOLD,
-    CONNECTION_POOL_SIZE, CONNECTION_POOL_PER_HOST, 
-    DNS_CACHE_TTL, QUALITY_SETTINGS, SAFE_SPLIT_SIZE
+    HTTP_CHUNK_SIZE, BUFFER_SIZE, MIN_WORKERS, MAX_WORKERS,
+    QUALITY_SETTINGS, SAFE_SPLIT_SIZE, RANGE_MIN_SIZE, RESUME_ATTEMPTS,
+    USE_NATIVE_HLS, USE_NATIVE_DASH, SPLIT_METHOD, SPLIT_SIZE_MARGIN,
+    SPLIT_TIMEOUT_PER_GB
 )
 from utils import format_size, format_time, create_progress_bar
+from http_session import get_http_session
+from range_downloader import (
+    probe_range_support, remote_from_headers, download_ranges,
+    resume_request, remove_state, discard_state
+)
+from hls_downloader import download_hls
+from dash_downloader import download_dash
+from concurrency import learned_window
+from host_scheduler import HostLease, host_permit
+import send_scheduler
+import progress_renderer
+from ffmpeg_runner import run_process, ProcessTimeout
+from video_processor import probe
 
 logger = logging.getLogger(__name__)
 
 
-class DynamicWorkerManager:
-    """Dynamic worker adjustment for optimal speed"""
+def render_download_progress(header: str, downloaded: int, total: int, speed: float, extra: str = "") -> str:
+    """Build the standard download progress text"""
+    percent = (downloaded / total * 100) if total > 0 else 0
+    eta = int((total - downloaded) / speed) if speed > 0 else 0
+    
+    return (
+        f"{header}\n\n"
+        f"{create_progress_bar(percent)}\n\n"
+        f"📦 {format_size(downloaded)} / {format_size(total)}\n"
+        f"🚀 {format_size(int(speed))}/s\n"
+        f"⏱️ {format_time(eta)}"
+        f"{extra}"
+    )
+
+
+async def try_segmented_download(
+    url: str,
+    output_path: str,
+    headers: Dict[str, str],
+    header: str,
+    progress_msg: Message,
+    user_id: int,
+    active_downloads: Dict[int, bool],
+    remote: Optional[dict] = None
+) -> Optional[str]:
+    """
+    ⚡ v11.2 - Multi-connection download when the server supports Range
+    Failed attempts resume from the .state.json sidecar instead of byte 0
+    Returns None when ranges are unsupported so callers fall back to one stream
+    remote: range info the caller already has (skips the probe)
+    """
+    if remote is None:
+        remote = await probe_range_support(url, headers)
     
-    def __init__(self):
-        self.current_workers = CONCURRENT_FRAGMENTS
-        self.last_speed = 0
-        self.last_adjust = time.time()
-        self.speed_history = []
+    if not remote or remote['total'] < RANGE_MIN_SIZE:
+        return None
     
-    def adjust_workers(self, current_speed: float):
-        """Adjust workers based on speed"""
-        if not DYNAMIC_WORKERS:
-            return self.current_workers
-        
-        now = time.time()
-        if now - self.last_adjust < WORKER_ADJUST_THRESHOLD:
-            return self.current_workers
-        
-        self.speed_history.append(current_speed)
-        if len(self.speed_history) > 5:
-            self.speed_history.pop(0)
+    async def report(downloaded: int, total: int, speed: float, connections: int):
+        progress_renderer.update(
+            progress_msg,
+            render_download_progress(
+                header, downloaded, total, speed,
+                f"\n💪 Connections: {connections}"
+            )
+        )
+    
+    for attempt in range(1, RESUME_ATTEMPTS + 1):
+        result = await download_ranges(
+            url, output_path, remote, headers,
+            user_id, active_downloads, report
+        )
         
-        avg_speed = sum(self.speed_history) / len(self.speed_history)
+        if result or not active_downloads.get(user_id, False):
+            return result
         
-        if avg_speed > self.last_speed * 1.2 and self.current_workers < MAX_WORKERS:
-            self.current_workers = min(self.current_workers + 4, MAX_WORKERS)
-            logger.info(f"📈 Workers → {self.current_workers}")
-        elif avg_speed < self.last_speed * 0.8 and self.current_workers > MIN_WORKERS:
-            self.current_workers = max(self.current_workers - 2, MIN_WORKERS)
-            logger.info(f"📉 Workers → {self.current_workers}")
+        logger.warning(f"⚠️ Segmented attempt {attempt}/{RESUME_ATTEMPTS} failed, resuming...")
+        await asyncio.sleep(min(5 * attempt, 30))
         
-        self.last_speed = avg_speed
-        self.last_adjust = now
-        return self.current_workers
-
-
-worker_manager = DynamicWorkerManager()
+        # The remote file may have changed - a fresh probe keeps the sidecar honest
+        remote = await probe_range_support(url, headers) or remote
+    
+    # Partial file + sidecar stay - the single stream picks up from the first gap
+    logger.warning("⚠️ Segmented download failed, falling back to single stream")
+    return None
 
 
 def is_direct_video_url(url: str) -> bool:
@@ -111,95 +148,135 @@ async def download_direct_video(
     try:
         logger.info(f"🎬 Direct video download: {url}")
         
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        ssl_context.set_ciphers('DEFAULT@SECLEVEL=1')
-        
-        connector = aiohttp.TCPConnector(
-            ssl=ssl_context,
-            limit=CONNECTION_POOL_SIZE,
-            limit_per_host=CONNECTION_POOL_PER_HOST,
-            ttl_dns_cache=DNS_CACHE_TTL,
-            force_close=False,
-            enable_cleanup_closed=True,
-            keepalive_timeout=300,
-        )
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept': '*/*',
+            'Accept-Encoding': 'gzip, deflate, br',
+            'Connection': 'keep-alive',
+            'Referer': url.split('?')[0],
+        }
+        header = "🎬 **DIRECT VIDEO DOWNLOAD**"
+        
+        remote = await probe_range_support(url, headers)
         
-        timeout = aiohttp.ClientTimeout(
-            total=CONNECTION_TIMEOUT,
-            connect=30,
-            sock_read=60
+        if remote:
+            result = await try_segmented_download(
+                url, output_path, headers, header,
+                progress_msg, user_id, active_downloads, remote
+            )
+            if result and os.path.getsize(result) > 10240:
+                return result
+            if not active_downloads.get(user_id, False):
+                return None
+        
+        # ⚡ SPEED FIX: Update every 5MB, 512KB chunks for direct downloads
+        result = await stream_download(
+            url, output_path, headers, header, progress_msg, user_id, active_downloads,
+            remote, update_threshold=5 * 1024 * 1024, chunk_size=512 * 1024, min_size=10240
         )
         
-        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Accept': '*/*',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'Referer': url.split('?')[0],
-            }
+        if result:
+            logger.info(f"✅ Direct video downloaded: {format_size(os.path.getsize(result))}")
+        return result
             
-            async with session.get(url, headers=headers) as response:
-                if response.status != 200:
-                    logger.error(f"HTTP {response.status} for direct video")
-                    return None
-                
-                total_size = int(response.headers.get('content-length', 0))
-                downloaded = 0
-                start_time = time.time()
-                last_update = 0
-                
-                # ⚡ SPEED FIX: Update every 5MB instead of 512KB!
-                update_threshold = 5 * 1024 * 1024  # 5MB (was 512KB)
-                
-                # ⚡ SPEED FIX: Larger chunks for direct downloads
-                chunk_size = 512 * 1024  # 512KB chunks (was 128KB)
-                
-                async with aiofiles.open(output_path, 'wb', buffering=BUFFER_SIZE) as f:
-                    async for chunk in response.content.iter_chunked(chunk_size):
-                        if not active_downloads.get(user_id, False):
-                            if os.path.exists(output_path):
-                                os.remove(output_path)
-                            return None
-                        
-                        await f.write(chunk)
-                        downloaded += len(chunk)
-                        
-                        # ⚡ SPEED FIX: Less frequent updates
-                        if downloaded - last_update >= update_threshold:
-                            last_update = downloaded
-                            try:
-                                percent = (downloaded / total_size * 100) if total_size > 0 else 0
-                                elapsed = time.time() - start_time
-                                speed = downloaded / elapsed if elapsed > 0 else 0
-                                eta = int((total_size - downloaded) / speed) if speed > 0 else 0
-                                bar = create_progress_bar(percent)
-                                
-                                # ⚡ Only update if significant change (5% or more)
-                                if percent % 5 < 1:  # Update at 5%, 10%, 15%, etc.
-                                    await progress_msg.edit_text(
-                                        f"🎬 **DIRECT VIDEO DOWNLOAD**\n\n"
-                                        f"{bar}\n\n"
-                                        f"📦 {format_size(downloaded)} / {format_size(total_size)}\n"
-                                        f"🚀 {format_size(int(speed))}/s\n"
-                                        f"⏱️ {format_time(eta)}"
-                                    )
-                            except:
-                                pass
-                
-                if os.path.exists(output_path) and os.path.getsize(output_path) > 10240:
-                    logger.info(f"✅ Direct video downloaded: {format_size(os.path.getsize(output_path))}")
-                    return output_path
-                
-                return None
-                
     except Exception as e:
         logger.error(f"Direct video download error: {e}", exc_info=True)
         return None
 
 
+async def stream_response_to_file(
+    response,
+    filepath: Path,
+    lease: HostLease,
+    header: str,
+    progress_msg: Message,
+    user_id: int,
+    active_downloads: Dict[int, bool],
+    offset: int = 0,
+    update_threshold: int = 2 * 1024 * 1024,
+    chunk_size: int = 256 * 1024,
+    min_size: int = 1024
+) -> Optional[str]:
+    """
+    Single-stream body into filepath
+    offset: response is a 206 continuing an existing partial file from there
+    """
+    total_size = offset + int(response.headers.get('content-length', 0))
+    downloaded = offset
+    start_time = time.time()
+    last_update = offset
+    
+    async with aiofiles.open(filepath, 'r+b' if offset else 'wb', buffering=BUFFER_SIZE) as f:
+        await f.seek(offset)
+        
+        async for chunk in response.content.iter_chunked(chunk_size):
+            if not active_downloads.get(user_id, False):
+                discard_state(str(filepath))
+                return None
+            
+            await f.write(chunk)
+            downloaded += len(chunk)
+            await lease.throttle(len(chunk))
+            
+            # ⚡ SPEED FIX: Less frequent updates
+            if downloaded - last_update >= update_threshold:
+                last_update = downloaded
+                try:
+                    elapsed = time.time() - start_time
+                    speed = (downloaded - offset) / elapsed if elapsed > 0 else 0
+                    
+                    # ⚡ progress_renderer coalesces and rate-limits the edits
+                    progress_renderer.update(
+                        progress_msg,
+                        render_download_progress(header, downloaded, total_size, speed)
+                    )
+                except:
+                    pass
+    
+    if filepath.exists() and filepath.stat().st_size > min_size:
+        return str(filepath)
+    return None
+
+
+async def stream_download(
+    url: str,
+    output_path: str,
+    headers: Dict[str, str],
+    header: str,
+    progress_msg: Message,
+    user_id: int,
+    active_downloads: Dict[int, bool],
+    remote: Optional[dict] = None,
+    **stream_options
+) -> Optional[str]:
+    """
+    Single-stream fallback for the segmented engine
+    Continues a failed segmented attempt from the first gap in its sidecar
+    (If-Range: a changed file comes back whole as a plain 200)
+    """
+    offset, request_headers = resume_request(output_path, url, remote, headers) if remote else (0, headers)
+    session = await get_http_session()
+    
+    async with host_permit(url) as lease, session.get(url, headers=request_headers) as response:
+        if response.status == 200:
+            offset = 0
+        elif response.status != 206 or not offset:
+            logger.error(f"HTTP {response.status}")
+            return None
+        
+        if offset:
+            logger.info(f"🔄 Single stream resuming at {format_size(offset)}")
+        
+        result = await stream_response_to_file(
+            response, Path(output_path), lease, header,
+            progress_msg, user_id, active_downloads, offset, **stream_options
+        )
+    
+    if result:
+        remove_state(output_path)
+    return result
+
+
 async def download_file(
     url: str, 
     filename: str, 
@@ -209,91 +286,50 @@ async def download_file(
 ) -> Optional[str]:
     """
     ⚡ ULTRA-FAST file downloader - SPEED OPTIMIZED!
+    🆕 v11.2 - the first GET decides: small files (most images/documents)
+    stream straight away, big ranged files switch to segmented download
+    using that response's headers - no separate Range probe
     """
     filepath = DOWNLOAD_DIR / filename
+    header = "⚡ **DOWNLOADING**"
     
     try:
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        ssl_context.set_ciphers('DEFAULT@SECLEVEL=1')
-        
-        connector = aiohttp.TCPConnector(
-            ssl=ssl_context,
-            limit=CONNECTION_POOL_SIZE,
-            limit_per_host=CONNECTION_POOL_PER_HOST,
-            ttl_dns_cache=DNS_CACHE_TTL,
-            force_close=False,
-            enable_cleanup_closed=True,
-            keepalive_timeout=300,
-        )
+        session = await get_http_session()
         
-        timeout = aiohttp.ClientTimeout(
-            total=CONNECTION_TIMEOUT,
-            connect=30,
-            sock_read=60
-        )
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept': '*/*',
+            'Accept-Encoding': 'gzip, deflate, br',
+            'Connection': 'keep-alive',
+        }
         
-        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Accept': '*/*',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-            }
-            
-            async with session.get(url, headers=headers) as response:
-                if response.status != 200:
-                    logger.error(f"HTTP {response.status}")
-                    return None
-                
-                total_size = int(response.headers.get('content-length', 0))
-                downloaded = 0
-                start_time = time.time()
-                last_update = 0
-                
-                # ⚡ SPEED FIX: Update every 2MB
-                update_threshold = 2 * 1024 * 1024  # 2MB
-                
-                # ⚡ SPEED FIX: Larger chunks
-                chunk_size = 256 * 1024  # 256KB
-                
-                async with aiofiles.open(filepath, 'wb', buffering=BUFFER_SIZE) as f:
-                    async for chunk in response.content.iter_chunked(chunk_size):
-                        if not active_downloads.get(user_id, False):
-                            if filepath.exists():
-                                os.remove(filepath)
-                            return None
-                        
-                        await f.write(chunk)
-                        downloaded += len(chunk)
-                        
-                        # ⚡ SPEED FIX: Less frequent updates
-                        if downloaded - last_update >= update_threshold:
-                            last_update = downloaded
-                            try:
-                                percent = (downloaded / total_size * 100) if total_size > 0 else 0
-                                elapsed = time.time() - start_time
-                                speed = downloaded / elapsed if elapsed > 0 else 0
-                                eta = int((total_size - downloaded) / speed) if speed > 0 else 0
-                                bar = create_progress_bar(percent)
-                                
-                                # ⚡ Only update at 10% intervals
-                                if percent % 10 < 2:
-                                    await progress_msg.edit_text(
-                                        f"⚡ **DOWNLOADING**\n\n"
-                                        f"{bar}\n\n"
-                                        f"📦 {format_size(downloaded)} / {format_size(total_size)}\n"
-                                        f"🚀 {format_size(int(speed))}/s\n"
-                                        f"⏱️ {format_time(eta)}"
-                                    )
-                            except:
-                                pass
-                
-                if filepath.exists() and filepath.stat().st_size > 1024:
-                    return str(filepath)
+        async with host_permit(url) as lease, session.get(url, headers=headers) as response:
+            if response.status != 200:
+                logger.error(f"HTTP {response.status}")
                 return None
-                
+            
+            remote = remote_from_headers(response.headers)
+            
+            if not remote or remote['total'] < RANGE_MIN_SIZE:
+                return await stream_response_to_file(
+                    response, filepath, lease, header, progress_msg, user_id, active_downloads
+                )
+        
+        # Big + ranged: this GET is dropped unread, segments take over
+        result = await try_segmented_download(
+            url, str(filepath), headers, header,
+            progress_msg, user_id, active_downloads, remote
+        )
+        if result and os.path.getsize(result) > 1024:
+            return result
+        if not active_downloads.get(user_id, False):
+            return None
+        
+        return await stream_download(
+            url, str(filepath), headers, header,
+            progress_msg, user_id, active_downloads, remote
+        )
+            
     except Exception as e:
         logger.error(f"Download error: {e}")
         return None
@@ -305,7 +341,9 @@ def download_video_sync(
     output_path: str, 
     user_id: int,
     active_downloads: Dict[int, bool],
-    download_progress: Dict[int, dict]
+    download_progress: Dict[int, dict],
+    fragment_workers: int = CONCURRENT_FRAGMENTS,
+    rate_limit: int = 0
 ) -> bool:
     """
     🚀 v11.1 ENHANCED - Universal video downloader
@@ -325,7 +363,6 @@ def download_video_sync(
                     
                     if total > 0:
                         percent = (downloaded / total) * 100
-                        workers = worker_manager.adjust_workers(speed)
                         
                         download_progress[user_id] = {
                             'percent': percent,
@@ -333,13 +370,13 @@ def download_video_sync(
                             'total': total,
                             'speed': speed,
                             'eta': eta,
-                            'workers': workers
+                            'workers': current_workers
                         }
                 except:
                     pass
         
         quality_height = QUALITY_SETTINGS.get(quality, {}).get('height', 720)
-        current_workers = worker_manager.current_workers
+        current_workers = fragment_workers
         
         # ⚡ SPEED OPTIMIZED yt-dlp settings
         ydl_opts = {
@@ -390,13 +427,16 @@ def download_video_sync(
             'no_color': True,
         }
         
+        if rate_limit:
+            ydl_opts['ratelimit'] = rate_limit
+        
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             if not active_downloads.get(user_id, False):
                 return False
             
             logger.info(f"🚀 Downloading video: {url} at {quality}")
             ydl.download([url])
-            logger.info(f"✅ Download complete")
+            logger.info("✅ Download complete")
             return True
             
     except Exception as e:
@@ -410,103 +450,330 @@ def download_video_sync(
         return False
 
 
-async def fast_split_video(video_path: str, max_size_mb: int = SAFE_SPLIT_SIZE) -> List[str]:
+async def run_ytdlp(
+    url: str,
+    quality: str,
+    output_path: str,
+    user_id: int,
+    active_downloads: Dict[int, bool],
+    download_progress: Dict[int, dict]
+) -> bool:
     """
-    ⚡ ULTRA-FAST split using ffmpeg -c copy
-    Splits in SECONDS, not minutes!
+    ⚡ v11.2 - yt-dlp in the executor, inside the host scheduler budget
+    yt-dlp fixes fragment concurrency up front, so it is seeded with the
+    window the native engines last settled on for this host, capped by
+    this job's fair share, and holds that many host permits while it runs
     """
+    lease = HostLease(url)
+    held = 0
+    
     try:
-        file_size = os.path.getsize(video_path)
-        file_size_mb = file_size / (1024 * 1024)
-        
-        if file_size_mb <= max_size_mb:
-            logger.info(f"✅ File {file_size_mb:.1f}MB - No split needed")
-            return [video_path]
-        
-        logger.info(f"🔪 Fast-splitting {file_size_mb:.1f}MB file...")
-        start_time = time.time()
-        
-        # Get duration using ffprobe (fast)
-        probe_cmd = [
-            'ffprobe', '-v', 'error',
-            '-show_entries', 'format=duration',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            video_path
-        ]
-        
-        result = subprocess.run(probe_cmd, capture_output=True, text=True, timeout=10)
+        wanted = max(MIN_WORKERS, min(
+            learned_window(url, 'fragments', CONCURRENT_FRAGMENTS), MAX_WORKERS
+        ))
+        
+        await lease.acquire()
+        held = 1
+        while held < wanted and lease.try_acquire():
+            held += 1
+        
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None,
+            download_video_sync,
+            url, quality, output_path, user_id, active_downloads,
+            download_progress, held, lease.rate_share()
+        )
+    finally:
+        for _ in range(held):
+            await lease.release()
+        await lease.close()
+
+
+def plan_keyframe_cuts(keyframes: List[tuple], total_bytes: int, budget: int) -> List[float]:
+    """
+    Greedy cut plan: each part runs to the last keyframe before its
+    cumulative byte count would exceed the budget - fewest parts that fit
+    keyframes: [(pts_time, bytes_before_keyframe)] in file order
+    """
+    cuts = []
+    start = 0
+    previous = None
+    
+    for pts, offset in keyframes + [(None, total_bytes)]:
+        if offset - start > budget and previous and previous[1] > start:
+            cuts.append(previous[0])
+            start = previous[1]
+        if pts is not None:
+            previous = (pts, offset)
+    
+    return cuts
+
+
+async def probe_keyframe_index(video_path: str):
+    """
+    Keyframe index from the shared (cached) probe
+    Returns ([(pts_time, bytes_before_keyframe)], total_packet_bytes)
+    Times are relative to format.start_time - the timeline -segment_times
+    and -ss work in (TS/HLS remuxes often start around 1.4s)
+    """
+    data = await probe(video_path, keyframes=True)
+    
+    if data is None:
+        return [], 0
+    
+    start_time = float(data.get('format', {}).get('start_time', 0) or 0)
+    keyframes = [(pts - start_time, offset) for pts, offset in data['keyframes']]
+    
+    return keyframes, data['packet_bytes']
+
+
+async def plan_segment_split(video_path: str, max_size_bytes: int) -> Optional[tuple]:
+    """
+    🆕 v11.2 - Keyframe/byte-aware cut plan
+    Returns (ffmpeg segment command, part paths, cut times) or None
+    """
+    keyframes, total_bytes = await probe_keyframe_index(video_path)
+    
+    if not keyframes:
+        logger.warning("⚠️ No keyframe index, falling back to duration split")
+        return None
+    
+    # Leave room for container overhead (moov/headers)
+    cuts = plan_keyframe_cuts(keyframes, total_bytes, int(max_size_bytes * SPLIT_SIZE_MARGIN))
+    
+    if not cuts:
+        return None
+    
+    num_parts = len(cuts) + 1
+    name, ext = os.path.splitext(os.path.basename(video_path))
+    pattern = str(DOWNLOAD_DIR / f"{name}_part%03d_of_{num_parts:03d}{ext}")
+    
+    logger.info(f"🔪 Segment split: {num_parts} parts at {', '.join(f'{c:.1f}s' for c in cuts)}")
+    
+    # ONE segment muxer run writes every part (no per-part seek + re-read)
+    cmd = [
+        'ffmpeg', '-y',
+        '-i', video_path,
+        '-c', 'copy',
+        '-f', 'segment',
+        '-segment_times', ','.join(f"{c:.6f}" for c in cuts),
+        '-segment_start_number', '1',
+        '-segment_format_options', 'movflags=+faststart',
+        '-reset_timestamps', '1',
+        '-avoid_negative_ts', 'make_zero',
+        pattern
+    ]
+    
+    return cmd, [pattern % i for i in range(1, num_parts + 1)], cuts
+
+
+def split_timeout(size_bytes: int) -> float:
+    """Stream-copy timeout scaled to the bytes being cut"""
+    return max(120, SPLIT_TIMEOUT_PER_GB * size_bytes / (1024 ** 3))
+
+
+async def iter_segment_split(video_path: str, max_size_bytes: int) -> AsyncIterator[tuple]:
+    """
+    Run the segment muxer and yield (index, total, path) per finished part
+    The muxer closes part N before it opens part N+1, so part N is
+    complete as soon as N+1 appears (the last one when ffmpeg exits)
+    If the muxer dies mid-way, the remaining parts are cut one by one
+    from the planned keyframe cuts (parts already yielded stay valid)
+    """
+    plan = await plan_segment_split(video_path, max_size_bytes)
+    if not plan:
+        return
+    
+    cmd, parts, cuts = plan
+    # Cancelling the runner task kills ffmpeg
+    waiter = asyncio.create_task(run_process(
+        cmd, timeout=split_timeout(os.path.getsize(video_path)), capture_stdout=False
+    ))
+    emitted = 0
+    
+    try:
+        while not waiter.done():
+            while emitted + 1 < len(parts) and os.path.exists(parts[emitted + 1]):
+                emitted += 1
+                logger.info(f"✅ Part {emitted}: {os.path.getsize(parts[emitted - 1]) / (1024 * 1024):.1f}MB")
+                yield emitted, len(parts), parts[emitted - 1]
+            
+            await asyncio.wait({waiter}, timeout=0.5)
         
         try:
-            duration = float(result.stdout.strip())
-        except:
-            duration = 0
-        
-        if duration <= 0:
-            logger.error("Could not get duration, returning original")
-            return [video_path]
-        
-        logger.info(f"Duration: {duration:.1f}s")
-        
-        # Calculate optimal split
-        max_size_bytes = max_size_mb * 1024 * 1024
-        num_parts = int(file_size / max_size_bytes) + 1
-        split_duration = duration / num_parts
-        
-        logger.info(f"Creating {num_parts} parts, {split_duration:.1f}s each")
-        
-        base_name = os.path.basename(video_path)
-        name, ext = os.path.splitext(base_name)
-        
-        parts = []
-        
-        # Split using segment (MUCH FASTER!)
-        for i in range(num_parts):
-            start_pos = i * split_duration
-            part_name = f"{name}_part{i+1:03d}_of_{num_parts:03d}{ext}"
-            part_path = str(DOWNLOAD_DIR / part_name)
-            
-            # 🚀 KEY: Use -c copy for INSTANT split (no re-encode)
-            split_cmd = [
-                'ffmpeg', '-y',
-                '-ss', str(start_pos),
-                '-i', video_path,
-                '-t', str(split_duration),
-                '-c', 'copy',  # COPY = NO ENCODING = FAST!
-                '-avoid_negative_ts', 'make_zero',
-                '-fflags', '+genpts',
-                part_path
-            ]
+            result = waiter.result()
+            failed = result.returncode != 0 or not all(os.path.exists(p) for p in parts[emitted:])
+            error = result.stderr[-300:]
+        except ProcessTimeout as e:
+            failed = True
+            error = str(e)
+        
+        if failed:
+            logger.error(f"❌ Segment split failed after {emitted} parts: {error}")
             
-            result = subprocess.run(split_cmd, capture_output=True, timeout=120)
+            # Resume from the last emitted cut - same keyframe boundaries
+            # (cuts are start_time-relative, like -ss)
+            bounds = [0.0] + cuts + [None]
             
-            if result.returncode == 0 and os.path.exists(part_path):
-                part_size = os.path.getsize(part_path) / (1024 * 1024)
-                parts.append(part_path)
-                logger.info(f"✅ Part {i+1}: {part_size:.1f}MB")
-            else:
-                logger.error(f"❌ Part {i+1} failed")
-        
-        elapsed = time.time() - start_time
-        
-        if parts:
+            for i in range(emitted + 1, len(parts) + 1):
+                start, end = bounds[i - 1], bounds[i]
+                
+                try:
+                    ok = await split_part_by_duration(
+                        video_path, parts[i - 1], start,
+                        end - start if end is not None else None,
+                        split_timeout(max_size_bytes)
+                    )
+                except ProcessTimeout:
+                    ok = False
+                
+                if not ok:
+                    logger.error(f"❌ Part {i} could not be cut - stopping")
+                    for p in parts[i - 1:]:
+                        try:
+                            os.remove(p)
+                        except:
+                            pass
+                    return
+                
+                logger.info(f"✅ Part {i} (resumed): {os.path.getsize(parts[i - 1]) / (1024 * 1024):.1f}MB")
+                yield i, len(parts), parts[i - 1]
+            return
+        
+        for i in range(emitted + 1, len(parts) + 1):
+            size = os.path.getsize(parts[i - 1])
+            logger.info(f"✅ Part {i}: {size / (1024 * 1024):.1f}MB")
+            if size > max_size_bytes:
+                logger.warning(f"⚠️ Part {i} overshoots the limit (GOP larger than the margin)")
+            yield i, len(parts), parts[i - 1]
+    
+    finally:
+        if not waiter.done():
+            waiter.cancel()
             try:
-                os.remove(video_path)
-                logger.info(f"🗑️ Removed original")
-            except:
+                await waiter
+            except asyncio.CancelledError:
                 pass
-            
-            logger.info(f"⚡ Split completed in {elapsed:.1f}s! ({len(parts)} parts)")
-            return parts
-        else:
-            logger.error("No parts created, returning original")
-            return [video_path]
+
+
+async def split_part_by_duration(
+    video_path: str, part_path: str, start_pos: float,
+    split_duration: Optional[float], timeout: float = 120
+) -> bool:
+    """One -c copy cut of a part (split_duration None = to the end)"""
+    # 🚀 KEY: Use -c copy for INSTANT split (no re-encode)
+    split_cmd = ['ffmpeg', '-y', '-ss', str(start_pos), '-i', video_path]
+    
+    if split_duration is not None:
+        split_cmd += ['-t', str(split_duration)]
+    
+    split_cmd += [
+        '-c', 'copy',  # COPY = NO ENCODING = FAST!
+        '-avoid_negative_ts', 'make_zero',
+        '-fflags', '+genpts',
+        part_path
+    ]
+    
+    result = await run_process(split_cmd, timeout=timeout)
+    
+    return result.returncode == 0 and os.path.exists(part_path)
+
+
+async def iter_duration_split(video_path: str, max_size_mb: int) -> AsyncIterator[tuple]:
+    """Equal-duration split, yielding (index, total, path) per finished part"""
+    file_size = os.path.getsize(video_path)
+    
+    # Duration from the shared probe (usually cached by now)
+    data = await probe(video_path)
+    
+    try:
+        duration = float(data['format']['duration'])
+    except:
+        duration = 0
+    
+    if duration <= 0:
+        logger.error("Could not get duration, returning original")
+        return
+    
+    logger.info(f"Duration: {duration:.1f}s")
+    
+    # Calculate optimal split
+    max_size_bytes = max_size_mb * 1024 * 1024
+    num_parts = int(file_size / max_size_bytes) + 1
+    split_duration = duration / num_parts
+    
+    logger.info(f"Creating {num_parts} parts, {split_duration:.1f}s each")
+    
+    name, ext = os.path.splitext(os.path.basename(video_path))
+    
+    for i in range(num_parts):
+        part_path = str(DOWNLOAD_DIR / f"{name}_part{i+1:03d}_of_{num_parts:03d}{ext}")
         
-    except subprocess.TimeoutExpired:
-        logger.error("Split timeout!")
-        return [video_path]
-    except Exception as e:
-        logger.error(f"Split error: {e}", exc_info=True)
-        return [video_path]
+        try:
+            ok = await split_part_by_duration(
+                video_path, part_path, i * split_duration, split_duration,
+                split_timeout(file_size / num_parts)
+            )
+        except ProcessTimeout:
+            ok = False
+        
+        if not ok:
+            # A gap would silently drop part of the video - stop here
+            logger.error(f"❌ Part {i+1} failed")
+            return
+        
+        logger.info(f"✅ Part {i+1}: {os.path.getsize(part_path) / (1024 * 1024):.1f}MB")
+        yield i + 1, num_parts, part_path
+
+
+async def iter_split_video(video_path: str, max_size_mb: int = SAFE_SPLIT_SIZE) -> AsyncIterator[tuple]:
+    """
+    🆕 v11.2 - Streaming splitter
+    Yields (index, total, part_path) as soon as each part is cut, so the
+    upload of part 1 overlaps cutting parts 2..N
+    The original is removed only once every part has been produced
+    """
+    file_size_mb = os.path.getsize(video_path) / (1024 * 1024)
+    
+    if file_size_mb <= max_size_mb:
+        logger.info(f"✅ File {file_size_mb:.1f}MB - No split needed")
+        yield 1, 1, video_path
+        return
+    
+    logger.info(f"🔪 Fast-splitting {file_size_mb:.1f}MB file...")
+    start_time = time.time()
+    produced = 0
+    total = 0
+    
+    if SPLIT_METHOD == 'segment':
+        async for part in iter_segment_split(video_path, max_size_mb * 1024 * 1024):
+            produced += 1
+            total = part[1]
+            yield part
+    
+    # Fall back only if the one-pass split produced nothing
+    if not produced:
+        async for part in iter_duration_split(video_path, max_size_mb):
+            produced += 1
+            total = part[1]
+            yield part
+    
+    if produced and produced < total:
+        # Keep the source - nothing after the last good part may be lost
+        logger.error(f"❌ Split stopped at {produced}/{total} parts - original kept")
+    
+    elif produced:
+        try:
+            os.remove(video_path)
+            logger.info("🗑️ Removed original")
+        except:
+            pass
+        
+        logger.info(f"⚡ Split completed in {time.time() - start_time:.1f}s! ({produced} parts)")
+    else:
+        logger.error("No parts created, returning original")
+        yield 1, 1, video_path
 
 
 async def update_video_progress(
@@ -517,10 +784,8 @@ async def update_video_progress(
 ):
     """
     Update video download progress
-    ⚡ SPEED OPTIMIZED - Less frequent updates
+    ⚡ progress_renderer decides when the message is actually edited
     """
-    last_percent = -1
-    
     while active_downloads.get(user_id, False) and user_id in download_progress:
         try:
             prog = download_progress[user_id]
@@ -529,27 +794,23 @@ async def update_video_progress(
                 break
             
             percent = prog.get('percent', 0)
+            downloaded = prog.get('downloaded', 0)
+            total = prog.get('total', 0)
+            speed = prog.get('speed', 0)
+            eta = prog.get('eta', 0)
+            workers = prog.get('workers', CONCURRENT_FRAGMENTS)
             
-            # ⚡ SPEED FIX: Only update at 5% intervals
-            if int(percent) - last_percent >= 5:  # Was 2%, now 5%
-                last_percent = int(percent)
-                
-                downloaded = prog.get('downloaded', 0)
-                total = prog.get('total', 0)
-                speed = prog.get('speed', 0)
-                eta = prog.get('eta', 0)
-                workers = prog.get('workers', CONCURRENT_FRAGMENTS)
-                
-                bar = create_progress_bar(percent)
-                
-                await progress_msg.edit_text(
-                    f"🎬 **VIDEO DOWNLOAD**\n\n"
-                    f"{bar}\n\n"
-                    f"📦 {format_size(downloaded)} / {format_size(total)}\n"
-                    f"🚀 {format_size(int(speed))}/s\n"
-                    f"⏱️ {format_time(int(eta))}\n"
-                    f"💪 Workers: {workers}"
-                )
+            bar = create_progress_bar(percent)
+            
+            progress_renderer.update(
+                progress_msg,
+                f"🎬 **VIDEO DOWNLOAD**\n\n"
+                f"{bar}\n\n"
+                f"📦 {format_size(downloaded)} / {format_size(total)}\n"
+                f"🚀 {format_size(int(speed))}/s\n"
+                f"⏱️ {format_time(int(eta))}\n"
+                f"💪 Workers: {workers}"
+            )
                 
         except:
             pass
@@ -580,7 +841,7 @@ async def download_video(
         # 🆕 v11.1 - Detect if direct video URL
         if is_direct_video_url(url):
             logger.info("🎬 Detected: DIRECT VIDEO")
-            await progress_msg.edit_text("🎬 Downloading direct video...")
+            await send_scheduler.edit(progress_msg, "🎬 Downloading direct video...")
             
             # Try direct download first
             result = await download_direct_video(
@@ -594,16 +855,13 @@ async def download_video(
             else:
                 # Fallback to yt-dlp for complex URLs
                 logger.info("⚠️ Direct download failed, trying yt-dlp...")
-                await progress_msg.edit_text("🚀 Starting enhanced download...")
+                await send_scheduler.edit(progress_msg, "🚀 Starting enhanced download...")
                 
                 progress_task = asyncio.create_task(
                     update_video_progress(progress_msg, user_id, download_progress, active_downloads)
                 )
                 
-                loop = asyncio.get_event_loop()
-                success = await loop.run_in_executor(
-                    None,
-                    download_video_sync,
+                success = await run_ytdlp(
                     url, quality, output_path, user_id, active_downloads, download_progress
                 )
                 
@@ -625,7 +883,7 @@ async def download_video(
                     if p.exists() and p.stat().st_size > 10240:
                         possible_files.append(p)
                 
-                for file in DOWNLOAD_DIR.glob(f"temp_{user_id}_*"):
+                for file in DOWNLOAD_DIR.glob(f"{temp_name}.*"):
                     if file.is_file() and file.stat().st_size > 10240:
                         possible_files.append(file)
                 
@@ -636,56 +894,75 @@ async def download_video(
                 final_path = max(possible_files, key=lambda p: p.stat().st_size)
         
         else:
-            # Streaming video (M3U8, MPD, etc.) - use yt-dlp
+            # Streaming video (M3U8, MPD, etc.)
             logger.info("📺 Detected: STREAMING VIDEO")
-            await progress_msg.edit_text("🚀 Starting download...")
+            native_path = None
             
-            progress_task = asyncio.create_task(
-                update_video_progress(progress_msg, user_id, download_progress, active_downloads)
-            )
+            # ⚡ v11.2 - Native HLS / DASH engines first, yt-dlp as fallback
+            if USE_NATIVE_HLS and '.m3u8' in url.lower():
+                await send_scheduler.edit(progress_msg, "📺 Starting native HLS download...")
+                native_path = await download_hls(
+                    url, quality, output_path, progress_msg,
+                    user_id, active_downloads
+                )
+            elif USE_NATIVE_DASH and ('.mpd' in url.lower() or '/manifest.' in url.lower()):
+                await send_scheduler.edit(progress_msg, "📡 Starting native DASH download...")
+                native_path = await download_dash(
+                    url, quality, output_path, progress_msg,
+                    user_id, active_downloads
+                )
             
-            loop = asyncio.get_event_loop()
-            success = await loop.run_in_executor(
-                None,
-                download_video_sync,
-                url, quality, output_path, user_id, active_downloads, download_progress
-            )
+            if not active_downloads.get(user_id, False):
+                return None
             
-            if user_id in download_progress and 'error' in download_progress[user_id]:
-                del download_progress[user_id]
+            if native_path:
+                final_path = Path(native_path)
+            else:
+                await send_scheduler.edit(progress_msg, "🚀 Starting download...")
+                
+                progress_task = asyncio.create_task(
+                    update_video_progress(progress_msg, user_id, download_progress, active_downloads)
+                )
+                
+                success = await run_ytdlp(
+                    url, quality, output_path, user_id, active_downloads, download_progress
+                )
+                
+                if user_id in download_progress and 'error' in download_progress[user_id]:
+                    del download_progress[user_id]
+                    try:
+                        progress_task.cancel()
+                    except:
+                        pass
+                    return 'UNSUPPORTED'
+                
+                if user_id in download_progress:
+                    del download_progress[user_id]
+                
                 try:
                     progress_task.cancel()
                 except:
                     pass
-                return 'UNSUPPORTED'
-            
-            if user_id in download_progress:
-                del download_progress[user_id]
-            
-            try:
-                progress_task.cancel()
-            except:
-                pass
-            
-            if not success or not active_downloads.get(user_id, False):
-                return None
-            
-            # Find downloaded file
-            possible_files = []
-            for ext in ['.mp4', '.mkv', '.webm', '.ts']:
-                p = Path(output_path + ext)
-                if p.exists() and p.stat().st_size > 10240:
-                    possible_files.append(p)
-            
-            for file in DOWNLOAD_DIR.glob(f"temp_{user_id}_*"):
-                if file.is_file() and file.stat().st_size > 10240:
-                    possible_files.append(file)
-            
-            if not possible_files:
-                logger.error("No output file found")
-                return None
-            
-            final_path = max(possible_files, key=lambda p: p.stat().st_size)
+                
+                if not success or not active_downloads.get(user_id, False):
+                    return None
+                
+                # Find downloaded file
+                possible_files = []
+                for ext in ['.mp4', '.mkv', '.webm', '.ts']:
+                    p = Path(output_path + ext)
+                    if p.exists() and p.stat().st_size > 10240:
+                        possible_files.append(p)
+                
+                for file in DOWNLOAD_DIR.glob(f"{temp_name}.*"):
+                    if file.is_file() and file.stat().st_size > 10240:
+                        possible_files.append(file)
+                
+                if not possible_files:
+                    logger.error("No output file found")
+                    return None
+                
+                final_path = max(possible_files, key=lambda p: p.stat().st_size)
         
         # Rename to final filename
         final_output = DOWNLOAD_DIR / filename
@@ -694,27 +971,8 @@ async def download_video(
         else:
             final_output = final_path
         
-        # 🎯 SMART CHECK: Only split if actually > 1.9GB
-        file_size_mb = final_output.stat().st_size / (1024 * 1024)
-        
-        if file_size_mb > SAFE_SPLIT_SIZE:
-            logger.info(f"🔪 Large file detected: {file_size_mb:.1f}MB")
-            await progress_msg.edit_text(
-                f"🔪 **Splitting large file...**\n\n"
-                f"Size: {file_size_mb:.1f}MB\n"
-                f"⚡ Using fast split...\n\n"
-                f"This takes only seconds!"
-            )
-            
-            # FAST SPLIT (seconds, not minutes!)
-            parts = await fast_split_video(str(final_output), SAFE_SPLIT_SIZE)
-            
-            if parts and len(parts) > 1:
-                logger.info(f"✅ Split into {len(parts)} parts")
-                await progress_msg.edit_text(f"✅ Split complete! ({len(parts)} parts)")
-                return parts[0]
-        else:
-            logger.info(f"✅ File {file_size_mb:.1f}MB - No split needed")
+        # 🆕 v11.2 - Files > SAFE_SPLIT_SIZE are split by the uploader
+        # (iter_split_video) so cutting and uploading overlap
         
         if final_output.exists() and final_output.stat().st_size > 10240:
             logger.info(f"✅ Video ready: {final_output}")
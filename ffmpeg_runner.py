@@ -0,0 +1,114 @@
+"""
+🎞️ FFMPEG RUNNER - v11.2
+One asyncio subprocess layer for every ffmpeg/ffprobe call
+- create_subprocess_exec, never blocking the event loop
+- Per-call timeout: the child is killed and ProcessTimeout raised
+- stdout captured in full, stderr keeps only its tail
+- Cancelling the awaiting task kills the child (no orphaned encoders)
+"""
+
+import asyncio
+import logging
+from typing import List, NamedTuple, Optional, Union
+from config import SUBPROCESS_STDERR_TAIL
+
+logger = logging.getLogger(__name__)
+
+_running = set()
+_stats = {'runs': 0, 'timeouts': 0, 'cancelled': 0}
+
+
+class ProcessTimeout(Exception):
+    """Child ran past its timeout and has been killed"""
+
+
+class ProcessResult(NamedTuple):
+    returncode: int
+    stdout: Union[str, bytes]
+    stderr: str
+
+
+async def _read_all(stream) -> bytes:
+    if stream is None:
+        return b""
+    return await stream.read()
+
+
+async def _read_tail(stream) -> bytes:
+    """Drain stderr keeping the last SUBPROCESS_STDERR_TAIL bytes"""
+    tail = b""
+    while True:
+        chunk = await stream.read(65536)
+        if not chunk:
+            return tail
+        tail = (tail + chunk)[-SUBPROCESS_STDERR_TAIL:]
+
+
+async def _kill(process):
+    if process.returncode is not None:
+        return
+    try:
+        process.kill()
+    except ProcessLookupError:
+        return
+    await process.wait()
+
+
+async def run_process(
+    cmd: List[str],
+    timeout: Optional[float] = None,
+    text: bool = True,
+    capture_stdout: bool = True
+) -> ProcessResult:
+    """
+    Run cmd to completion without blocking the loop
+    Raises ProcessTimeout after timeout seconds (child killed)
+    """
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.DEVNULL,  # ffmpeg reads keys from stdin otherwise
+        stdout=asyncio.subprocess.PIPE if capture_stdout else asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE
+    )
+    _running.add(process)
+    _stats['runs'] += 1
+    
+    try:
+        stdout, stderr, _ = await asyncio.wait_for(
+            asyncio.gather(
+                _read_all(process.stdout),
+                _read_tail(process.stderr),
+                process.wait()
+            ),
+            timeout
+        )
+        
+    except asyncio.TimeoutError:
+        _stats['timeouts'] += 1
+        await _kill(process)
+        logger.error(f"⏱️ {cmd[0]} killed after {timeout}s")
+        raise ProcessTimeout(f"{cmd[0]} timed out after {timeout}s")
+        
+    except asyncio.CancelledError:
+        _stats['cancelled'] += 1
+        await _kill(process)
+        raise
+        
+    finally:
+        _running.discard(process)
+    
+    stderr = stderr.decode('utf-8', errors='replace')
+    if text:
+        stdout = stdout.decode('utf-8', errors='replace')
+    
+    return ProcessResult(process.returncode, stdout, stderr)
+
+
+def runner_stats() -> dict:
+    """Snapshot for /stats"""
+    return {
+        'running': len(_running),
+        'runs': _stats['runs'],
+        'timeouts': _stats['timeouts'],
+        'cancelled': _stats['cancelled']
+    }
@@ -6,14 +6,30 @@ Comparison & Processing Functions
 import os
 import asyncio
 import logging
+from contextlib import asynccontextmanager, nullcontext
+from typing import Optional
 from pyrogram import Client, filters
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
-from config import DOWNLOAD_DIR, QUALITY_SETTINGS
+from config import (
+    DOWNLOAD_DIR, BATCH_MODE, PIPELINE_QUEUE_SIZE,
+    MAX_CONCURRENT_DOWNLOADS, VIDEO_WORKERS, IMAGE_WORKERS,
+    DOCUMENT_WORKERS, REORDER_WINDOW, USE_MEDIA_CACHE, BATCH_DASHBOARD,
+    ALBUM_BATCHING, ALBUM_SIZE, FUSED_POSTPROCESS, RESUME_STATE_SUFFIX
+)
 from comparator import compare_link_lists
 from utils import sanitize_filename, is_youtube_url, is_unsupported_platform
-from video_processor import get_video_info, generate_thumbnail_with_text, validate_video_file, convert_video_quality
+from video_processor import (
+    get_video_info, generate_thumbnail_with_text, validate_video_file,
+    plan_transcode, apply_transcode_plan, fused_transcode, TRANSCODE_ACTIONS
+)
 from downloader import download_video, download_file
-from uploader import upload_video, upload_photo, upload_document, send_failed_link, send_to_destination
+from uploader import (
+    upload_video, upload_photo, upload_document, send_failed_link,
+    send_to_destination, photo_input_media
+)
+import media_cache
+import send_scheduler
+from progress_renderer import BatchDashboard, DashboardSlot
 
 logger = logging.getLogger(__name__)
 
@@ -232,13 +248,13 @@ def setup_processing_handlers(app: Client):
                 user_data[user_id]['step'] = 'ask_watermark'
                 
                 await message.reply_text(
-                    f"✏️ **Text Watermark (Optional)**\n\n"
-                    f"Add text overlay on video thumbnails?\n\n"
-                    f"**Options:**\n"
-                    f"• Send your watermark text\n"
-                    f"• Send `/skip` to skip\n\n"
-                    f"Example: '@MyChannel' or 'My Brand'\n"
-                    f"Text will appear on thumbnails."
+                    "✏️ **Text Watermark (Optional)**\n\n"
+                    "Add text overlay on video thumbnails?\n\n"
+                    "**Options:**\n"
+                    "• Send your watermark text\n"
+                    "• Send `/skip` to skip\n\n"
+                    "Example: '@MyChannel' or 'My Brand'\n"
+                    "Text will appear on thumbnails."
                 )
             else:
                 user_data[user_id]['custom_caption'] = text
@@ -372,241 +388,645 @@ async def process_batch(
     custom_caption: str = "",
     watermark_text: str = ""
 ):
-    """Process batch - SAME AS v10.0"""
+    """
+    Process batch
+    🆕 v11.2 - BATCH_MODE 'pipeline' overlaps download, processing and upload
+    🆕 v11.2 - BATCH_MODE 'workers' runs per-type worker pools
+    """
     from handlers import active_downloads, download_progress
     
-    success = 0
-    failed = 0
-    skipped = 0
+    counters = {'success': 0, 'failed': 0, 'skipped': 0}
     
-    for idx, item in enumerate(items, start):
-        if not active_downloads.get(user_id, False):
-            await message.reply_text("⛔ Stopped by user!")
-            break
-        
-        prog = await message.reply_text(
-            f"📦 **Item {idx}/{end}**\n"
-            f"📝 {item['title'][:50]}...\n"
-            f"🚀 Processing..."
-        )
-        
-        try:
-            base_caption = f"{idx}. {item['title']}"
-            if custom_caption:
-                base_caption += f"\n\n{custom_caption}"
-            
-            if is_youtube_url(item['url']) or is_unsupported_platform(item['url']):
-                platform = "YouTube" if is_youtube_url(item['url']) else "Social Media"
-                await prog.edit_text(f"🎬 {platform} detected! Sending link...")
+    # 🆕 v11.2 - One live dashboard message instead of a status message per item
+    dashboard = None
+    if BATCH_DASHBOARD:
+        dashboard = await BatchDashboard.start(message, len(items), counters)
+    
+    try:
+        if BATCH_MODE == 'pipeline':
+            await run_batch_pipeline(
+                client, message, items, quality, start, end,
+                user_id, destination_id, custom_caption, watermark_text, counters,
+                dashboard
+            )
+        elif BATCH_MODE == 'workers':
+            await run_batch_workers(
+                client, message, items, quality, start, end,
+                user_id, destination_id, custom_caption, watermark_text, counters,
+                dashboard
+            )
+        else:
+            for unit in plan_units(items, start):
+                if not active_downloads.get(user_id, False):
+                    await send_scheduler.reply(message, "⛔ Stopped by user!")
+                    break
                 
-                await send_failed_link(
-                    client, destination_id, item['title'],
-                    item['url'], idx, 
-                    f"{platform} link - Open manually",
-                    item['type']
-                )
-                skipped += 1
-                await prog.delete()
-                continue
-            
-            if item['type'] == 'video':
-                result = await process_video(
-                    client, message, item, quality,
-                    base_caption, idx, prog, user_id,
-                    destination_id, watermark_text
-                )
-            elif item['type'] == 'image':
-                result = await process_image(
-                    client, message, item, base_caption,
-                    idx, prog, user_id, destination_id
-                )
-            elif item['type'] == 'document':
-                result = await process_document(
-                    client, message, item, base_caption,
-                    idx, prog, user_id, destination_id
-                )
-            else:
-                result = False
-            
-            if result == 'FAILED':
-                await send_failed_link(
-                    client, destination_id, item['title'],
-                    item['url'], idx, 
-                    "Processing failed - Check link manually",
-                    item['type']
-                )
-                failed += 1
-            elif result:
-                success += 1
-            else:
-                failed += 1
-        
-        except Exception as e:
-            logger.error(f"Item {idx} error: {e}", exc_info=True)
-            try:
-                await prog.delete()
-                await send_failed_link(
-                    client, destination_id, item['title'],
-                    item['url'], idx, f"Error: {str(e)[:50]}",
-                    item['type']
+                job = await download_unit(
+                    client, message, unit, end, quality,
+                    user_id, destination_id, custom_caption, download_progress,
+                    dashboard
                 )
-            except:
-                pass
-            failed += 1
-        
-        await asyncio.sleep(0.3)
+                await prepare_item(job, quality, user_id, watermark_text)
+                outcome = await deliver_unit(client, job, destination_id)
+                record_outcome(job, outcome, counters)
+    
+    finally:
+        # Unpinned on every exit - a crash must not leave the dashboard pinned
+        if dashboard:
+            await dashboard.finish()
     
-    await message.reply_text(
+    await send_scheduler.reply(
+        message,
         f"✅ **BATCH COMPLETE!**\n\n"
-        f"✔️ Success: {success}\n"
-        f"❌ Failed: {failed}\n"
-        f"⏭️ Skipped: {skipped}\n"
+        f"✔️ Success: {counters['success']}\n"
+        f"❌ Failed: {counters['failed']}\n"
+        f"⏭️ Skipped: {counters['skipped']}\n"
         f"📊 Total: {len(items)}\n"
         f"📍 Range: {start}-{end}\n\n"
         f"🚀 HYDROGEN BOMB v11.0 delivered!"
     )
 
 
-async def process_video(
-    client: Client, message: Message, item: dict,
-    quality: str, caption: str, idx: int,
-    prog: Message, user_id: int, dest_id: int,
-    watermark: str = ""
-) -> bool:
-    """Process video - SAME AS v10.0"""
+async def run_batch_pipeline(
+    client: Client,
+    message: Message,
+    items: list,
+    quality: str,
+    start: int,
+    end: int,
+    user_id: int,
+    destination_id: int,
+    custom_caption: str,
+    watermark_text: str,
+    counters: dict,
+    dashboard: Optional[BatchDashboard] = None
+):
+    """
+    🆕 v11.2 - Staged batch pipeline
+    download → process → upload run as separate stages joined by bounded
+    queues, so item N+1 downloads while item N uploads. Every stage has a
+    single worker and the queues are FIFO, so delivery keeps range order.
+    """
     from handlers import active_downloads, download_progress
     
+    process_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    upload_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    
+    async def download_stage():
+        try:
+            for unit in plan_units(items, start):
+                if not active_downloads.get(user_id, False):
+                    await send_scheduler.reply(message, "⛔ Stopped by user!")
+                    break
+                
+                job = await download_unit(
+                    client, message, unit, end, quality,
+                    user_id, destination_id, custom_caption, download_progress,
+                    dashboard
+                )
+                await process_queue.put(job)
+        finally:
+            await process_queue.put(None)
+    
+    async def process_stage():
+        try:
+            while True:
+                job = await process_queue.get()
+                if job is None:
+                    break
+                await prepare_item(job, quality, user_id, watermark_text)
+                await upload_queue.put(job)
+        finally:
+            await upload_queue.put(None)
+    
+    async def upload_stage():
+        while True:
+            job = await upload_queue.get()
+            if job is None:
+                break
+            outcome = await deliver_unit(client, job, destination_id)
+            record_outcome(job, outcome, counters)
+    
+    await asyncio.gather(download_stage(), process_stage(), upload_stage())
+
+
+async def run_batch_workers(
+    client: Client,
+    message: Message,
+    items: list,
+    quality: str,
+    start: int,
+    end: int,
+    user_id: int,
+    destination_id: int,
+    custom_caption: str,
+    watermark_text: str,
+    counters: dict,
+    dashboard: Optional[BatchDashboard] = None
+):
+    """
+    🆕 v11.2 - Concurrent per-type item workers
+    Videos, images and documents each get their own concurrency limit,
+    all capped by MAX_CONCURRENT_DOWNLOADS. Finished items wait in a
+    reorder buffer so captions/serial numbers still arrive in order.
+    """
+    from handlers import active_downloads
+    
+    type_limits = {
+        'video': asyncio.Semaphore(VIDEO_WORKERS),
+        'image': asyncio.Semaphore(IMAGE_WORKERS),
+        'document': asyncio.Semaphore(DOCUMENT_WORKERS)
+    }
+    global_limit = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+    window = asyncio.Semaphore(REORDER_WINDOW)
+    
+    @asynccontextmanager
+    async def item_permit(item: dict):
+        # Types without their own limit only take the global permit
+        async with type_limits.get(item['type'], nullcontext()), global_limit:
+            yield
+    
+    async def fetch(unit: list) -> Optional[dict]:
+        # Albums take one permit per image inside download_unit
+        album = len(unit) > 1
+        async with nullcontext() if album else item_permit(unit[0][1]):
+            if not active_downloads.get(user_id, False):
+                return None
+            
+            # Own progress dict per item - download_progress is keyed by user
+            job = await download_unit(
+                client, message, unit, end, quality,
+                user_id, destination_id, custom_caption, {},
+                dashboard, item_permit if album else None
+            )
+            await prepare_item(job, quality, user_id, watermark_text)
+            return job
+    
+    async def schedule():
+        for unit in plan_units(items, start):
+            await window.acquire()
+            if not active_downloads.get(user_id, False):
+                window.release()
+                break
+            await pending.put(asyncio.create_task(fetch(unit)))
+        await pending.put(None)
+    
+    pending = asyncio.Queue()
+    scheduler = asyncio.create_task(schedule())
+    stopped = False
+    
     try:
-        safe = sanitize_filename(item['title'])
-        fname = f"{safe}_{idx}.mp4"
-        
-        vpath = await download_video(
-            item['url'], quality, fname, prog,
-            user_id, active_downloads, download_progress
-        )
-        
-        if vpath == 'UNSUPPORTED':
-            return 'FAILED'
-        
-        if not vpath or not validate_video_file(vpath):
-            return 'FAILED'
-        
-        await prog.edit_text("🎬 Analyzing...")
-        video_info = get_video_info(vpath)
-        
-        quality_height = QUALITY_SETTINGS[quality]['height']
-        if video_info['height'] != quality_height:
-            await prog.edit_text(f"⚙️ Converting to {quality}...")
-            conv_path = str(DOWNLOAD_DIR / f"conv_{fname}")
+        # Reorder buffer: tasks are queued in range order, deliver in that order
+        while True:
+            task = await pending.get()
+            if task is None:
+                break
             
-            success = await convert_video_quality(vpath, conv_path, quality)
+            job = await task
+            window.release()
             
-            if success:
-                os.remove(vpath)
-                vpath = conv_path
-                video_info = get_video_info(vpath)
-        
-        thumb_path = str(DOWNLOAD_DIR / f"thumb_{user_id}_{idx}.jpg")
-        has_thumb = generate_thumbnail_with_text(
-            vpath, thumb_path, watermark, video_info['duration']
-        )
-        
-        await prog.edit_text("📤 Uploading...")
-        upload_success = await send_to_destination(
-            client, dest_id, vpath, caption, 'video',
-            prog, thumb_path if has_thumb else None,
-            video_info['duration'], video_info['width'], video_info['height']
+            if job is None:
+                stopped = True
+                continue
+            
+            outcome = await deliver_unit(client, job, destination_id)
+            record_outcome(job, outcome, counters)
+    finally:
+        scheduler.cancel()
+        while not pending.empty():
+            task = pending.get_nowait()
+            if task is not None:
+                task.cancel()
+    
+    if stopped or not active_downloads.get(user_id, False):
+        await send_scheduler.reply(message, "⛔ Stopped by user!")
+
+
+def record_outcome(job: dict, outcomes: list, counters: dict):
+    """Count delivered items and drop the unit from the dashboard"""
+    for outcome in outcomes:
+        counters[outcome] += 1
+    if isinstance(job['prog'], DashboardSlot):
+        job['prog'].close()
+
+
+def plan_units(items: list, start: int) -> list:
+    """
+    🆕 v11.2 - Batch units in range order: [(idx, item), ...]
+    Runs of consecutive images become album units of up to ALBUM_SIZE,
+    everything else is a unit of one
+    """
+    units = []
+    album_run = False
+    
+    for idx, item in enumerate(items, start):
+        albumable = (
+            ALBUM_BATCHING
+            and item['type'] == 'image'
+            and not is_youtube_url(item['url'])
+            and not is_unsupported_platform(item['url'])
         )
         
-        try:
-            os.remove(vpath)
-            if has_thumb and os.path.exists(thumb_path):
-                os.remove(thumb_path)
-        except:
-            pass
+        if albumable and album_run and len(units[-1]) < ALBUM_SIZE:
+            units[-1].append((idx, item))
+        else:
+            units.append([(idx, item)])
         
-        await prog.delete()
-        return upload_success
+        album_run = albumable
+    
+    return units
+
+
+async def download_unit(
+    client: Client, message: Message, unit: list,
+    end: int, quality: str, user_id: int,
+    destination_id: int, custom_caption: str,
+    download_progress: dict,
+    dashboard: Optional[BatchDashboard] = None,
+    permit=None
+) -> dict:
+    """
+    Stage 1 for a unit - one item, or an album fetched concurrently
+    permit(item): async context held around each album image's download
+    """
+    if len(unit) == 1:
+        idx, item = unit[0]
+        return await download_item(
+            client, message, item, idx, end, quality,
+            user_id, destination_id, custom_caption, download_progress,
+            dashboard
+        )
+    
+    first, last = unit[0][0], unit[-1][0]
+    
+    # One shared status for the whole album
+    if dashboard:
+        prog = dashboard.slot(first, f"🖼️ Album #{first}-{last}")
+    else:
+        prog = await send_scheduler.reply(
+            message,
+            f"📦 **Items {first}-{last}/{end}**\n"
+            f"🖼️ Album of {len(unit)} images\n"
+            f"🚀 Processing..."
+        )
+    
+    async def fetch_image(idx: int, item: dict) -> dict:
+        async with permit(item) if permit else nullcontext():
+            return await download_item(
+                client, message, item, idx, end, quality,
+                user_id, destination_id, custom_caption, {},
+                prog=prog
+            )
+    
+    jobs = await asyncio.gather(*(fetch_image(idx, item) for idx, item in unit))
+    
+    return {'idx': first, 'album': list(jobs), 'prog': prog}
+
+
+async def deliver_unit(client: Client, job: dict, destination_id: int) -> list:
+    """
+    Stage 3 for a unit - returns one outcome per item
+    Albums are split around items that can't join, so everything
+    still lands in index order
+    """
+    if 'album' not in job:
+        return [await deliver_item(client, job, destination_id)]
+    
+    jobs = job['album']
+    prog = job['prog']
+    
+    # Downloaded or cached-as-photo images can go into the album
+    def groupable(j: dict) -> bool:
+        return j['result'] is None and bool(
+            j['path'] or (j['cached'] and [p['kind'] for p in j['cached']['parts']] == ['photo'])
+        )
+    
+    runs = []
+    for j in jobs:
+        if groupable(j) and runs and runs[-1][0]:
+            runs[-1][1].append(j)
+        else:
+            runs.append((groupable(j), [j]))
+    
+    # The shared status is edited and deleted here only, not per item
+    await send_scheduler.edit(prog, f"📤 Sending {len(jobs)} images...")
+    
+    outcomes = []
+    for is_group, run in runs:
+        if is_group and len(run) >= 2:
+            await send_album(client, run, destination_id)
         
+        # Single survivors, album failures and failed items take the normal path
+        for j in run:
+            outcomes.append(await deliver_item(client, j, destination_id, shared_prog=True))
+    
+    await send_scheduler.delete(prog)
+    
+    return outcomes
+
+
+async def send_album(client: Client, jobs: list, destination_id: int):
+    """One media group - marks the jobs delivered, leaves them untouched on failure"""
+    try:
+        media = [
+            (
+                await photo_input_media(
+                    client, destination_id,
+                    j['cached']['parts'][0]['file_id'] if j['cached'] else j['path']
+                ),
+                j['caption']
+            )
+            for j in jobs
+        ]
+        sent = await send_scheduler.send_album(client, destination_id, media)
     except Exception as e:
-        logger.error(f"Video error: {e}")
-        return False
+        # e.g. one image Telegram rejects - send the rest one by one
+        logger.warning(f"⚠️ Album send failed, sending individually: {e}")
+        return
+    
+    for j, msg in zip(jobs, sent):
+        j['result'] = True
+        if j['cache_key'] and not j['cached']:
+            media_cache.record(j['cache_key'], [(msg, "")])
+        if j['path']:
+            try:
+                os.remove(j['path'])
+            except:
+                pass
+    
+    logger.info(f"🖼️ Album of {len(jobs)} sent")
 
 
-async def process_image(
+async def download_item(
     client: Client, message: Message, item: dict,
-    caption: str, idx: int, prog: Message,
-    user_id: int, dest_id: int
-) -> bool:
-    """Process image - SAME AS v10.0"""
+    idx: int, end: int, quality: str, user_id: int,
+    destination_id: int, custom_caption: str,
+    download_progress: dict,
+    dashboard: Optional[BatchDashboard] = None,
+    prog: Optional[Message] = None
+) -> dict:
+    """
+    Stage 1 - status message + download
+    Returns a job dict that the next stages fill in
+    With a dashboard the item gets a dashboard line instead of a message
+    prog: shared status of an album unit
+    """
     from handlers import active_downloads
     
+    base_caption = f"{idx}. {item['title']}"
+    if custom_caption:
+        base_caption += f"\n\n{custom_caption}"
+    
+    job = {
+        'idx': idx,
+        'item': item,
+        'caption': base_caption,
+        'prog': None,
+        'path': None,
+        'fname': None,
+        'thumb': None,
+        'info': None,
+        'cache_key': None,
+        'cached': None,
+        'result': None,
+        'skip_reason': None
+    }
+    
     try:
-        safe = sanitize_filename(item['title'])
-        ext = os.path.splitext(item['url'])[1] or '.jpg'
-        fname = f"{safe}_{idx}{ext}"
+        if prog:
+            job['prog'] = prog
+        elif dashboard:
+            job['prog'] = dashboard.slot(idx, item['title'])
+        else:
+            job['prog'] = await send_scheduler.reply(
+                message,
+                f"📦 **Item {idx}/{end}**\n"
+                f"📝 {item['title'][:50]}...\n"
+                f"🚀 Processing..."
+            )
+        prog = job['prog']
         
-        ipath = await download_file(
-            item['url'], fname, prog, user_id, active_downloads
-        )
+        if is_youtube_url(item['url']) or is_unsupported_platform(item['url']):
+            platform = "YouTube" if is_youtube_url(item['url']) else "Social Media"
+            await send_scheduler.edit(prog, f"🎬 {platform} detected! Link follows in order...")
+            
+            # Stage 3 posts the link so it keeps its place in the range
+            job['result'] = 'SKIPPED'
+            job['skip_reason'] = f"{platform} link - Open manually"
+            return job
         
-        if not ipath:
-            return 'FAILED'
+        # Already uploaded once? Stage 3 re-sends it by file_id
+        if USE_MEDIA_CACHE:
+            job['cache_key'] = media_cache.cache_key(item['url'], item['type'], quality)
+            job['cached'] = media_cache.get_cached(job['cache_key'])
+            if job['cached']:
+                await send_scheduler.edit(prog, f"⚡ **Item {idx}/{end}** - cached, no download needed")
+                return job
         
-        await prog.edit_text("📤 Uploading...")
-        success = await send_to_destination(
-            client, dest_id, ipath, caption, 'image', prog
-        )
+        safe = sanitize_filename(item['title'])
         
-        try:
-            os.remove(ipath)
-        except:
-            pass
+        if item['type'] == 'video':
+            job['fname'] = f"{safe}_{idx}.mp4"
+            vpath = await download_video(
+                item['url'], quality, job['fname'], prog,
+                user_id, active_downloads, download_progress
+            )
+            
+            if vpath == 'UNSUPPORTED' or not vpath:
+                job['result'] = 'FAILED'
+            else:
+                job['path'] = vpath
         
-        await prog.delete()
-        return success
+        elif item['type'] in ('image', 'document'):
+            default_ext = '.jpg' if item['type'] == 'image' else '.pdf'
+            ext = os.path.splitext(item['url'])[1] or default_ext
+            job['fname'] = f"{safe}_{idx}{ext}"
+            
+            path = await download_file(
+                item['url'], job['fname'], prog, user_id, active_downloads
+            )
+            
+            if not path:
+                job['result'] = 'FAILED'
+            else:
+                job['path'] = path
         
+        else:
+            job['result'] = False
+    
     except Exception as e:
-        logger.error(f"Image error: {e}")
-        return False
+        logger.error(f"Item {idx} download error: {e}", exc_info=True)
+        job['result'] = e
+    
+    return job
 
 
-async def process_document(
-    client: Client, message: Message, item: dict,
-    caption: str, idx: int, prog: Message,
-    user_id: int, dest_id: int
-) -> bool:
-    """Process document - SAME AS v10.0"""
-    from handlers import active_downloads
+async def prepare_item(job: dict, quality: str, user_id: int, watermark: str = ""):
+    """
+    Stage 2 - validate, convert and thumbnail videos
+    Images and documents pass straight through
+    """
+    if 'album' in job:
+        return
+    
+    if job['result'] is not None or job['cached'] or job['item']['type'] != 'video':
+        return
+    
+    vpath = job['path']
+    prog = job['prog']
     
     try:
-        safe = sanitize_filename(item['title'])
-        ext = os.path.splitext(item['url'])[1] or '.pdf'
-        fname = f"{safe}_{idx}{ext}"
+        if not await validate_video_file(vpath):
+            job['result'] = 'FAILED'
+            return
         
-        dpath = await download_file(
-            item['url'], fname, prog, user_id, active_downloads
-        )
+        await send_scheduler.edit(prog, "🎬 Analyzing...")
+        video_info = await get_video_info(vpath)
         
-        if not dpath:
-            return 'FAILED'
+        # Cheapest valid action - most sources need no re-encode
+        plan = await plan_transcode(vpath, quality)
+        logger.info(f"🧠 Item {job['idx']}: {plan['action']} ({plan['reason']})")
         
-        await prog.edit_text("📤 Uploading...")
-        success = await send_to_destination(
-            client, dest_id, dpath, caption, 'document', prog
-        )
+        thumb_path = str(DOWNLOAD_DIR / f"thumb_{user_id}_{job['idx']}.jpg")
+        thumb_source = vpath
+        has_thumb = False
         
-        try:
-            os.remove(dpath)
-        except:
-            pass
+        if plan['action'] != 'none':
+            conv_path = str(DOWNLOAD_DIR / f"conv_{job['fname']}")
+            outputs = None
+            
+            # 🆕 v11.2 - One decode: encode + thumbnail + upload-sized parts
+            if plan['action'] == 'transcode' and FUSED_POSTPROCESS:
+                await send_scheduler.edit(prog, f"{TRANSCODE_ACTIONS['transcode']} → {quality} (single pass)...")
+                fused = await fused_transcode(
+                    vpath, conv_path, quality, thumb_path,
+                    watermark, video_info['duration']
+                )
+                if fused:
+                    outputs, has_thumb = fused
+            
+            if outputs is None:
+                await send_scheduler.edit(prog, f"{TRANSCODE_ACTIONS[plan['action']]} → {quality}...")
+                if await apply_transcode_plan(plan, vpath, conv_path, quality):
+                    outputs = [conv_path]
+            
+            if outputs:
+                os.remove(vpath)
+                # Multi-part: the uploader finds the siblings of part 1
+                vpath = thumb_source = outputs[0]
+                video_info = await get_video_info(thumb_source)
+                
+                if len(outputs) > 1:
+                    # Whole-video duration, part 1's frame size
+                    durations = [(await get_video_info(p))['duration'] for p in outputs[1:]]
+                    video_info['duration'] += sum(durations)
+        
+        if not has_thumb:
+            has_thumb = await generate_thumbnail_with_text(
+                thumb_source, thumb_path, watermark, video_info['duration']
+            )
         
-        await prog.delete()
-        return success
+        job['path'] = vpath
+        job['info'] = video_info
+        job['thumb'] = thumb_path if has_thumb else None
         
     except Exception as e:
-        logger.error(f"Document error: {e}")
-        return False
+        logger.error(f"Video error: {e}")
+        job['result'] = False
+
+
+async def deliver_item(
+    client: Client, job: dict, destination_id: int,
+    shared_prog: bool = False
+) -> str:
+    """
+    Stage 3 - upload + failed link handling
+    Returns the counter to bump: success / failed / skipped
+    shared_prog: prog belongs to an album unit - deliver_unit edits/deletes it
+    """
+    item = job['item']
+    idx = job['idx']
+    prog = job['prog']
+    own_prog = prog and not shared_prog
+    
+    if job['result'] is None and job['cached']:
+        job['result'] = await media_cache.send_cached(
+            client, destination_id, job['cached'], job['caption']
+        )
+        if not job['result']:
+            # Stale file_id - forget it so the next run downloads again
+            media_cache.forget(job['cache_key'])
+        if own_prog:
+            await send_scheduler.delete(prog)
+    
+    if job['result'] is None:
+        try:
+            if own_prog:
+                await send_scheduler.edit(prog, "📤 Uploading...")
+            
+            if item['type'] == 'video':
+                info = job['info']
+                job['result'] = await send_to_destination(
+                    client, destination_id, job['path'], job['caption'], 'video',
+                    prog, job['thumb'],
+                    info['duration'], info['width'], info['height'],
+                    job['cache_key']
+                )
+            else:
+                job['result'] = await send_to_destination(
+                    client, destination_id, job['path'], job['caption'],
+                    item['type'], prog, cache_key=job['cache_key']
+                )
+            
+            try:
+                os.remove(job['path'])
+                if job['thumb'] and os.path.exists(job['thumb']):
+                    os.remove(job['thumb'])
+            except:
+                pass
+            
+            if own_prog:
+                await send_scheduler.delete(prog)
+            
+        except Exception as e:
+            logger.error(f"{item['type'].title()} error: {e}")
+            job['result'] = False
+    
+    result = job['result']
+    
+    if result == 'SKIPPED':
+        if own_prog:
+            await send_scheduler.delete(prog)
+        await send_failed_link(
+            client, destination_id, item['title'],
+            item['url'], idx, job['skip_reason'],
+            item['type']
+        )
+        return 'skipped'
+    
+    if isinstance(result, Exception):
+        try:
+            if own_prog:
+                await send_scheduler.delete(prog)
+            await send_failed_link(
+                client, destination_id, item['title'],
+                item['url'], idx, f"Error: {str(result)[:50]}",
+                item['type']
+            )
+        except:
+            pass
+        return 'failed'
+    
+    if result == 'FAILED':
+        await send_failed_link(
+            client, destination_id, item['title'],
+            item['url'], idx, 
+            "Processing failed - Check link manually",
+            item['type']
+        )
+        return 'failed'
+    
+    return 'success' if result else 'failed'
 
 
 def cleanup_user_data(user_id: int, file_path: str):
@@ -621,6 +1041,9 @@ def cleanup_user_data(user_id: int, file_path: str):
     
     for pattern in [f"temp_{user_id}_*", f"thumb_{user_id}_*", f"*_part*", f"conv_*"]:
         for tf in DOWNLOAD_DIR.glob(pattern):
+            # Interrupted downloads keep their partial file + sidecar to resume from
+            if tf.name.endswith(RESUME_STATE_SUFFIX) or os.path.exists(str(tf) + RESUME_STATE_SUFFIX):
+                continue
             try:
                 os.remove(tf)
             except:
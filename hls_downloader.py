@@ -0,0 +1,320 @@
+"""
+📺 NATIVE HLS DOWNLOADER - v11.2
+In-process asyncio engine for .m3u8 links
+- Master playlist variant selection by QUALITY_SETTINGS height
+- Parallel segment fetches over the shared HTTP pool
+- AES-128 decryption with a key cache
+- Separate audio renditions muxed with one ffmpeg copy
+yt-dlp stays as the fallback for anything this engine can't handle
+"""
+
+import os
+import re
+import asyncio
+import logging
+from urllib.parse import urljoin
+from typing import Optional, Dict, List
+from pyrogram.types import Message
+from yt_dlp.aes import aes_cbc_decrypt_bytes, unpad_pkcs7
+from yt_dlp.dependencies import Cryptodome
+from config import QUALITY_SETTINGS
+from segments import (
+    fetch_bytes, fetch_text, fetch_segments,
+    mux_to_mp4, render_segment_progress
+)
+from utils import format_size
+import send_scheduler
+import progress_renderer
+
+logger = logging.getLogger(__name__)
+
+ATTRIBUTE_RE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+# AES-128 keys are usually shared by every segment (and often every variant)
+_key_cache: Dict[str, bytes] = {}
+KEY_CACHE_SIZE = 256
+
+
+def parse_attributes(line: str) -> Dict[str, str]:
+    """Parse an #EXT-X-... tag's ATTR=value list"""
+    attrs = line.split(':', 1)[1] if ':' in line else ''
+    return {k: v.strip('"') for k, v in ATTRIBUTE_RE.findall(attrs)}
+
+
+def parse_master_playlist(text: str, base_url: str) -> tuple:
+    """
+    Returns (variants, audio_groups)
+    variants: [{'url', 'height', 'bandwidth', 'audio'}]
+    audio_groups: {group_id: url} (default rendition of each group)
+    """
+    variants = []
+    audio_groups = {}
+    pending = None
+    
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        
+        if line.startswith('#EXT-X-STREAM-INF'):
+            attrs = parse_attributes(line)
+            height = 0
+            if 'x' in attrs.get('RESOLUTION', ''):
+                height = int(attrs['RESOLUTION'].split('x')[1] or 0)
+            pending = {
+                'height': height,
+                'bandwidth': int(attrs.get('BANDWIDTH', 0) or 0),
+                'audio': attrs.get('AUDIO')
+            }
+        
+        elif line.startswith('#EXT-X-MEDIA'):
+            attrs = parse_attributes(line)
+            if attrs.get('TYPE') == 'AUDIO' and attrs.get('URI'):
+                group = attrs.get('GROUP-ID', '')
+                if group not in audio_groups or attrs.get('DEFAULT') == 'YES':
+                    audio_groups[group] = urljoin(base_url, attrs['URI'])
+        
+        elif not line.startswith('#') and pending is not None:
+            pending['url'] = urljoin(base_url, line)
+            variants.append(pending)
+            pending = None
+    
+    return variants, audio_groups
+
+
+def select_variant(variants: List[dict], quality: str) -> dict:
+    """Best variant not above the requested height (lowest one otherwise)"""
+    target = QUALITY_SETTINGS.get(quality, {}).get('height', 720)
+    
+    sized = [v for v in variants if v['height']]
+    if not sized:
+        return max(variants, key=lambda v: v['bandwidth'])
+    
+    fitting = [v for v in sized if v['height'] <= target]
+    if fitting:
+        return max(fitting, key=lambda v: (v['height'], v['bandwidth']))
+    
+    return min(sized, key=lambda v: (v['height'], -v['bandwidth']))
+
+
+def parse_media_playlist(text: str, base_url: str) -> Optional[dict]:
+    """
+    Returns {'segments': [...], 'init': Optional[segment]}
+    Each segment: {'url', 'range', 'key': Optional[{'uri', 'iv'}]}
+    None for live playlists or encryption we can't handle natively
+    """
+    segments = []
+    init = None
+    key = None
+    sequence = 0
+    byte_range = None
+    last_offset = {}
+    
+    def parse_byterange(value: str, uri: str) -> tuple:
+        length, _, offset = value.partition('@')
+        start = int(offset) if offset else last_offset.get(uri, 0)
+        end = start + int(length) - 1
+        last_offset[uri] = end + 1
+        return (start, end)
+    
+    lines = [l.strip() for l in text.splitlines() if l.strip()]
+    
+    if '#EXT-X-ENDLIST' not in lines:
+        logger.info("📺 Live/unfinished playlist - leaving it to yt-dlp")
+        return None
+    
+    for line in lines:
+        if line.startswith('#EXT-X-MEDIA-SEQUENCE'):
+            sequence = int(line.split(':', 1)[1])
+        
+        elif line.startswith('#EXT-X-KEY'):
+            attrs = parse_attributes(line)
+            method = attrs.get('METHOD', 'NONE')
+            if method == 'NONE':
+                key = None
+            elif method == 'AES-128':
+                key = {'uri': urljoin(base_url, attrs['URI']), 'iv': attrs.get('IV')}
+            else:
+                logger.info(f"📺 Encryption {method} not supported natively")
+                return None
+        
+        elif line.startswith('#EXT-X-MAP'):
+            attrs = parse_attributes(line)
+            uri = urljoin(base_url, attrs['URI'])
+            init = {
+                'url': uri,
+                'range': parse_byterange(attrs['BYTERANGE'], uri) if 'BYTERANGE' in attrs else None,
+                'key': None
+            }
+        
+        elif line.startswith('#EXT-X-BYTERANGE'):
+            byte_range = line.split(':', 1)[1]
+        
+        elif not line.startswith('#'):
+            uri = urljoin(base_url, line)
+            segment_key = None
+            if key:
+                iv = key['iv']
+                if iv:
+                    iv_bytes = bytes.fromhex(iv[2:] if iv.lower().startswith('0x') else iv).rjust(16, b'\0')
+                else:
+                    iv_bytes = sequence.to_bytes(16, 'big')
+                segment_key = {'uri': key['uri'], 'iv': iv_bytes}
+            
+            segments.append({
+                'url': uri,
+                'range': parse_byterange(byte_range, uri) if byte_range else None,
+                'key': segment_key
+            })
+            byte_range = None
+            sequence += 1
+    
+    return {'segments': segments, 'init': init}
+
+
+async def get_key(uri: str, headers: Dict[str, str]) -> bytes:
+    """Fetch an AES-128 key once and reuse it"""
+    if uri not in _key_cache:
+        if len(_key_cache) >= KEY_CACHE_SIZE:
+            _key_cache.pop(next(iter(_key_cache)))
+        _key_cache[uri] = await fetch_bytes(uri, headers)
+    return _key_cache[uri]
+
+
+async def download_playlist(
+    playlist_url: str,
+    output_base: str,
+    headers: Dict[str, str],
+    label: str,
+    progress_msg: Message,
+    user_id: int,
+    active_downloads: Dict[int, bool]
+) -> Optional[str]:
+    """Download one media playlist into output_base + .ts / .mp4"""
+    text, final_url = await fetch_text(playlist_url, headers)
+    playlist = parse_media_playlist(text, final_url)
+    
+    if not playlist or not playlist['segments']:
+        return None
+    
+    segments = playlist['segments']
+    
+    # Pure-python AES is far too slow for video - needs pycryptodomex
+    if not Cryptodome.AES and any(seg['key'] for seg in segments):
+        logger.info("📺 AES-128 stream without pycryptodomex - leaving it to yt-dlp")
+        return None
+    
+    # fMP4 playlists need their init section first
+    if playlist['init']:
+        segments = [playlist['init']] + segments
+        output_path = output_base + '.mp4'
+    else:
+        output_path = output_base + '.ts'
+    
+    loop = asyncio.get_event_loop()
+    
+    async def decrypt(index: int, data: bytes) -> bytes:
+        key_info = segments[index].get('key')
+        if not key_info:
+            return data
+        key = await get_key(key_info['uri'], headers)
+        return await loop.run_in_executor(
+            None, lambda: unpad_pkcs7(aes_cbc_decrypt_bytes(data, key, key_info['iv']))
+        )
+    
+    async def report(done: int, total: int, downloaded: int, speed: float, workers: int):
+        progress_renderer.update(
+            progress_msg,
+            render_segment_progress(
+                f"📺 **HLS DOWNLOAD** {label}", done, total, downloaded, speed, workers
+            )
+        )
+    
+    ok = await fetch_segments(
+        segments, output_path, headers, user_id, active_downloads,
+        progress=report, transform=decrypt
+    )
+    
+    if not ok:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return None
+    
+    return output_path
+
+
+async def download_hls(
+    url: str,
+    quality: str,
+    output_base: str,
+    progress_msg: Message,
+    user_id: int,
+    active_downloads: Dict[int, bool]
+) -> Optional[str]:
+    """
+    🚀 Native HLS download
+    Returns output_base + '.mp4' on success, None to fall back to yt-dlp
+    """
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        'Accept': '*/*',
+        'Connection': 'keep-alive',
+    }
+    
+    downloaded = []
+    
+    try:
+        text, final_url = await fetch_text(url, headers)
+        
+        video_url = final_url
+        audio_url = None
+        
+        if '#EXT-X-STREAM-INF' in text:
+            variants, audio_groups = parse_master_playlist(text, final_url)
+            if not variants:
+                return None
+            
+            variant = select_variant(variants, quality)
+            video_url = variant['url']
+            audio_url = audio_groups.get(variant['audio'])
+            logger.info(
+                f"📺 HLS variant: {variant['height'] or '?'}p, "
+                f"{variant['bandwidth'] // 1000}kbps, separate audio: {bool(audio_url)}"
+            )
+        
+        jobs = [download_playlist(
+            video_url, output_base + '.video', headers, "",
+            progress_msg, user_id, active_downloads
+        )]
+        if audio_url:
+            jobs.append(download_playlist(
+                audio_url, output_base + '.audio', headers, "(audio)",
+                progress_msg, user_id, active_downloads
+            ))
+        
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+        downloaded = [r for r in results if isinstance(r, str)]
+        
+        if len(downloaded) != len(jobs):
+            return None
+        
+        await send_scheduler.edit(progress_msg, "📺 Remuxing to MP4...")
+        output_path = output_base + '.mp4'
+        
+        if not await mux_to_mp4(downloaded, output_path):
+            return None
+        
+        logger.info(f"✅ Native HLS complete: {format_size(os.path.getsize(output_path))}")
+        return output_path
+        
+    except Exception as e:
+        logger.error(f"Native HLS error: {e}")
+        return None
+        
+    finally:
+        for path in downloaded:
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError:
+                pass
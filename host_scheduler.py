@@ -0,0 +1,157 @@
+"""
+🚦 HOST SCHEDULER - v11.2
+Process-wide per-host connection + bandwidth budgets shared by all users
+- Every host has a connection budget (HOST_MAX_CONNECTIONS)
+- Each active job on a host gets an equal share of that budget
+- Optional per-host bandwidth caps (token bucket)
+Direct, file and streaming downloaders all take their permits here
+"""
+
+import time
+import asyncio
+import logging
+from urllib.parse import urlparse
+from contextlib import asynccontextmanager
+from typing import Dict
+from config import (
+    HOST_MAX_CONNECTIONS, HOST_CONNECTION_LIMITS,
+    HOST_BANDWIDTH_LIMIT, HOST_BANDWIDTH_LIMITS
+)
+
+logger = logging.getLogger(__name__)
+
+
+def host_of(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+
+class _HostBudget:
+    """Connection budget + bandwidth bucket for one host"""
+    
+    def __init__(self, host: str):
+        self.host = host
+        self.limit = HOST_CONNECTION_LIMITS.get(host, HOST_MAX_CONNECTIONS)
+        self.rate = HOST_BANDWIDTH_LIMITS.get(host, HOST_BANDWIDTH_LIMIT)
+        self.in_flight = 0
+        self.leases: Dict[int, 'HostLease'] = {}
+        self.condition = asyncio.Condition()
+        
+        # Token bucket (bytes) - one second of burst
+        self.tokens = float(self.rate)
+        self.last_refill = time.monotonic()
+        self.bucket_lock = asyncio.Lock()
+    
+    def fair_share(self) -> int:
+        return max(1, self.limit // max(len(self.leases), 1))
+
+
+_hosts: Dict[str, _HostBudget] = {}
+
+
+class HostLease:
+    """One job's claim on a host's budget"""
+    
+    def __init__(self, url: str):
+        host = host_of(url)
+        if host not in _hosts:
+            _hosts[host] = _HostBudget(host)
+        self.budget = _hosts[host]
+        self.in_flight = 0
+        self.budget.leases[id(self)] = self
+    
+    def fair_share(self) -> int:
+        return self.budget.fair_share()
+    
+    def _may_start(self) -> bool:
+        return (
+            self.budget.in_flight < self.budget.limit
+            and self.in_flight < self.budget.fair_share()
+        )
+    
+    async def acquire(self):
+        budget = self.budget
+        async with budget.condition:
+            await budget.condition.wait_for(self._may_start)
+            budget.in_flight += 1
+            self.in_flight += 1
+    
+    def try_acquire(self) -> bool:
+        """Take a permit only if one is free right now"""
+        if not self._may_start():
+            return False
+        self.budget.in_flight += 1
+        self.in_flight += 1
+        return True
+    
+    def rate_share(self) -> int:
+        """This job's fair slice of the host bandwidth cap (0 = unlimited)"""
+        return self.budget.rate // max(len(self.budget.leases), 1)
+    
+    async def release(self):
+        budget = self.budget
+        async with budget.condition:
+            budget.in_flight -= 1
+            self.in_flight -= 1
+            budget.condition.notify_all()
+    
+    async def throttle(self, nbytes: int):
+        """Wait until the host's bandwidth cap allows nbytes more"""
+        budget = self.budget
+        if not budget.rate:
+            return
+        
+        # Holding the lock while sleeping queues jobs fairly behind each other
+        async with budget.bucket_lock:
+            now = time.monotonic()
+            budget.tokens = min(
+                float(budget.rate),
+                budget.tokens + (now - budget.last_refill) * budget.rate
+            )
+            budget.last_refill = now
+            budget.tokens -= nbytes
+            
+            if budget.tokens < 0:
+                await asyncio.sleep(-budget.tokens / budget.rate)
+    
+    async def close(self):
+        budget = self.budget
+        async with budget.condition:
+            budget.leases.pop(id(self), None)
+            # Shares just grew for everyone else
+            budget.condition.notify_all()
+
+
+@asynccontextmanager
+async def host_lease(url: str):
+    """Lease for the lifetime of one download"""
+    lease = HostLease(url)
+    try:
+        yield lease
+    finally:
+        await lease.close()
+
+
+@asynccontextmanager
+async def host_permit(url: str):
+    """Lease holding a single connection permit (single-stream downloads)"""
+    async with host_lease(url) as lease:
+        await lease.acquire()
+        try:
+            yield lease
+        finally:
+            await lease.release()
+
+
+def scheduler_metrics() -> Dict[str, dict]:
+    """Snapshot for /stats"""
+    return {
+        host: {
+            'in_flight': budget.in_flight,
+            'limit': budget.limit,
+            'jobs': len(budget.leases),
+            'share': budget.fair_share(),
+            'rate': budget.rate
+        }
+        for host, budget in _hosts.items()
+        if budget.leases
+    }
@@ -0,0 +1,91 @@
+"""
+🌐 SHARED HTTP SESSION - v11.2
+One long-lived aiohttp session for every HTTP download.
+Keeps the DNS cache, keep-alive connections and TLS connections
+warm across items instead of rebuilding them per file.
+"""
+
+import ssl
+import asyncio
+import logging
+import aiohttp
+from typing import Optional
+from config import (
+    CONNECTION_POOL_SIZE, CONNECTION_POOL_PER_HOST,
+    DNS_CACHE_TTL, CONNECTION_TIMEOUT, KEEPALIVE_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+_session: Optional[aiohttp.ClientSession] = None
+_lock = asyncio.Lock()
+
+
+class HTTPStatusError(IOError):
+    """Unexpected HTTP status - keeps the code for retry/backoff decisions"""
+    
+    def __init__(self, status: int, url: str = ""):
+        super().__init__(f"HTTP {status} for {url[:80]}")
+        self.status = status
+
+
+def create_ssl_context() -> ssl.SSLContext:
+    """Permissive SSL context shared by every pooled connection"""
+    ssl_context = ssl.create_default_context()
+    ssl_context.check_hostname = False
+    ssl_context.verify_mode = ssl.CERT_NONE
+    ssl_context.set_ciphers('DEFAULT@SECLEVEL=1')
+    return ssl_context
+
+
+def _build_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        ssl=create_ssl_context(),
+        limit=CONNECTION_POOL_SIZE,
+        limit_per_host=CONNECTION_POOL_PER_HOST,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        force_close=False,
+        enable_cleanup_closed=True,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+    )
+    
+    timeout = aiohttp.ClientTimeout(
+        total=CONNECTION_TIMEOUT,
+        connect=30,
+        sock_read=60
+    )
+    
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+async def start_http_session() -> aiohttp.ClientSession:
+    """Create the shared session (called once from main.main)"""
+    global _session
+    
+    async with _lock:
+        if _session is None or _session.closed:
+            _session = _build_session()
+            logger.info(
+                f"🌐 HTTP pool ready: {CONNECTION_POOL_SIZE} connections, "
+                f"{CONNECTION_POOL_PER_HOST}/host"
+            )
+    
+    return _session
+
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """Return the shared session, starting it lazily if needed"""
+    if _session is None or _session.closed:
+        return await start_http_session()
+    return _session
+
+
+async def close_http_session():
+    """Close the shared session and its connection pool (on shutdown)"""
+    global _session
+    
+    async with _lock:
+        if _session is not None and not _session.closed:
+            await _session.close()
+            logger.info("🌐 HTTP pool closed")
+        _session = None
@@ -5,6 +5,13 @@ from pyrogram import Client, idle
 from config import API_ID, API_HASH, BOT_TOKEN, PORT
 from handlers import setup_handlers
 from handlers_part2 import setup_processing_handlers
+from http_session import start_http_session, close_http_session
+from concurrency import host_metrics
+from host_scheduler import scheduler_metrics
+from send_scheduler import scheduler_stats
+from progress_renderer import renderer_stats
+from ffmpeg_runner import runner_stats
+from transcode_scheduler import transcode_stats
 
 # Enhanced logging
 logging.basicConfig(
@@ -72,6 +79,60 @@ async def stats(request):
 💪 STATUS: ACTIVE & READY!
 🔥 PERFORMANCE: MAXIMUM
     """
+    
+    # v11.2 - Live AIMD concurrency per host
+    metrics = host_metrics()
+    if metrics:
+        stats_text += "\n📈 ADAPTIVE CONCURRENCY:\n"
+        for host, m in sorted(metrics.items()):
+            stats_text += (
+                f"   {host}: window {m['window']}, "
+                f"{m['goodput'] / 1048576:.1f} MB/s, {m['active']} active\n"
+            )
+    
+    # v11.2 - Shared host budgets
+    budgets = scheduler_metrics()
+    if budgets:
+        stats_text += "\n🚦 HOST BUDGETS:\n"
+        for host, b in sorted(budgets.items()):
+            stats_text += (
+                f"   {host}: {b['in_flight']}/{b['limit']} connections, "
+                f"{b['jobs']} jobs (share {b['share']})\n"
+            )
+    
+    # v11.2 - Telegram send scheduler
+    sends = scheduler_stats()
+    stats_text += (
+        f"\n📮 SEND SCHEDULER:\n"
+        f"   Sent: {sends['sent']} across {sends['chats']} chats\n"
+        f"   FloodWaits: {sends['flood_waits']} ({sends['paused_chats']} chats paused)\n"
+    )
+    
+    # v11.2 - Progress renderer
+    progress = renderer_stats()
+    stats_text += (
+        f"\n🖥️ PROGRESS RENDERER:\n"
+        f"   {progress['updates']} updates → {progress['edits']} edits, "
+        f"{progress['messages']} live messages\n"
+    )
+    
+    # v11.2 - ffmpeg/ffprobe children
+    procs = runner_stats()
+    stats_text += (
+        f"\n🎞️ FFMPEG RUNNER:\n"
+        f"   Running: {procs['running']} | Runs: {procs['runs']}\n"
+        f"   Timeouts: {procs['timeouts']} | Cancelled: {procs['cancelled']}\n"
+    )
+    
+    # v11.2 - Transcode pool
+    encodes = transcode_stats()
+    stats_text += (
+        f"\n🧮 TRANSCODE POOL:\n"
+        f"   {encodes['busy']}/{encodes['slots']} slots busy × {encodes['threads']} threads, "
+        f"{encodes['queued']} queued\n"
+        f"   Completed: {encodes['completed']} | Avg wait: {encodes['avg_wait']:.1f}s\n"
+    )
+    
     return web.Response(text=stats_text, content_type="text/plain")
 
 async def root(request):
@@ -102,6 +163,9 @@ async def main():
         setup_processing_handlers(app)
         logger.info("✅ Handlers configured (DUAL MODE)")
         
+        # Shared HTTP connection pool for all downloads
+        await start_http_session()
+        
         # Start bot
         await app.start()
         
@@ -141,6 +205,11 @@ async def main():
         logger.error(f"❌ Startup error: {e}", exc_info=True)
         raise
     finally:
+        try:
+            await close_http_session()
+        except:
+            pass
+        
         try:
             await app.stop()
             logger.info("🛑 Bot stopped gracefully")
@@ -0,0 +1,140 @@
+"""
+💾 MEDIA CACHE - v11.2
+Persistent Telegram file_id cache
+Known URLs are re-sent by file_id in milliseconds instead of being
+downloaded, transcoded and uploaded again
+Key: normalized URL (SmartComparator.normalize_url) + quality for videos
+"""
+
+import os
+import json
+import time
+import logging
+from typing import Optional, List, Tuple
+from pyrogram import Client
+from pyrogram import utils as pyrogram_utils
+from pyrogram.file_id import FileType
+from pyrogram.types import Message
+from config import MEDIA_CACHE_FILE, MEDIA_CACHE_MAX_ENTRIES
+from comparator import SmartComparator
+import send_scheduler
+
+logger = logging.getLogger(__name__)
+
+_comparator = SmartComparator()
+_FILE_TYPES = {'video': FileType.VIDEO, 'photo': FileType.PHOTO, 'document': FileType.DOCUMENT}
+_cache: Optional[dict] = None
+
+
+def _load() -> dict:
+    global _cache
+    
+    if _cache is None:
+        _cache = {}
+        try:
+            if MEDIA_CACHE_FILE.exists():
+                with open(MEDIA_CACHE_FILE, 'r') as f:
+                    _cache = json.load(f)
+                logger.info(f"💾 Media cache loaded: {len(_cache)} entries")
+        except Exception as e:
+            logger.error(f"❌ Media cache load error: {e}")
+    
+    return _cache
+
+
+def _save():
+    try:
+        temp = str(MEDIA_CACHE_FILE) + '.tmp'
+        with open(temp, 'w') as f:
+            json.dump(_cache, f)
+        os.replace(temp, MEDIA_CACHE_FILE)
+    except Exception as e:
+        logger.error(f"❌ Media cache save error: {e}")
+
+
+def cache_key(url: str, file_type: str, quality: str = "") -> str:
+    """Videos are cached per quality, images/documents per URL only"""
+    normalized = _comparator.normalize_url(url)
+    if file_type == 'video':
+        return f"{normalized}|{quality}"
+    return normalized
+
+
+def get_cached(key: str) -> Optional[dict]:
+    return _load().get(key)
+
+
+def _describe(message: Message, suffix: str) -> Optional[dict]:
+    """Pull file_id + metadata out of a sent message"""
+    if message.video:
+        media, kind = message.video, 'video'
+    elif message.photo:
+        media, kind = message.photo, 'photo'
+    elif message.document:
+        media, kind = message.document, 'document'
+    elif message.animation:
+        media, kind = message.animation, 'video'
+    else:
+        return None
+    
+    thumbs = getattr(media, 'thumbs', None) or []
+    
+    return {
+        'kind': kind,
+        'file_id': media.file_id,
+        'thumb_file_id': thumbs[0].file_id if thumbs else None,
+        'duration': getattr(media, 'duration', 0) or 0,
+        'width': getattr(media, 'width', 0) or 0,
+        'height': getattr(media, 'height', 0) or 0,
+        'suffix': suffix
+    }
+
+
+def record(key: str, sent: List[Tuple[Message, str]]):
+    """
+    Store what was just uploaded
+    sent: [(message, caption_suffix)] in part order
+    """
+    parts = [_describe(message, suffix) for message, suffix in sent if message]
+    
+    if not parts or None in parts:
+        return
+    
+    cache = _load()
+    cache[key] = {'parts': parts, 'timestamp': time.time()}
+    
+    # Drop the oldest entries beyond the cap
+    if len(cache) > MEDIA_CACHE_MAX_ENTRIES:
+        oldest = sorted(cache, key=lambda k: cache[k].get('timestamp', 0))
+        for stale in oldest[:len(cache) - MEDIA_CACHE_MAX_ENTRIES]:
+            del cache[stale]
+    
+    _save()
+    logger.info(f"💾 Cached {len(parts)} file_id(s)")
+
+
+def forget(key: str):
+    cache = _load()
+    if cache.pop(key, None) is not None:
+        _save()
+
+
+async def send_cached(client: Client, chat_id: int, entry: dict, caption: str) -> bool:
+    """Re-send every part of a cached item by file_id"""
+    for part in entry['parts']:
+        part_caption = caption + part.get('suffix', '')
+        
+        try:
+            # file_id re-send keeps the stored video/document attributes
+            media = pyrogram_utils.get_input_media_from_file_id(
+                part['file_id'], _FILE_TYPES.get(part['kind'])
+            )
+            await send_scheduler.send_media(client, chat_id, media, part_caption)
+            
+        except Exception as e:
+            # Stale / foreign file_id - caller falls back to a real upload
+            logger.warning(f"⚠️ Cached send failed: {e}")
+            return False
+    
+    logger.info(f"⚡ Re-sent {len(entry['parts'])} part(s) from cache")
+    return True
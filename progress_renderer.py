@@ -0,0 +1,253 @@
+"""
+🖥️ PROGRESS RENDERER - v11.2
+One coalescing editor for every progress message
+- Producers call update(message, text) as often as they like - no API call
+- A single flusher edits each message at most once per PROGRESS_EDIT_INTERVAL,
+  only when its text changed, and at most PROGRESS_MAX_EDITS_PER_MINUTE overall
+- FloodWait pauses the chat (shared with the send scheduler) and backs off
+Progress costs a bounded number of API calls per minute, however many
+transfers are running
+🆕 v11.2 - BatchDashboard: one pinned message per batch, items render as
+lines in it instead of owning a status message each
+"""
+
+import time
+import asyncio
+import logging
+from typing import Dict, Optional, Callable, Union
+from pyrogram import raw
+from pyrogram import utils as pyrogram_utils
+from pyrogram.types import Message
+from pyrogram.errors import FloodWait, MessageNotModified
+from config import (
+    PROGRESS_EDIT_INTERVAL, PROGRESS_MAX_EDITS_PER_MINUTE, PROGRESS_IDLE_EXPIRY,
+    DASHBOARD_MAX_ITEMS
+)
+from utils import format_time
+import send_scheduler
+
+logger = logging.getLogger(__name__)
+
+_pending: Dict[tuple, dict] = {}
+_flusher: Optional[asyncio.Task] = None
+_stats = {'updates': 0, 'edits': 0, 'flood_waits': 0}
+
+
+def _key(message: Message) -> tuple:
+    return message.chat.id, message.id
+
+
+def update(message, text: Union[str, Callable[[], str]]):
+    """
+    Record the latest text for a progress message (never blocks)
+    text may be a callable - it is re-rendered on every flush (dashboards)
+    """
+    if message is None:
+        return
+    
+    if isinstance(message, DashboardSlot):
+        message.set_status(text)
+        return
+    
+    key = _key(message)
+    entry = _pending.get(key)
+    source = text if callable(text) else None
+    
+    if entry is None:
+        entry = _pending[key] = {
+            'message': message,
+            'text': source() if source else text,
+            'source': source,
+            'shown': None,
+            'next_at': 0.0,
+            'updated': time.monotonic()
+        }
+    else:
+        entry['text'] = source() if source else text
+        entry['source'] = source
+        entry['updated'] = time.monotonic()
+    
+    _stats['updates'] += 1
+    _ensure_flusher()
+
+
+def discard(message):
+    """Forget pending progress (message deleted or replaced by a status)"""
+    if message is not None and not isinstance(message, DashboardSlot):
+        _pending.pop(_key(message), None)
+
+
+def _ensure_flusher():
+    global _flusher
+    if _flusher is None or _flusher.done():
+        _flusher = asyncio.create_task(_flush_loop())
+
+
+async def _edit(entry: dict):
+    message = entry['message']
+    client = message._client
+    text = entry['text']
+    chat_id = message.chat.id
+    
+    entry['next_at'] = time.monotonic() + PROGRESS_EDIT_INTERVAL
+    
+    try:
+        # sleep_threshold=0: a FloodWait must never stall the flusher
+        await client.invoke(
+            raw.functions.messages.EditMessage(
+                peer=await client.resolve_peer(chat_id),
+                id=message.id,
+                **await pyrogram_utils.parse_text_entities(client, text, None, None)
+            ),
+            sleep_threshold=0
+        )
+        entry['shown'] = text
+        _stats['edits'] += 1
+        
+    except MessageNotModified:
+        entry['shown'] = text
+        
+    except FloodWait as e:
+        _stats['flood_waits'] += 1
+        send_scheduler.pause_chat(chat_id, e.value)
+        entry['next_at'] = time.monotonic() + e.value
+        
+    except Exception as e:
+        # Deleted / inaccessible message - stop rendering it
+        logger.debug(f"Progress edit dropped: {e}")
+        _pending.pop(_key(message), None)
+
+
+async def _flush_loop():
+    spacing = 60 / PROGRESS_MAX_EDITS_PER_MINUTE
+    
+    while _pending:
+        now = time.monotonic()
+        
+        for e in _pending.values():
+            if e['source']:
+                e['text'] = e['source']()
+                e['updated'] = now
+        
+        for key in [k for k, e in _pending.items()
+                    if e['text'] == e['shown'] and now - e['updated'] > PROGRESS_IDLE_EXPIRY]:
+            del _pending[key]
+        
+        due = [
+            e for e in _pending.values()
+            if e['text'] != e['shown']
+            and now >= e['next_at']
+            and not send_scheduler.is_paused(e['message'].chat.id)
+        ]
+        
+        if not due:
+            await asyncio.sleep(min(spacing, 1))
+            continue
+        
+        # Longest-waiting message first
+        await _edit(min(due, key=lambda e: e['next_at']))
+        await asyncio.sleep(spacing)
+
+
+class DashboardSlot:
+    """
+    Stand-in for one item's status message inside a BatchDashboard
+    progress_renderer.update / send_scheduler.edit set its line,
+    send_scheduler.delete removes it from the in-flight list
+    """
+    
+    def __init__(self, dashboard: 'BatchDashboard', idx: int, title: str):
+        self.dashboard = dashboard
+        self.idx = idx
+        self.title = title
+        self.status = "🚀 Processing..."
+    
+    def set_status(self, text: str):
+        # Header line + size/speed lines - the bar doesn't fit in one row
+        lines = [l.strip() for l in text.split('\n') if l.strip()]
+        keep = lines[:1] + [l for l in lines[1:] if l.startswith(('📦', '🚀', '📊'))]
+        self.status = " · ".join(keep)
+    
+    def close(self):
+        self.dashboard.slots.pop(self.idx, None)
+
+
+class BatchDashboard:
+    """
+    🆕 v11.2 - One live message per batch
+    In-flight items, counters and throughput, re-rendered in place by the
+    flusher - no per-item status messages
+    """
+    
+    def __init__(self, message: Message, total: int, counters: dict):
+        self.message = message
+        self.total = total
+        self.counters = counters
+        self.slots: Dict[int, DashboardSlot] = {}
+        self.start_time = time.time()
+        self.pinned = False
+    
+    @classmethod
+    async def start(cls, reply_to: Message, total: int, counters: dict) -> 'BatchDashboard':
+        message = await send_scheduler.reply(reply_to, "📊 **BATCH DASHBOARD**\n\n🚀 Starting...")
+        dashboard = cls(message, total, counters)
+        
+        # Silent pin, no both_sides (private chats reject it) - finish() unpins
+        try:
+            await send_scheduler.pin(message)
+            dashboard.pinned = True
+        except Exception:
+            pass
+        
+        update(message, dashboard.render)
+        return dashboard
+    
+    def slot(self, idx: int, title: str) -> DashboardSlot:
+        slot = DashboardSlot(self, idx, title)
+        self.slots[idx] = slot
+        return slot
+    
+    def render(self) -> str:
+        done = sum(self.counters.values())
+        elapsed = time.time() - self.start_time
+        # Items/min only means something after a little while
+        rate = done / elapsed * 60 if elapsed >= 10 else 0
+        eta = int((self.total - done) / rate * 60) if rate > 0 else 0
+        
+        text = (
+            f"📊 **BATCH DASHBOARD**\n\n"
+            f"📦 Done: {done}/{self.total}\n"
+            f"✔️ {self.counters['success']}  ❌ {self.counters['failed']}  "
+            f"⏭️ {self.counters['skipped']}\n"
+            f"⚡ {rate:.1f} items/min · ⏱️ {format_time(eta)} left\n"
+        )
+        
+        if self.slots:
+            text += f"\n🔄 **In flight ({len(self.slots)}):**\n"
+            for idx in sorted(self.slots)[:DASHBOARD_MAX_ITEMS]:
+                slot = self.slots[idx]
+                text += f"#{idx} {slot.title[:30]}\n   {slot.status}\n"
+            if len(self.slots) > DASHBOARD_MAX_ITEMS:
+                text += f"   ... +{len(self.slots) - DASHBOARD_MAX_ITEMS} more\n"
+        
+        return text
+    
+    async def finish(self):
+        self.slots.clear()
+        await send_scheduler.edit(self.message, self.render() + "\n✅ Finished")
+        
+        if self.pinned:
+            self.pinned = False
+            try:
+                await send_scheduler.pin(self.message, unpin=True)
+            except Exception:
+                pass
+
+
+def renderer_stats() -> dict:
+    return {
+        'messages': len(_pending),
+        'updates': _stats['updates'],
+        'edits': _stats['edits'],
+        'flood_waits': _stats['flood_waits']
+    }
@@ -0,0 +1,422 @@
+"""
+⚡ SEGMENTED RANGE DOWNLOADER - v11.2
+Multi-connection HTTP Range engine for direct video / file URLs
+- Checks Range support with a 1-byte probe
+- Preallocates the output file
+- Fetches N byte ranges in parallel straight into their offsets
+- Work stealing: idle connections split the largest remaining range
+- Resumable: a .state.json sidecar records validators + finished ranges
+- Live AIMD control of how many ranges are in flight
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import aiofiles
+from typing import Optional, Dict, List, Tuple, Callable, Awaitable
+from config import (
+    RANGE_CONNECTIONS, RANGE_MIN_CONNECTIONS, RANGE_MAX_CONNECTIONS,
+    RANGE_MIN_STEAL, RANGE_RETRIES, PROGRESS_REPORT_INTERVAL,
+    RESUME_STATE_SUFFIX
+)
+from http_session import get_http_session, HTTPStatusError
+from concurrency import AIMDController
+
+logger = logging.getLogger(__name__)
+
+# (downloaded, total, speed, connections)
+ProgressCallback = Callable[[int, int, float, int], Awaitable[None]]
+
+
+class _Segment:
+    """Byte range [start, end] being filled at pos (end is inclusive)"""
+    
+    __slots__ = ('start', 'end', 'pos')
+    
+    def __init__(self, start: int, end: int):
+        self.start = start
+        self.end = end
+        self.pos = start
+    
+    @property
+    def remaining(self) -> int:
+        return self.end - self.pos + 1
+
+
+class _Cancelled(Exception):
+    pass
+
+
+class _Yield(Exception):
+    """The AIMD window shrank - hand the rest of the range back"""
+
+
+async def probe_range_support(url: str, headers: Dict[str, str]) -> Optional[dict]:
+    """
+    Return {'total', 'etag', 'last_modified'} if the server honours byte
+    ranges, else None
+    Uses a 1-byte ranged GET - many CDNs reject or mis-handle HEAD
+    """
+    try:
+        session = await get_http_session()
+        probe_headers = dict(headers, Range='bytes=0-0')
+        probe_headers['Accept-Encoding'] = 'identity'
+        
+        async with session.get(url, headers=probe_headers) as response:
+            if response.status != 206:
+                return None
+            
+            # Content-Range: bytes 0-0/123456
+            content_range = response.headers.get('Content-Range', '')
+            if '/' not in content_range:
+                return None
+            
+            total = content_range.rsplit('/', 1)[1].strip()
+            if not total.isdigit():
+                return None
+            
+            return {
+                'total': int(total),
+                'etag': response.headers.get('ETag', ''),
+                'last_modified': response.headers.get('Last-Modified', '')
+            }
+            
+    except Exception as e:
+        logger.warning(f"Range probe failed: {e}")
+        return None
+
+
+def remote_from_headers(headers) -> Optional[dict]:
+    """
+    Same dict as probe_range_support, read from a plain 200 response
+    (Accept-Ranges: bytes + an unencoded Content-Length) - no extra round trip
+    """
+    length = headers.get('Content-Length', '')
+    
+    if ('bytes' not in headers.get('Accept-Ranges', '').lower()
+            or not length.isdigit()
+            or headers.get('Content-Encoding', 'identity').lower() != 'identity'):
+        return None
+    
+    return {
+        'total': int(length),
+        'etag': headers.get('ETag', ''),
+        'last_modified': headers.get('Last-Modified', '')
+    }
+
+
+def _split(gaps: List[Tuple[int, int]], count: int) -> List[_Segment]:
+    """Cut the missing [start, end) gaps into about count segments"""
+    missing = sum(end - start for start, end in gaps)
+    size = max(missing // count, 1)
+    segments = []
+    
+    for gap_start, gap_end in gaps:
+        start = gap_start
+        while start < gap_end:
+            end = min(start + size, gap_end) - 1
+            if gap_end - (end + 1) < size // 2:
+                end = gap_end - 1  # Fold a small tail into the last range
+            segments.append(_Segment(start, end))
+            start = end + 1
+    
+    return segments
+
+
+def _merge(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged = []
+    for start, end in sorted(r for r in ranges if r[1] > r[0]):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _gaps(done: List[Tuple[int, int]], total: int) -> List[Tuple[int, int]]:
+    gaps = []
+    cursor = 0
+    for start, end in _merge(done):
+        if start > cursor:
+            gaps.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < total:
+        gaps.append((cursor, total))
+    return gaps
+
+
+def state_path(output_path: str) -> str:
+    return output_path + RESUME_STATE_SUFFIX
+
+
+def _load_state(output_path: str, url: str, remote: dict) -> List[Tuple[int, int]]:
+    """
+    Completed ranges from a previous attempt, or [] if the sidecar is
+    missing, for another URL, or the remote file changed since
+    """
+    try:
+        sidecar = state_path(output_path)
+        if not os.path.exists(sidecar) or not os.path.exists(output_path):
+            return []
+        
+        with open(sidecar, 'r') as f:
+            state = json.load(f)
+        
+        if (
+            state.get('url') != url
+            or state.get('total') != remote['total']
+            or state.get('etag') != remote['etag']
+            or state.get('last_modified') != remote['last_modified']
+            or os.path.getsize(output_path) != remote['total']
+        ):
+            logger.info("🔄 Resume state is stale, starting over")
+            return []
+        
+        return [tuple(r) for r in state.get('done', [])]
+        
+    except Exception as e:
+        logger.warning(f"Resume state unreadable: {e}")
+        return []
+
+
+def _save_state(output_path: str, url: str, remote: dict, done: List[Tuple[int, int]]):
+    sidecar = state_path(output_path)
+    temp = sidecar + '.tmp'
+    
+    with open(temp, 'w') as f:
+        json.dump({
+            'url': url,
+            'total': remote['total'],
+            'etag': remote['etag'],
+            'last_modified': remote['last_modified'],
+            'done': [list(r) for r in _merge(done)]
+        }, f)
+    
+    os.replace(temp, sidecar)
+
+
+def remove_state(output_path: str):
+    """Drop the sidecar of a finished download"""
+    try:
+        if os.path.exists(state_path(output_path)):
+            os.remove(state_path(output_path))
+    except OSError:
+        pass
+
+
+def _if_range(remote: dict) -> Optional[str]:
+    """Strong ETag, else Last-Modified - weak ETags can't validate a range"""
+    etag = remote['etag']
+    if etag and not etag.startswith('W/'):
+        return etag
+    return remote['last_modified'] or None
+
+
+def resume_request(
+    output_path: str, url: str, remote: dict, headers: Dict[str, str]
+) -> Tuple[int, Dict[str, str]]:
+    """
+    (offset, headers) for one plain GET that continues a partial segmented
+    download from its first gap - (0, headers) when there is nothing to resume
+    """
+    gaps = _gaps(_load_state(output_path, url, remote), remote['total'])
+    validator = _if_range(remote)
+    
+    if not gaps or gaps[0][0] == 0 or not validator:
+        return 0, headers
+    
+    offset = gaps[0][0]
+    return offset, dict(
+        headers, Range=f"bytes={offset}-", **{'If-Range': validator, 'Accept-Encoding': 'identity'}
+    )
+
+
+def discard_state(output_path: str):
+    """Remove a partial download and its sidecar"""
+    for path in (output_path, state_path(output_path)):
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError:
+            pass
+
+
+async def download_ranges(
+    url: str,
+    output_path: str,
+    remote: dict,
+    headers: Dict[str, str],
+    user_id: int,
+    active_downloads: Dict[int, bool],
+    progress: Optional[ProgressCallback] = None,
+    connections: int = RANGE_CONNECTIONS
+) -> Optional[str]:
+    """
+    🚀 Download url into output_path over several parallel ranges
+    remote is the dict returned by probe_range_support
+    Returns output_path on success, None on failure or cancel.
+    On failure the partial file + sidecar stay so the next call resumes.
+    """
+    total_size = remote['total']
+    range_headers = dict(headers)
+    range_headers['Accept-Encoding'] = 'identity'  # Offsets must be raw bytes
+    
+    # If-Range: server sends 200 (-> error, not corrupt data) if the file changed
+    if _if_range(remote):
+        range_headers['If-Range'] = _if_range(remote)
+    
+    previous = _load_state(output_path, url, remote)
+    
+    if not previous:
+        # Preallocate so every range can write at its own offset
+        with open(output_path, 'wb') as f:
+            f.truncate(total_size)
+    
+    gaps = _gaps(previous, total_size)
+    resumed = total_size - sum(end - start for start, end in gaps)
+    if resumed:
+        logger.info(f"🔄 Resuming at {resumed}/{total_size} bytes")
+    
+    controller = AIMDController(
+        url, 'ranges', connections, RANGE_MIN_CONNECTIONS, RANGE_MAX_CONNECTIONS
+    ).start()
+    
+    pending = _split(gaps, controller.window)
+    segments = list(pending)
+    active: List[_Segment] = []
+    state = {'downloaded': resumed}
+    start_time = time.time()
+    session = await get_http_session()
+    
+    def completed() -> List[Tuple[int, int]]:
+        return previous + [(seg.start, seg.pos) for seg in segments]
+    
+    def next_segment() -> Optional[_Segment]:
+        if pending:
+            return pending.pop(0)
+        
+        # Work stealing - halve the range with the most bytes left
+        victim = max(active, key=lambda s: s.remaining, default=None)
+        if victim is None or victim.remaining < RANGE_MIN_STEAL * 2:
+            return None
+        
+        mid = victim.pos + victim.remaining // 2
+        stolen = _Segment(mid, victim.end)
+        victim.end = mid - 1
+        segments.append(stolen)
+        return stolen
+    
+    async def fetch(segment: _Segment):
+        req_headers = dict(range_headers, Range=f"bytes={segment.pos}-{segment.end}")
+        
+        async with session.get(url, headers=req_headers) as response:
+            if response.status != 206:
+                raise HTTPStatusError(response.status, url)
+            
+            # Unbuffered: bytes counted in the sidecar must really be written
+            async with aiofiles.open(output_path, 'r+b', buffering=0) as f:
+                await f.seek(segment.pos)
+                
+                async for chunk in response.content.iter_chunked(256 * 1024):
+                    if not active_downloads.get(user_id, False):
+                        raise _Cancelled()
+                    
+                    # end may have shrunk if another worker stole our tail
+                    chunk = chunk[:segment.remaining]
+                    await f.write(chunk)
+                    segment.pos += len(chunk)
+                    state['downloaded'] += len(chunk)
+                    controller.record_bytes(len(chunk))
+                    await controller.throttle(len(chunk))
+                    
+                    if segment.remaining <= 0:
+                        break
+                    
+                    if controller.over_window:
+                        raise _Yield()
+        
+        if segment.remaining > 0:
+            raise IOError(f"Range {segment.start}-{segment.end} ended early")
+    
+    async def worker():
+        while True:
+            await controller.acquire()
+            try:
+                segment = next_segment()
+                if segment is None:
+                    return
+                
+                active.append(segment)
+                try:
+                    for attempt in range(1, RANGE_RETRIES + 1):
+                        try:
+                            await fetch(segment)
+                            break
+                        except (_Cancelled, _Yield):
+                            raise
+                        except Exception as e:
+                            controller.record_error(getattr(e, 'status', None))
+                            if attempt == RANGE_RETRIES:
+                                raise
+                            logger.warning(f"Range retry {attempt}/{RANGE_RETRIES}: {e}")
+                            await asyncio.sleep(min(2 ** attempt, 30))
+                except _Yield:
+                    pending.insert(0, segment)
+                finally:
+                    active.remove(segment)
+            finally:
+                await controller.release()
+    
+    async def reporter():
+        while True:
+            await asyncio.sleep(PROGRESS_REPORT_INTERVAL)
+            try:
+                _save_state(output_path, url, remote, completed())
+            except Exception as e:
+                logger.warning(f"Resume state save failed: {e}")
+            
+            if progress:
+                elapsed = time.time() - start_time
+                speed = (state['downloaded'] - resumed) / elapsed if elapsed > 0 else 0
+                try:
+                    await progress(state['downloaded'], total_size, speed, controller.window)
+                except Exception:
+                    pass
+    
+    logger.info(f"⚡ Segmented download: {total_size} bytes over {controller.window} connections")
+    report_task = asyncio.create_task(reporter())
+    workers = [asyncio.create_task(worker()) for _ in range(controller.maximum)]
+    
+    try:
+        await asyncio.gather(*workers)
+        
+        elapsed = time.time() - start_time
+        speed = (total_size - resumed) / elapsed if elapsed > 0 else 0
+        logger.info(f"✅ Segmented download done in {elapsed:.1f}s ({speed / 1048576:.1f} MB/s)")
+        
+        report_task.cancel()
+        remove_state(output_path)
+        return output_path
+        
+    except _Cancelled:
+        logger.info("⛔ Segmented download cancelled")
+        report_task.cancel()
+        discard_state(output_path)
+        return None
+        
+    except Exception as e:
+        logger.error(f"Segmented download error: {e}")
+        report_task.cancel()
+        try:
+            _save_state(output_path, url, remote, completed())
+        except Exception:
+            pass
+        return None
+        
+    finally:
+        for task in workers:
+            task.cancel()
+        report_task.cancel()
+        await controller.finish()
@@ -0,0 +1,233 @@
+"""
+🧩 SEGMENT FETCHER - v11.2
+Shared engine for native HLS / DASH downloads
+- Parallel segment fetches over the shared HTTP pool
+- Live AIMD control of in-flight fragment requests
+- Ordered in-memory reassembly, flushed straight to the output file
+- Single ffmpeg copy step to remux / mux streams into MP4
+"""
+
+import os
+import time
+import asyncio
+import logging
+import aiofiles
+from typing import Optional, Dict, List, Callable, Awaitable
+from config import (
+    SEGMENT_CONCURRENCY, SEGMENT_RETRIES, PROGRESS_REPORT_INTERVAL,
+    MIN_WORKERS, MAX_WORKERS, SEGMENT_BUFFER_SIZE, SEGMENT_SIZE_HINT
+)
+from http_session import get_http_session, HTTPStatusError
+from concurrency import AIMDController
+from utils import format_size, create_progress_bar
+from ffmpeg_runner import run_process
+
+logger = logging.getLogger(__name__)
+
+# (segments_done, segments_total, bytes_done, speed, workers)
+SegmentProgress = Callable[[int, int, int, float, int], Awaitable[None]]
+# (segment_index, raw_bytes) -> bytes to write
+SegmentTransform = Callable[[int, bytes], Awaitable[bytes]]
+
+
+def render_segment_progress(
+    header: str, done: int, total: int,
+    downloaded: int, speed: float, workers: int
+) -> str:
+    """Progress text for segmented streams (total bytes is an estimate)"""
+    percent = done / total * 100 if total else 0
+    estimate = int(downloaded / done * total) if done else 0
+    
+    return (
+        f"{header}\n\n"
+        f"{create_progress_bar(percent)}\n\n"
+        f"🧩 Segments: {done}/{total}\n"
+        f"📦 {format_size(downloaded)} / ~{format_size(estimate)}\n"
+        f"🚀 {format_size(int(speed))}/s\n"
+        f"💪 Workers: {workers}"
+    )
+
+
+async def fetch_bytes(url: str, headers: Dict[str, str], byte_range: Optional[tuple] = None) -> bytes:
+    """GET a whole resource (or an inclusive byte range of it) into memory"""
+    session = await get_http_session()
+    req_headers = dict(headers)
+    
+    if byte_range:
+        req_headers['Range'] = f"bytes={byte_range[0]}-{byte_range[1]}"
+    
+    async with session.get(url, headers=req_headers) as response:
+        if response.status not in (200, 206):
+            raise HTTPStatusError(response.status, url)
+        return await response.read()
+
+
+async def fetch_text(url: str, headers: Dict[str, str]) -> tuple:
+    """GET a manifest - returns (text, final_url) so relative URIs resolve"""
+    session = await get_http_session()
+    
+    async with session.get(url, headers=headers) as response:
+        if response.status != 200:
+            raise HTTPStatusError(response.status, url)
+        return await response.text(), str(response.url)
+
+
+def read_ahead_window(segments: List[dict]) -> int:
+    """Segments allowed ahead of the writer so about SEGMENT_BUFFER_SIZE is buffered"""
+    sizes = [s['range'][1] - s['range'][0] + 1 for s in segments if s.get('range')]
+    size = max(sizes) if sizes else SEGMENT_SIZE_HINT
+    return max(2, SEGMENT_BUFFER_SIZE // size)
+
+
+async def fetch_segments(
+    segments: List[dict],
+    output_path: str,
+    headers: Dict[str, str],
+    user_id: int,
+    active_downloads: Dict[int, bool],
+    progress: Optional[SegmentProgress] = None,
+    transform: Optional[SegmentTransform] = None,
+    concurrency: int = SEGMENT_CONCURRENCY
+) -> bool:
+    """
+    🚀 Download segments in parallel and write them to output_path in order
+    Each segment is {'url': str, 'range': Optional[(start, end)]}
+    concurrency is the starting AIMD window
+    Returns True on success, False on failure or cancel
+    """
+    total = len(segments)
+    if total == 0:
+        return False
+    
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+    
+    controller = AIMDController(
+        segments[0]['url'], 'fragments', concurrency, MIN_WORKERS, MAX_WORKERS
+    ).start()
+    
+    # Bounds memory: workers can't run more than ~SEGMENT_BUFFER_SIZE ahead of the writer
+    window = asyncio.Semaphore(read_ahead_window(segments))
+    ready: Dict[int, bytes] = {}
+    ready_event = asyncio.Event()
+    state = {'done': 0, 'bytes': 0, 'failed': None}
+    start_time = time.time()
+    
+    def cancelled() -> bool:
+        return not active_downloads.get(user_id, False)
+    
+    async def worker():
+        while not queue.empty():
+            i = queue.get_nowait()
+            await window.acquire()
+            
+            for attempt in range(1, SEGMENT_RETRIES + 1):
+                if cancelled() or state['failed']:
+                    return
+                try:
+                    async with controller.slot():
+                        data = await fetch_bytes(
+                            segments[i]['url'], headers, segments[i].get('range')
+                        )
+                    controller.record_bytes(len(data))
+                    await controller.throttle(len(data))
+                    
+                    if transform:
+                        data = await transform(i, data)
+                    break
+                except Exception as e:
+                    controller.record_error(getattr(e, 'status', None))
+                    if attempt == SEGMENT_RETRIES:
+                        state['failed'] = f"segment {i}: {e}"
+                        ready_event.set()
+                        return
+                    await asyncio.sleep(min(2 ** attempt, 15))
+            
+            ready[i] = data
+            state['bytes'] += len(data)
+            ready_event.set()
+    
+    async def writer():
+        next_index = 0
+        async with aiofiles.open(output_path, 'wb') as f:
+            while next_index < total:
+                if state['failed'] or cancelled():
+                    return
+                
+                if next_index not in ready:
+                    ready_event.clear()
+                    try:
+                        await asyncio.wait_for(ready_event.wait(), 1)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                
+                await f.write(ready.pop(next_index))
+                window.release()
+                next_index += 1
+                state['done'] = next_index
+    
+    async def reporter():
+        while True:
+            await asyncio.sleep(PROGRESS_REPORT_INTERVAL)
+            elapsed = time.time() - start_time
+            speed = state['bytes'] / elapsed if elapsed > 0 else 0
+            try:
+                await progress(state['done'], total, state['bytes'], speed, controller.window)
+            except Exception:
+                pass
+    
+    report_task = asyncio.create_task(reporter()) if progress else None
+    workers = [asyncio.create_task(worker()) for _ in range(min(controller.maximum, total))]
+    
+    try:
+        await writer()
+    finally:
+        for task in workers:
+            task.cancel()
+        if report_task:
+            report_task.cancel()
+        await controller.finish()
+    
+    if cancelled():
+        logger.info("⛔ Segment download cancelled")
+        return False
+    
+    if state['failed']:
+        logger.error(f"Segment download failed: {state['failed']}")
+        return False
+    
+    elapsed = time.time() - start_time
+    logger.info(
+        f"✅ {total} segments, {state['bytes'] / 1048576:.1f}MB in {elapsed:.1f}s"
+    )
+    return True
+
+
+async def mux_to_mp4(inputs: List[str], output_path: str) -> bool:
+    """
+    Remux (one input) or mux (video + audio inputs) into a faststart MP4
+    Stream copy only - no re-encoding
+    """
+    try:
+        cmd = ['ffmpeg', '-y']
+        for path in inputs:
+            cmd += ['-i', path]
+        
+        if len(inputs) > 1:
+            cmd += ['-map', '0:v:0?', '-map', '1:a:0?']
+        
+        cmd += ['-c', 'copy', '-movflags', '+faststart', output_path]
+        
+        result = await run_process(cmd, timeout=600)
+        
+        if result.returncode == 0 and os.path.exists(output_path):
+            return True
+        
+        logger.error(f"Mux failed: {result.stderr[-300:]}")
+        return False
+        
+    except Exception as e:
+        logger.error(f"Mux error: {e}")
+        return False
@@ -0,0 +1,250 @@
+"""
+📮 SEND SCHEDULER - v11.2
+One FloodWait-aware gate for every outgoing Telegram message
+- Global token bucket (SEND_GLOBAL_RATE messages/s across all chats)
+- Per-chat buckets (private chats vs groups/channels)
+- FloodWait pauses ONLY the affected chat; the call waits in that
+  chat's queue instead of sleeping inside a handler
+- Every call is a raw invoke with sleep_threshold=0, so pyrogram never
+  sleeps through a short FloodWait behind the scheduler's back
+Uploads, failed-link notices and batch status messages all go through here
+"""
+
+import time
+import asyncio
+import logging
+from typing import Dict, List, Optional
+from pyrogram import Client, raw, enums
+from pyrogram import utils as pyrogram_utils
+from pyrogram.types import Message, Chat
+from pyrogram.errors import FloodWait
+from config import (
+    SEND_GLOBAL_RATE, SEND_GLOBAL_BURST, SEND_PRIVATE_RATE,
+    SEND_GROUP_RATE, SEND_CHAT_BURST, SEND_MAX_RETRIES
+)
+import progress_renderer
+
+logger = logging.getLogger(__name__)
+
+
+class _Bucket:
+    """Token bucket with FIFO waiters and a FloodWait pause"""
+    
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last_refill = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+        self.flood_waits = 0
+        self.sent = 0
+    
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+        self.flood_waits += 1
+    
+    async def take(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                
+                self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.sent += 1
+                    return
+                
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+_global = _Bucket(SEND_GLOBAL_RATE, SEND_GLOBAL_BURST)
+_chats: Dict[int, _Bucket] = {}
+
+
+def _chat_bucket(chat_id: int) -> _Bucket:
+    if chat_id not in _chats:
+        # Negative ids are groups/channels - Telegram allows ~20 msgs/min there
+        rate = SEND_GROUP_RATE if chat_id < 0 else SEND_PRIVATE_RATE
+        _chats[chat_id] = _Bucket(rate, SEND_CHAT_BURST)
+    return _chats[chat_id]
+
+
+def pause_chat(chat_id: int, seconds: float):
+    """FloodWait seen elsewhere (progress edits) - hold this chat's queue too"""
+    _chat_bucket(chat_id).pause(seconds)
+
+
+def is_paused(chat_id: int) -> bool:
+    bucket = _chats.get(chat_id)
+    return bool(bucket) and bucket.paused_until > time.monotonic()
+
+
+async def send(chat_id: int, call, *args, **kwargs):
+    """
+    Run one Telegram call once both buckets allow it
+    FloodWait → pause this chat for e.value and re-queue the call
+    Use invoke() / the helpers below - a high-level client method would
+    sleep through FloodWaits under client.sleep_threshold by itself
+    """
+    bucket = _chat_bucket(chat_id)
+    
+    for attempt in range(SEND_MAX_RETRIES):
+        # Chat first: a paused chat must not hold a global token
+        await bucket.take()
+        await _global.take()
+        
+        try:
+            return await call(*args, **kwargs)
+            
+        except FloodWait as e:
+            logger.warning(f"⏳ FloodWait {e.value}s on chat {chat_id} - pausing that chat only")
+            bucket.pause(e.value)
+            
+            if attempt == SEND_MAX_RETRIES - 1:
+                raise
+
+
+async def invoke(client: Client, chat_id: int, query):
+    """Scheduled raw call - sleep_threshold=0 hands every FloodWait to send()"""
+    return await send(chat_id, client.invoke, query, sleep_threshold=0)
+
+
+async def _parse_sent(client: Client, r) -> List[Message]:
+    """Messages created by a send RPC"""
+    users = {u.id: u for u in r.users}
+    chats = {c.id: c for c in r.chats}
+    return [
+        await Message._parse(client, update.message, users, chats)
+        for update in r.updates
+        if isinstance(update, (raw.types.UpdateNewMessage, raw.types.UpdateNewChannelMessage))
+    ]
+
+
+async def send_text(
+    client: Client, chat_id: int, text: str,
+    reply_to: Optional[int] = None, web_preview: bool = True
+) -> Optional[Message]:
+    """Scheduled send_message"""
+    r = await invoke(client, chat_id, raw.functions.messages.SendMessage(
+        peer=await client.resolve_peer(chat_id),
+        random_id=client.rnd_id(),
+        reply_to_msg_id=reply_to,
+        no_webpage=None if web_preview else True,
+        **await pyrogram_utils.parse_text_entities(client, text, None, None)
+    ))
+    
+    if isinstance(r, raw.types.UpdateShortSentMessage):
+        # Short form (private chats) - id + chat is all a status message needs
+        return Message(
+            id=r.id,
+            chat=Chat(id=chat_id, type=enums.ChatType.PRIVATE, client=client),
+            text=text,
+            client=client
+        )
+    
+    sent = await _parse_sent(client, r)
+    return sent[0] if sent else None
+
+
+async def send_media(client: Client, chat_id: int, media, caption: str) -> Optional[Message]:
+    """Scheduled SendMedia for a raw InputMedia (uploaded file or file_id)"""
+    r = await invoke(client, chat_id, raw.functions.messages.SendMedia(
+        peer=await client.resolve_peer(chat_id),
+        media=media,
+        random_id=client.rnd_id(),
+        **await pyrogram_utils.parse_text_entities(client, caption, None, None)
+    ))
+    
+    sent = await _parse_sent(client, r)
+    return sent[0] if sent else None
+
+
+async def send_album(client: Client, chat_id: int, media: List[tuple]) -> List[Message]:
+    """Scheduled media group - media is [(raw InputMedia, caption)]"""
+    multi_media = [
+        raw.types.InputSingleMedia(
+            media=item,
+            random_id=client.rnd_id(),
+            **await pyrogram_utils.parse_text_entities(client, caption, None, None)
+        )
+        for item, caption in media
+    ]
+    
+    r = await invoke(client, chat_id, raw.functions.messages.SendMultiMedia(
+        peer=await client.resolve_peer(chat_id),
+        multi_media=multi_media
+    ))
+    
+    return await _parse_sent(client, r)
+
+
+async def reply(message: Message, text: str) -> Optional[Message]:
+    """Scheduled message.reply_text"""
+    return await send_text(message._client, message.chat.id, text, reply_to=message.id)
+
+
+async def edit(message: Message, text: str):
+    """Scheduled status edit - failures are never fatal"""
+    if isinstance(message, progress_renderer.DashboardSlot):
+        message.set_status(text)
+        return None
+    
+    progress_renderer.discard(message)
+    client = message._client
+    try:
+        return await invoke(client, message.chat.id, raw.functions.messages.EditMessage(
+            peer=await client.resolve_peer(message.chat.id),
+            id=message.id,
+            **await pyrogram_utils.parse_text_entities(client, text, None, None)
+        ))
+    except Exception:
+        return None
+
+
+async def delete(message: Message):
+    """Scheduled delete - failures are never fatal"""
+    if isinstance(message, progress_renderer.DashboardSlot):
+        message.close()
+        return None
+    
+    progress_renderer.discard(message)
+    client = message._client
+    try:
+        peer = await client.resolve_peer(message.chat.id)
+        
+        if isinstance(peer, raw.types.InputPeerChannel):
+            query = raw.functions.channels.DeleteMessages(channel=peer, id=[message.id])
+        else:
+            query = raw.functions.messages.DeleteMessages(id=[message.id], revoke=True)
+        
+        return await invoke(client, message.chat.id, query)
+    except Exception:
+        return None
+
+
+async def pin(message: Message, unpin: bool = False):
+    """Scheduled silent pin (or unpin) of one of our messages"""
+    client = message._client
+    return await invoke(client, message.chat.id, raw.functions.messages.UpdatePinnedMessage(
+        peer=await client.resolve_peer(message.chat.id),
+        id=message.id,
+        silent=True,
+        unpin=unpin or None
+    ))
+
+
+def scheduler_stats() -> dict:
+    return {
+        'sent': _global.sent,
+        'chats': len(_chats),
+        'flood_waits': sum(b.flood_waits for b in _chats.values()),
+        'paused_chats': sum(1 for b in _chats.values() if b.paused_until > time.monotonic())
+    }
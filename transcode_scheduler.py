@@ -0,0 +1,155 @@
+"""
+🧮 TRANSCODE SCHEDULER - v11.2
+Bounded, CPU-aware pool for ffmpeg encodes shared by all users
+- Slot count derived from the cores this process may use
+- Every slot owns a disjoint CPU set and a matching -threads budget
+- Encoders run niced, off the reserved core(s), so the event loop stays responsive
+- Jobs that don't get a slot wait in a priority queue (lowest first, FIFO on ties)
+"""
+
+import os
+import time
+import heapq
+import shutil
+import asyncio
+import logging
+import itertools
+from contextlib import asynccontextmanager
+from typing import List, NamedTuple, Optional
+from config import (
+    TRANSCODE_SLOTS, TRANSCODE_THREADS_PER_JOB,
+    TRANSCODE_RESERVED_CORES, TRANSCODE_NICE
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TranscodeSlot(NamedTuple):
+    index: int
+    threads: int
+    cpus: Optional[List[int]]
+    prefix: List[str]
+
+
+def _usable_cpus() -> List[int]:
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+    
+    # Keep the reserved core(s) for the bot itself when there is room
+    if len(cpus) > TRANSCODE_RESERVED_CORES:
+        return cpus[TRANSCODE_RESERVED_CORES:]
+    return cpus
+
+
+def _launcher(cpus: Optional[List[int]]) -> List[str]:
+    """
+    Command prefix for the encoder: lower priority + pin to the slot's CPUs
+    A wrapper, not preexec_fn - a Python callback in a forked child of this
+    threaded process can deadlock on a copied lock
+    """
+    prefix = []
+    if TRANSCODE_NICE and shutil.which('nice'):
+        prefix += ['nice', '-n', str(TRANSCODE_NICE)]
+    if cpus and shutil.which('taskset'):
+        prefix += ['taskset', '-c', ','.join(map(str, cpus))]
+    return prefix
+
+
+class _TranscodePool:
+
+    def __init__(self):
+        cpus = _usable_cpus()
+        
+        self.size = TRANSCODE_SLOTS or max(1, len(cpus) // TRANSCODE_THREADS_PER_JOB)
+        self.threads = max(1, len(cpus) // self.size)
+        
+        self.slots = []
+        for i in range(self.size):
+            # More slots than cores (manual override) - no pinning for the extras
+            slot_cpus = cpus[i * self.threads:(i + 1) * self.threads] or None
+            self.slots.append(TranscodeSlot(i, self.threads, slot_cpus, _launcher(slot_cpus)))
+        
+        self.free = list(range(self.size))
+        self.waiters = []
+        self.sequence = itertools.count()
+        self.completed = 0
+        self.total_wait = 0.0
+        
+        logger.info(
+            f"🧮 Transcode pool: {self.size} slots × {self.threads} threads "
+            f"on CPUs {cpus}"
+        )
+    
+    def queued(self) -> int:
+        return sum(1 for _, _, fut in self.waiters if not fut.done())
+    
+    async def acquire(self, priority: float) -> TranscodeSlot:
+        if self.free and not self.queued():
+            return self.slots[self.free.pop(0)]
+        
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.sequence), fut))
+        
+        try:
+            return await fut
+        except asyncio.CancelledError:
+            # Handed a slot in the same tick we were cancelled - pass it on
+            if fut.done() and not fut.cancelled():
+                self.release(fut.result())
+            raise
+    
+    def release(self, slot: TranscodeSlot):
+        while self.waiters:
+            _, _, fut = heapq.heappop(self.waiters)
+            if not fut.done():
+                fut.set_result(slot)
+                return
+        self.free.append(slot.index)
+
+
+_pool: Optional[_TranscodePool] = None
+
+
+def _get_pool() -> _TranscodePool:
+    global _pool
+    if _pool is None:
+        _pool = _TranscodePool()
+    return _pool
+
+
+@asynccontextmanager
+async def transcode_slot(priority: float = 0):
+    """
+    Hold one encoder slot for the duration of the block
+    Use slot.threads for -threads and run slot.prefix + cmd
+    """
+    pool = _get_pool()
+    queued_at = time.monotonic()
+    
+    slot = await pool.acquire(priority)
+    waited = time.monotonic() - queued_at
+    
+    if waited > 1:
+        logger.info(f"🧮 Transcode slot {slot.index} after {waited:.1f}s in queue")
+    
+    try:
+        yield slot
+    finally:
+        pool.completed += 1
+        pool.total_wait += waited
+        pool.release(slot)
+
+
+def transcode_stats() -> dict:
+    """Snapshot for /stats"""
+    pool = _get_pool()
+    return {
+        'slots': pool.size,
+        'threads': pool.threads,
+        'busy': pool.size - len(pool.free),
+        'queued': pool.queued(),
+        'completed': pool.completed,
+        'avg_wait': pool.total_wait / pool.completed if pool.completed else 0.0
+    }
@@ -2,17 +2,28 @@ import os
 import asyncio
 import logging
 import time
-import subprocess
-import json
-from typing import Optional, List
+import io
+import math
+from typing import Optional, List, AsyncIterator
 from pathlib import Path
-from pyrogram import Client
+from pyrogram import Client, raw
+from pyrogram import utils as pyrogram_utils
 from pyrogram.types import Message
-from pyrogram.errors import FloodWait, RPCError
+from pyrogram.errors import FloodWait, RPCError, FilePartMissing
+from pyrogram.session import Session
+from pyrogram.file_id import FileType
 from utils import format_size, format_time, create_progress_bar
+import media_cache
+import send_scheduler
+import progress_renderer
+from ffmpeg_runner import run_process
+from video_processor import probe, video_stream
+from downloader import iter_split_video
 from config import (
     UPLOAD_CHUNK_SIZE, SAFE_SPLIT_SIZE, 
-    UPLOAD_PROGRESS_INTERVAL, DOWNLOAD_DIR
+    UPLOAD_PROGRESS_INTERVAL, DOWNLOAD_DIR, PARALLEL_PART_UPLOADS,
+    MAX_UPLOAD_PART_SIZE, BIG_FILE_THRESHOLD, UPLOAD_SESSIONS,
+    UPLOAD_WORKERS_PER_SESSION, UPLOAD_PART_RETRIES, UPLOAD_RESUME_TTL
 )
 
 logger = logging.getLogger(__name__)
@@ -32,7 +43,7 @@ class UploadProgressTracker:
         self.speeds = []
     
     async def progress_callback(self, current: int, total: int):
-        """Real-time progress"""
+        """Real-time progress (rendered by progress_renderer)"""
         try:
             now = time.time()
             
@@ -61,7 +72,8 @@ class UploadProgressTracker:
                 if self.total_parts > 1:
                     part_info = f"📊 Part {self.part_num}/{self.total_parts}\n"
                 
-                await self.progress_msg.edit_text(
+                progress_renderer.update(
+                    self.progress_msg,
                     f"📤 **UPLOADING**\n\n"
                     f"{part_info}"
                     f"{bar}\n\n"
@@ -69,48 +81,34 @@ class UploadProgressTracker:
                     f"🚀 {format_size(int(avg_speed))}/s\n"
                     f"⏱️ {format_time(eta)}"
                 )
-        except FloodWait as e:
-            await asyncio.sleep(e.value)
         except:
             pass
 
 
-def get_video_metadata(video_path: str) -> dict:
+async def get_video_metadata(video_path: str) -> dict:
     """
     ⚡ FAST metadata extraction for ALL parts
     Gets duration, width, height for proper display
     """
     try:
-        cmd = [
-            'ffprobe', '-v', 'quiet',
-            '-print_format', 'json',
-            '-show_format', '-show_streams',
-            video_path
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+        data = await probe(video_path)
         
-        if result.returncode != 0:
+        if data is None:
             return {'duration': 0, 'width': 1280, 'height': 720}
         
-        data = json.loads(result.stdout)
-        
         # Get duration
         duration = 0
         if 'format' in data and 'duration' in data['format']:
             duration = int(float(data['format']['duration']))
         
         # Get video stream
-        video_stream = next(
-            (s for s in data.get('streams', []) if s.get('codec_type') == 'video'),
-            {}
-        )
+        stream = video_stream(data)
         
-        width = video_stream.get('width', 1280)
-        height = video_stream.get('height', 720)
+        width = stream.get('width', 1280)
+        height = stream.get('height', 720)
         
-        if duration == 0 and 'duration' in video_stream:
-            duration = int(float(video_stream['duration']))
+        if duration == 0 and 'duration' in stream:
+            duration = int(float(stream['duration']))
         
         return {
             'duration': max(duration, 1),  # At least 1 second
@@ -123,7 +121,7 @@ def get_video_metadata(video_path: str) -> dict:
         return {'duration': 0, 'width': 1280, 'height': 720}
 
 
-def generate_thumbnail_for_part(video_path: str, thumb_path: str) -> bool:
+async def generate_thumbnail_for_part(video_path: str, thumb_path: str) -> bool:
     """
     ⚡ Generate thumbnail for ANY part (even if short duration)
     """
@@ -139,7 +137,7 @@ def generate_thumbnail_for_part(video_path: str, thumb_path: str) -> bool:
             thumb_path
         ]
         
-        result = subprocess.run(cmd, capture_output=True, timeout=15)
+        result = await run_process(cmd, timeout=15)
         
         if result.returncode == 0 and os.path.exists(thumb_path):
             if os.path.getsize(thumb_path) > 1024:
@@ -147,7 +145,7 @@ def generate_thumbnail_for_part(video_path: str, thumb_path: str) -> bool:
         
         # Fallback: Try at start (0s)
         cmd[2] = '00:00:00'
-        result = subprocess.run(cmd, capture_output=True, timeout=15)
+        result = await run_process(cmd, timeout=15)
         
         if os.path.exists(thumb_path) and os.path.getsize(thumb_path) > 1024:
             return True
@@ -158,6 +156,22 @@ def generate_thumbnail_for_part(video_path: str, thumb_path: str) -> bool:
         return False
 
 
+async def thumbnail_for_part(
+    i: int, part_path: str, first_thumb: Optional[str] = None
+) -> Optional[str]:
+    """
+    Part 1 reuses the video's own thumbnail when there is one
+    (its frame is within the first 15s), other parts get a fresh one
+    """
+    if i == 1 and first_thumb and os.path.exists(first_thumb):
+        return first_thumb
+    
+    part_thumb_path = str(DOWNLOAD_DIR / f"thumb_{Path(part_path).stem}.jpg")
+    if await generate_thumbnail_for_part(part_path, part_thumb_path):
+        return part_thumb_path
+    return None
+
+
 def find_all_parts(base_path: str) -> List[str]:
     """
     🔍 Find all parts - OPTIMIZED
@@ -194,6 +208,574 @@ def find_all_parts(base_path: str) -> List[str]:
     return []
 
 
+def upload_part_size() -> int:
+    """
+    MTProto part size from UPLOAD_CHUNK_SIZE
+    Telegram accepts 1KB..512KB parts that divide 512KB evenly
+    """
+    size = 1024
+    while size * 2 <= min(UPLOAD_CHUNK_SIZE, MAX_UPLOAD_PART_SIZE):
+        size *= 2
+    return size
+
+
+# 🆕 v11.2 - Resumable uploads: (path, size, mtime) → file id + accepted parts
+_upload_states = {}
+
+
+def get_upload_state(
+    client: Client, path: str, part_size: int, total_parts: int, offset: int = 0
+) -> dict:
+    """
+    Reuse the file id and accepted parts of an earlier attempt on the
+    same file, so a retry only sends what the server is still missing
+    """
+    now = time.time()
+    
+    for key in [k for k, v in _upload_states.items() if now - v['updated'] > UPLOAD_RESUME_TTL]:
+        del _upload_states[key]
+    
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, offset)
+    state = _upload_states.get(key)
+    
+    if not state or state['part_size'] != part_size or state['total_parts'] != total_parts:
+        state = {
+            'file_id': client.rnd_id(),
+            'part_size': part_size,
+            'total_parts': total_parts,
+            'accepted': set(),
+            'updated': now
+        }
+        _upload_states[key] = state
+    
+    return state
+
+
+def forget_upload(path: str):
+    """Drop resume state once the file has been sent"""
+    path = os.path.abspath(path)
+    for key in [k for k in _upload_states if k[0] == path]:
+        del _upload_states[key]
+
+
+async def save_file_parallel(
+    client: Client,
+    path: str,
+    progress=None,
+    offset: int = 0,
+    length: Optional[int] = None,
+    name: Optional[str] = None
+):
+    """
+    🆕 v11.2 - Parallel chunk upload engine
+    Splits one file into big-file parts and pushes them over
+    UPLOAD_SESSIONS media-DC connections at once
+    Parts the server already accepted in an earlier attempt are skipped
+    offset/length upload a byte-range slice of the file as its own file
+    Returns InputFileBig (or pyrogram's InputFile for small files), None on failure
+    """
+    if length is None:
+        length = os.path.getsize(path) - offset
+    file_size = length
+    name = name or os.path.basename(path)
+    
+    # Small files need SaveFilePart + md5 - pyrogram's single stream is fine there
+    if file_size <= BIG_FILE_THRESHOLD:
+        if offset == 0 and file_size == os.path.getsize(path):
+            return await client.save_file(path, progress=progress)
+        
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = io.BytesIO(f.read(file_size))
+        data.name = name
+        return await client.save_file(data, progress=progress)
+    
+    limit_mib = 4000 if client.me.is_premium else 2000
+    if file_size > limit_mib * 1024 * 1024:
+        raise ValueError(f"Can't upload files bigger than {limit_mib} MiB")
+    
+    part_size = upload_part_size()
+    total_parts = math.ceil(file_size / part_size)
+    state = get_upload_state(client, path, part_size, total_parts, offset)
+    file_id = state['file_id']
+    accepted = state['accepted']
+    
+    pending = asyncio.Queue()
+    for part in range(total_parts):
+        if part not in accepted:
+            pending.put_nowait(part)
+    
+    uploaded = min(len(accepted) * part_size, file_size)
+    failed = []
+    
+    if accepted:
+        logger.info(
+            f"♻️ Resuming upload: {len(accepted)}/{total_parts} parts already on server"
+        )
+    
+    async with client.save_file_semaphore:
+        sessions = [
+            Session(
+                client, await client.storage.dc_id(), await client.storage.auth_key(),
+                await client.storage.test_mode(), is_media=True
+            )
+            for _ in range(max(1, UPLOAD_SESSIONS))
+        ]
+        
+        fd = os.open(path, os.O_RDONLY)
+        
+        async def worker(session: Session):
+            nonlocal uploaded
+            
+            while not failed:
+                try:
+                    part = pending.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                
+                size = min(part_size, file_size - part * part_size)
+                chunk = await asyncio.to_thread(os.pread, fd, size, offset + part * part_size)
+                
+                for attempt in range(UPLOAD_PART_RETRIES):
+                    try:
+                        await session.invoke(
+                            raw.functions.upload.SaveBigFilePart(
+                                file_id=file_id,
+                                file_part=part,
+                                file_total_parts=total_parts,
+                                bytes=chunk
+                            )
+                        )
+                        accepted.add(part)
+                        state['updated'] = time.time()
+                        break
+                    except FloodWait as e:
+                        await asyncio.sleep(e.value)
+                    except Exception as e:
+                        logger.warning(f"⚠️ Part {part} retry {attempt + 1}: {e}")
+                        await asyncio.sleep(1)
+                else:
+                    failed.append(part)
+                    return
+                
+                uploaded += len(chunk)
+                if progress:
+                    await progress(uploaded, file_size)
+        
+        try:
+            await asyncio.gather(*(session.start() for session in sessions))
+            
+            workers = [
+                worker(session)
+                for session in sessions
+                for _ in range(UPLOAD_WORKERS_PER_SESSION)
+            ]
+            await asyncio.gather(*workers)
+            
+        except Exception as e:
+            logger.error(f"❌ Parallel upload error: {e}")
+            return None
+        
+        finally:
+            os.close(fd)
+            await asyncio.gather(
+                *(session.stop() for session in sessions),
+                return_exceptions=True
+            )
+    
+    if failed:
+        logger.error(f"❌ Upload gave up on part {failed[0]}")
+        return None
+    
+    logger.info(
+        f"⚡ Uploaded {total_parts} × {part_size // 1024}KB parts over "
+        f"{len(sessions)} connections"
+    )
+    
+    return raw.types.InputFileBig(
+        id=file_id,
+        parts=total_parts,
+        name=name
+    )
+
+
+def build_uploaded_media(
+    client: Client,
+    path: str,
+    file,
+    file_type: str,
+    thumb=None,
+    duration: int = 0,
+    width: int = 1280,
+    height: int = 720,
+    file_name: Optional[str] = None
+):
+    """InputMediaUploadedDocument for an uploaded video/document"""
+    attributes = [raw.types.DocumentAttributeFilename(file_name=file_name or os.path.basename(path))]
+    
+    if file_type == 'video':
+        attributes.insert(0, raw.types.DocumentAttributeVideo(
+            supports_streaming=True,
+            duration=duration,
+            w=width,
+            h=height
+        ))
+    
+    return raw.types.InputMediaUploadedDocument(
+        mime_type=client.guess_mime_type(path) or (
+            "video/mp4" if file_type == 'video' else "application/zip"
+        ),
+        file=file,
+        thumb=thumb,
+        attributes=attributes
+    )
+
+
+async def send_file_fast(
+    client: Client,
+    chat_id: int,
+    path: str,
+    caption: str,
+    file_type: str,
+    progress=None,
+    thumb_path: Optional[str] = None,
+    duration: int = 0,
+    width: int = 1280,
+    height: int = 720,
+    offset: int = 0,
+    length: Optional[int] = None,
+    file_name: Optional[str] = None
+) -> Optional[Message]:
+    """send_video / send_document equivalent on top of save_file_parallel"""
+    file = await save_file_parallel(client, path, progress, offset, length, file_name)
+    if file is None:
+        raise IOError("upload failed")
+    
+    thumb = None
+    if thumb_path and os.path.exists(thumb_path):
+        thumb = await client.save_file(thumb_path)
+    
+    media = build_uploaded_media(
+        client, path, file, file_type, thumb, duration, width, height, file_name
+    )
+    
+    msg = await send_uploaded_media(client, chat_id, media, caption, path, offset)
+    forget_upload(path)
+    
+    return msg
+
+
+async def send_file_retrying(client: Client, chat_id: int, path: str, *args, label: str = "File", **kwargs) -> Optional[Message]:
+    """
+    send_file_fast with the same bounded retry as the part loops
+    Each retry resumes the upload state, so only missing parts go up again
+    Raises the last error after 3 attempts
+    """
+    for attempt in range(1, 4):
+        try:
+            return await send_file_fast(client, chat_id, path, *args, **kwargs)
+        except Exception as e:
+            logger.error(f"❌ {label} error (attempt {attempt}/3): {e}")
+            if attempt == 3:
+                raise
+            await asyncio.sleep(5)
+
+
+async def save_file_part(client: Client, path: str, file, part: int, offset: int = 0):
+    """Re-send one part the server reports as missing"""
+    if isinstance(file, raw.types.InputFileBig):
+        part_size = upload_part_size()
+        rpc = raw.functions.upload.SaveBigFilePart
+        extra = {'file_total_parts': file.parts}
+    else:
+        part_size = MAX_UPLOAD_PART_SIZE
+        rpc = raw.functions.upload.SaveFilePart
+        extra = {}
+    
+    with open(path, 'rb') as f:
+        f.seek(offset + part * part_size)
+        chunk = f.read(part_size)
+    
+    await client.invoke(rpc(file_id=file.id, file_part=part, bytes=chunk, **extra))
+
+
+async def send_uploaded_media(
+    client: Client,
+    chat_id: int,
+    media,
+    caption: str,
+    source_path: Optional[str] = None,
+    source_offset: int = 0
+) -> Optional[Message]:
+    """
+    Final SendMedia for an already uploaded InputFile
+    Mirrors pyrogram's send_video tail, including FilePartMissing repair
+    Goes through the send scheduler (per-chat + global rate, FloodWait)
+    """
+    while True:
+        try:
+            return await send_scheduler.send_media(client, chat_id, media, caption)
+        except FilePartMissing as e:
+            if not source_path:
+                raise
+            await save_file_part(client, source_path, media.file, e.value, source_offset)
+
+
+async def photo_input_media(client: Client, chat_id: int, source: str):
+    """
+    Raw InputMediaPhoto for a media group from a local path (uploaded
+    first, like send_media_group does) or a cached file_id
+    """
+    if not os.path.isfile(source):
+        return pyrogram_utils.get_input_media_from_file_id(source, FileType.PHOTO)
+    
+    uploaded = await client.invoke(
+        raw.functions.messages.UploadMedia(
+            peer=await client.resolve_peer(chat_id),
+            media=raw.types.InputMediaUploadedPhoto(file=await client.save_file(source))
+        )
+    )
+    
+    return raw.types.InputMediaPhoto(
+        id=raw.types.InputPhoto(
+            id=uploaded.photo.id,
+            access_hash=uploaded.photo.access_hash,
+            file_reference=uploaded.photo.file_reference
+        )
+    )
+
+
+async def iter_part_list(all_parts: List[str]) -> AsyncIterator[tuple]:
+    """Already split parts in the (index, total, path) shape of iter_split_video"""
+    for i, part_path in enumerate(all_parts, 1):
+        yield i, len(all_parts), part_path
+
+
+async def upload_parts_concurrently(
+    client: Client,
+    chat_id: int,
+    parts: AsyncIterator[tuple],
+    caption: str,
+    progress_msg: Message,
+    sent: Optional[list] = None,
+    total_size: int = 0,
+    first_thumb: Optional[str] = None
+) -> tuple:
+    """
+    🆕 v11.2 - Parallel part upload, ordered delivery
+    Raw bytes of several parts go up at once (save_file), then the
+    messages are sent strictly in part order as each part becomes ready
+    parts yields (index, total, path) - a live splitter or iter_part_list
+    first_thumb: thumbnail already made for the whole video, used for part 1
+    Returns (uploaded_count, total_parts)
+    """
+    limit = max(1, min(PARALLEL_PART_UPLOADS, client.max_concurrent_transmissions))
+    semaphore = asyncio.Semaphore(limit)
+    
+    tracker = UploadProgressTracker(progress_msg, "parts")
+    uploaded_bytes = {}
+    total_parts = 0
+    
+    logger.info(f"⚡ Parallel part upload: {limit} at a time")
+    
+    async def save_part(i: int, part_path: str) -> Optional[dict]:
+        if not os.path.exists(part_path):
+            logger.warning(f"⚠️ Part {i} not found")
+            return None
+        
+        metadata = await get_video_metadata(part_path)
+        part_thumb_path = await thumbnail_for_part(i, part_path, first_thumb)
+        
+        async def progress(current: int, total: int):
+            uploaded_bytes[i] = current
+            await tracker.progress_callback(sum(uploaded_bytes.values()), total_size)
+        
+        async with semaphore:
+            logger.info(f"📤 Part {i}/{total_parts}: {os.path.basename(part_path)}")
+            file = await save_file_parallel(client, part_path, progress)
+            thumb = await client.save_file(part_thumb_path) if part_thumb_path else None
+        
+        return {
+            'path': part_path,
+            'file': file,
+            'thumb': thumb,
+            'thumb_path': part_thumb_path,
+            'metadata': metadata
+        }
+    
+    # Parts start uploading the moment the splitter hands them over
+    ready = asyncio.Queue()
+    tasks = []
+    
+    async def produce():
+        nonlocal total_parts
+        try:
+            async for i, total, part_path in parts:
+                total_parts = total
+                task = asyncio.create_task(save_part(i, part_path))
+                tasks.append(task)
+                await ready.put((i, task))
+        finally:
+            await ready.put(None)
+    
+    producer = asyncio.create_task(produce())
+    uploaded_count = 0
+    
+    try:
+        # Deliver in order - part N+1 keeps uploading while part N is sent
+        while True:
+            entry = await ready.get()
+            if entry is None:
+                break
+            
+            i, task = entry
+            
+            try:
+                part = await task
+            except Exception as e:
+                logger.error(f"❌ Part {i} upload error: {e}")
+                part = None
+            
+            if not part:
+                continue
+            
+            part_path = part['path']
+            part_size = os.path.getsize(part_path) / (1024 * 1024)
+            part_suffix = f"\n\n📦 **Part {i}/{total_parts}**\n💾 {part_size:.1f}MB"
+            metadata = part['metadata']
+            
+            retry_count = 0
+            
+            while retry_count < 3:
+                try:
+                    # save_file logs and returns None on transport errors
+                    if part['file'] is None:
+                        part['file'] = await save_file_parallel(client, part_path)
+                        if part['file'] is None:
+                            raise IOError("part upload failed")
+                    
+                    media = build_uploaded_media(
+                        client, part_path, part['file'], 'video', part['thumb'],
+                        metadata['duration'], metadata['width'], metadata['height']
+                    )
+                    
+                    msg = await send_uploaded_media(
+                        client, chat_id, media, caption + part_suffix, part_path
+                    )
+                    forget_upload(part_path)
+                    
+                    uploaded_count += 1
+                    if sent is not None:
+                        sent.append((msg, part_suffix))
+                    logger.info(f"✅ Part {i} sent!")
+                    break
+                    
+                except Exception as e:
+                    logger.error(f"❌ Part {i} error: {e}")
+                    part['file'] = None
+                    retry_count += 1
+                    if retry_count < 3:
+                        await asyncio.sleep(5)
+            
+            try:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+                if part['thumb_path'] and os.path.exists(part['thumb_path']):
+                    os.remove(part['thumb_path'])
+            except:
+                pass
+        
+        # Surface splitter errors
+        await producer
+    
+    finally:
+        producer.cancel()
+        for task in tasks:
+            task.cancel()
+    
+    return uploaded_count, total_parts
+
+
+async def upload_parts_serially(
+    client: Client,
+    chat_id: int,
+    all_parts: List[str],
+    caption: str,
+    progress_msg: Message,
+    sent: Optional[list] = None,
+    first_thumb: Optional[str] = None
+) -> int:
+    """Upload parts one after another - returns the uploaded count"""
+    uploaded_count = 0
+    
+    # Upload each part with PROPER metadata
+    for i, part_path in enumerate(all_parts, 1):
+        if not os.path.exists(part_path):
+            logger.warning(f"⚠️ Part {i} not found")
+            continue
+        
+        part_size = os.path.getsize(part_path) / (1024 * 1024)
+        part_name = os.path.basename(part_path)
+        
+        logger.info(f"📤 Part {i}/{len(all_parts)}: {part_name} ({part_size:.1f}MB)")
+        
+        # 🔥 KEY: Get metadata for THIS part
+        metadata = await get_video_metadata(part_path)
+        part_duration = metadata['duration']
+        part_width = metadata['width']
+        part_height = metadata['height']
+        
+        logger.info(f"   Duration: {part_duration}s, Size: {part_width}x{part_height}")
+        
+        # Thumbnail for THIS part
+        part_thumb_path = await thumbnail_for_part(i, part_path, first_thumb)
+        
+        # Caption
+        part_suffix = f"\n\n📦 **Part {i}/{len(all_parts)}**\n💾 {part_size:.1f}MB"
+        part_caption = caption + part_suffix
+        
+        tracker = UploadProgressTracker(progress_msg, part_name, i, len(all_parts))
+        
+        # Upload with retry
+        retry_count = 0
+        upload_success = False
+        
+        while retry_count < 3 and not upload_success:
+            try:
+                msg = await send_file_fast(
+                    client, chat_id, part_path, part_caption, 'video',
+                    tracker.progress_callback,
+                    part_thumb_path,
+                    part_duration,  # Correct duration
+                    part_width,     # Correct width
+                    part_height     # Correct height
+                )
+                
+                upload_success = True
+                uploaded_count += 1
+                if sent is not None:
+                    sent.append((msg, part_suffix))
+                logger.info(f"✅ Part {i} uploaded!")
+                
+            except Exception as e:
+                logger.error(f"❌ Part {i} error: {e}")
+                retry_count += 1
+                if retry_count < 3:
+                    await asyncio.sleep(5)
+        
+        # Cleanup part & thumb
+        try:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            if part_thumb_path and os.path.exists(part_thumb_path):
+                os.remove(part_thumb_path)
+        except:
+            pass
+    
+    return uploaded_count
+
+
 async def upload_video(
     client: Client,
     chat_id: int,
@@ -203,10 +785,12 @@ async def upload_video(
     thumb_path: Optional[str] = None,
     duration: int = 0,
     width: int = 1280,
-    height: int = 720
+    height: int = 720,
+    sent: Optional[list] = None
 ) -> bool:
     """
     🚀 OPTIMIZED upload with proper metadata for ALL parts
+    sent: optional collector of (message, caption_suffix) per part
     """
     try:
         # Find parts
@@ -214,11 +798,18 @@ async def upload_video(
         
         if not all_parts:
             logger.error("❌ No files found!")
-            await progress_msg.edit_text("❌ File not found!")
+            await send_scheduler.edit(progress_msg, "❌ File not found!")
             return False
         
+        # 🆕 v11.2 - Too big for one message: cut and upload at the same time
+        split_stream = (
+            len(all_parts) == 1
+            and os.path.exists(all_parts[0])
+            and os.path.getsize(all_parts[0]) > SAFE_SPLIT_SIZE * 1024 * 1024
+        )
+        
         # SINGLE FILE - FAST PATH
-        if len(all_parts) == 1:
+        if len(all_parts) == 1 and not split_stream:
             file_path = all_parts[0]
             
             if not os.path.exists(file_path):
@@ -229,132 +820,67 @@ async def upload_video(
             
             tracker = UploadProgressTracker(progress_msg, os.path.basename(file_path))
             
+            msg = await send_file_retrying(
+                client, chat_id, file_path, caption, 'video',
+                tracker.progress_callback, thumb_path,
+                duration, width, height, label="Video"
+            )
+            
+            logger.info("✅ Upload success")
+            
+            if sent is not None:
+                sent.append((msg, ""))
+            
+            # Cleanup
             try:
-                await client.send_video(
-                    chat_id=chat_id,
-                    video=file_path,
-                    caption=caption,
-                    supports_streaming=True,
-                    duration=duration,
-                    width=width,
-                    height=height,
-                    thumb=thumb_path,
-                    progress=tracker.progress_callback
-                )
-                
-                logger.info(f"✅ Upload success")
-                
-                # Cleanup
-                try:
-                    os.remove(file_path)
-                    if thumb_path and os.path.exists(thumb_path):
-                        os.remove(thumb_path)
-                except:
-                    pass
-                
-                return True
-                
-            except FloodWait as e:
-                await asyncio.sleep(e.value)
-                await client.send_video(
-                    chat_id=chat_id,
-                    video=file_path,
-                    caption=caption,
-                    supports_streaming=True,
-                    duration=duration,
-                    width=width,
-                    height=height,
-                    thumb=thumb_path,
-                    progress=tracker.progress_callback
-                )
-                return True
+                os.remove(file_path)
+                if thumb_path and os.path.exists(thumb_path):
+                    os.remove(thumb_path)
+            except:
+                pass
+            
+            return True
         
         # MULTI-PART - Extract metadata for EACH part
-        logger.info(f"📦 Multi-part: {len(all_parts)} parts")
-        
         total_size = sum(os.path.getsize(p) for p in all_parts if os.path.exists(p))
         total_size_mb = total_size / (1024 * 1024)
         
-        await progress_msg.edit_text(
-            f"📦 **MULTI-PART UPLOAD**\n\n"
-            f"Parts: {len(all_parts)}\n"
-            f"Total: {total_size_mb:.1f}MB\n\n"
-            f"⚡ Uploading..."
-        )
-        
-        uploaded_count = 0
-        
-        # Upload each part with PROPER metadata
-        for i, part_path in enumerate(all_parts, 1):
-            if not os.path.exists(part_path):
-                logger.warning(f"⚠️ Part {i} not found")
-                continue
-            
-            part_size = os.path.getsize(part_path) / (1024 * 1024)
-            part_name = os.path.basename(part_path)
-            
-            logger.info(f"📤 Part {i}/{len(all_parts)}: {part_name} ({part_size:.1f}MB)")
+        if split_stream:
+            logger.info(f"🔪 Split + upload: {total_size_mb:.1f}MB")
             
-            # 🔥 KEY: Get metadata for THIS part
-            metadata = get_video_metadata(part_path)
-            part_duration = metadata['duration']
-            part_width = metadata['width']
-            part_height = metadata['height']
-            
-            logger.info(f"   Duration: {part_duration}s, Size: {part_width}x{part_height}")
-            
-            # Generate thumbnail for THIS part
-            part_thumb_path = str(DOWNLOAD_DIR / f"thumb_part{i}_{os.getpid()}.jpg")
-            has_thumb = generate_thumbnail_for_part(part_path, part_thumb_path)
-            
-            # Caption
-            part_caption = f"{caption}\n\n📦 **Part {i}/{len(all_parts)}**\n💾 {part_size:.1f}MB"
-            
-            tracker = UploadProgressTracker(progress_msg, part_name, i, len(all_parts))
-            
-            # Upload with retry
-            retry_count = 0
-            upload_success = False
+            await send_scheduler.edit(
+                progress_msg,
+                f"🔪 **SPLIT + UPLOAD**\n\n"
+                f"Total: {total_size_mb:.1f}MB\n\n"
+                f"⚡ Parts upload as soon as they are cut..."
+            )
             
-            while retry_count < 3 and not upload_success:
-                try:
-                    await client.send_video(
-                        chat_id=chat_id,
-                        video=part_path,
-                        caption=part_caption,
-                        supports_streaming=True,
-                        duration=part_duration,  # Correct duration
-                        width=part_width,         # Correct width
-                        height=part_height,       # Correct height
-                        thumb=part_thumb_path if has_thumb else None,
-                        progress=tracker.progress_callback
-                    )
-                    
-                    upload_success = True
-                    uploaded_count += 1
-                    logger.info(f"✅ Part {i} uploaded!")
-                    
-                except FloodWait as e:
-                    logger.warning(f"⏳ FloodWait {e.value}s")
-                    await asyncio.sleep(e.value)
-                    retry_count += 1
-                    
-                except Exception as e:
-                    logger.error(f"❌ Part {i} error: {e}")
-                    retry_count += 1
-                    if retry_count < 3:
-                        await asyncio.sleep(5)
+            uploaded_count, total_parts = await upload_parts_concurrently(
+                client, chat_id, iter_split_video(all_parts[0], SAFE_SPLIT_SIZE),
+                caption, progress_msg, sent, total_size, thumb_path
+            )
+        
+        else:
+            logger.info(f"📦 Multi-part: {len(all_parts)} parts")
+            total_parts = len(all_parts)
             
-            # Cleanup part & thumb
-            try:
-                if os.path.exists(part_path):
-                    os.remove(part_path)
-                if has_thumb and os.path.exists(part_thumb_path):
-                    os.remove(part_thumb_path)
-            except:
-                pass
+            await send_scheduler.edit(
+                progress_msg,
+                f"📦 **MULTI-PART UPLOAD**\n\n"
+                f"Parts: {len(all_parts)}\n"
+                f"Total: {total_size_mb:.1f}MB\n\n"
+                f"⚡ Uploading..."
+            )
             
-            await asyncio.sleep(0.5)
+            if PARALLEL_PART_UPLOADS > 1:
+                uploaded_count, _ = await upload_parts_concurrently(
+                    client, chat_id, iter_part_list(all_parts),
+                    caption, progress_msg, sent, total_size, thumb_path
+                )
+            else:
+                uploaded_count = await upload_parts_serially(
+                    client, chat_id, all_parts, caption, progress_msg, sent, thumb_path
+                )
         
         # Cleanup main thumbnail
         try:
@@ -364,19 +890,21 @@ async def upload_video(
             pass
         
         # Summary
-        if uploaded_count == len(all_parts):
-            await progress_msg.edit_text(
+        if total_parts and uploaded_count == total_parts:
+            await send_scheduler.edit(
+                progress_msg,
                 f"✅ **ALL PARTS UPLOADED!**\n\n"
-                f"📦 Parts: {len(all_parts)}\n"
+                f"📦 Parts: {total_parts}\n"
                 f"💾 Size: {total_size_mb:.1f}MB\n\n"
                 f"🎉 Complete!"
             )
             return True
         else:
-            await progress_msg.edit_text(
+            await send_scheduler.edit(
+                progress_msg,
                 f"⚠️ **PARTIAL UPLOAD**\n\n"
-                f"✔️ Success: {uploaded_count}/{len(all_parts)}\n"
-                f"❌ Failed: {len(all_parts) - uploaded_count}"
+                f"✔️ Success: {uploaded_count}/{total_parts}\n"
+                f"❌ Failed: {total_parts - uploaded_count}"
             )
             return False
         
@@ -390,7 +918,8 @@ async def upload_photo(
     chat_id: int,
     photo_path: str,
     caption: str,
-    progress_msg: Message
+    progress_msg: Message,
+    sent: Optional[list] = None
 ) -> bool:
     """Upload photo - FAST"""
     try:
@@ -399,14 +928,16 @@ async def upload_photo(
         
         tracker = UploadProgressTracker(progress_msg, os.path.basename(photo_path))
         
-        await client.send_photo(
-            chat_id=chat_id,
-            photo=photo_path,
-            caption=caption,
-            progress=tracker.progress_callback
+        file = await client.save_file(photo_path, progress=tracker.progress_callback)
+        msg = await send_uploaded_media(
+            client, chat_id, raw.types.InputMediaUploadedPhoto(file=file),
+            caption, photo_path
         )
         
-        logger.info(f"✅ Photo uploaded")
+        logger.info("✅ Photo uploaded")
+        
+        if sent is not None:
+            sent.append((msg, ""))
         
         try:
             os.remove(photo_path)
@@ -415,20 +946,70 @@ async def upload_photo(
         
         return True
         
-    except FloodWait as e:
-        await asyncio.sleep(e.value)
-        return False
     except Exception as e:
         logger.error(f"❌ Photo error: {e}")
         return False
 
 
+async def upload_document_slices(
+    client: Client,
+    chat_id: int,
+    file_path: str,
+    caption: str,
+    progress_msg: Message,
+    sent: Optional[list] = None
+) -> bool:
+    """
+    🆕 v11.2 - Oversized documents as byte-range slices
+    Each slice is uploaded straight from the original file
+    (name.001, name.002, ... - rejoin with cat), no part files on disk
+    """
+    file_size = os.path.getsize(file_path)
+    slice_count = math.ceil(file_size / (SAFE_SPLIT_SIZE * 1024 * 1024))
+    slice_size = math.ceil(file_size / slice_count)
+    base_name = os.path.basename(file_path)
+    
+    logger.info(f"✂️ Slicing {file_size / (1024 * 1024):.1f}MB into {slice_count} uploads")
+    
+    uploaded_count = 0
+    
+    for i in range(1, slice_count + 1):
+        offset = (i - 1) * slice_size
+        length = min(slice_size, file_size - offset)
+        slice_name = f"{base_name}.{i:03d}"
+        
+        part_suffix = f"\n\n📦 Part {i}/{slice_count} ({length / (1024 * 1024):.1f}MB)"
+        tracker = UploadProgressTracker(progress_msg, slice_name, i, slice_count)
+        
+        try:
+            msg = await send_file_retrying(
+                client, chat_id, file_path, caption + part_suffix, 'document',
+                tracker.progress_callback,
+                offset=offset, length=length, file_name=slice_name,
+                label=f"Slice {i}"
+            )
+        except Exception:
+            continue
+        
+        uploaded_count += 1
+        if sent is not None:
+            sent.append((msg, part_suffix))
+    
+    try:
+        os.remove(file_path)
+    except:
+        pass
+    
+    return uploaded_count == slice_count
+
+
 async def upload_document(
     client: Client,
     chat_id: int,
     document_path: str,
     caption: str,
-    progress_msg: Message
+    progress_msg: Message,
+    sent: Optional[list] = None
 ) -> bool:
     """Upload document with multi-part support"""
     try:
@@ -444,16 +1025,22 @@ async def upload_document(
             if not os.path.exists(file_path):
                 return False
             
+            if os.path.getsize(file_path) > SAFE_SPLIT_SIZE * 1024 * 1024:
+                return await upload_document_slices(
+                    client, chat_id, file_path, caption, progress_msg, sent
+                )
+            
             tracker = UploadProgressTracker(progress_msg, os.path.basename(file_path))
             
-            await client.send_document(
-                chat_id=chat_id,
-                document=file_path,
-                caption=caption,
-                progress=tracker.progress_callback
+            msg = await send_file_retrying(
+                client, chat_id, file_path, caption, 'document',
+                tracker.progress_callback, label="Document"
             )
             
-            logger.info(f"✅ Document uploaded")
+            logger.info("✅ Document uploaded")
+            
+            if sent is not None:
+                sent.append((msg, ""))
             
             try:
                 os.remove(file_path)
@@ -470,7 +1057,8 @@ async def upload_document(
                 continue
             
             part_size = os.path.getsize(part_path) / (1024 * 1024)
-            part_caption = f"{caption}\n\n📦 Part {i}/{len(all_parts)} ({part_size:.1f}MB)"
+            part_suffix = f"\n\n📦 Part {i}/{len(all_parts)} ({part_size:.1f}MB)"
+            part_caption = caption + part_suffix
             
             tracker = UploadProgressTracker(progress_msg, os.path.basename(part_path), i, len(all_parts))
             
@@ -479,19 +1067,16 @@ async def upload_document(
             
             while retry_count < 3 and not upload_success:
                 try:
-                    await client.send_document(
-                        chat_id=chat_id,
-                        document=part_path,
-                        caption=part_caption,
-                        progress=tracker.progress_callback
+                    msg = await send_file_fast(
+                        client, chat_id, part_path, part_caption, 'document',
+                        tracker.progress_callback
                     )
                     
                     upload_success = True
                     uploaded_count += 1
+                    if sent is not None:
+                        sent.append((msg, part_suffix))
                     
-                except FloodWait as e:
-                    await asyncio.sleep(e.value)
-                    retry_count += 1
                 except Exception as e:
                     logger.error(f"Part {i} error: {e}")
                     retry_count += 1
@@ -503,8 +1088,6 @@ async def upload_document(
                     os.remove(part_path)
             except:
                 pass
-            
-            await asyncio.sleep(0.5)
         
         return uploaded_count == len(all_parts)
         
@@ -545,11 +1128,7 @@ async def send_failed_link(
             f"⚠️ This content could not be processed automatically."
         )
         
-        await client.send_message(
-            chat_id=chat_id,
-            text=message,
-            disable_web_page_preview=False
-        )
+        await send_scheduler.send_text(client, chat_id, message, web_preview=True)
         
         logger.info(f"📧 Failed link sent for #{serial_num}")
         return True
@@ -569,27 +1148,39 @@ async def send_to_destination(
     thumb_path: Optional[str] = None,
     duration: int = 0,
     width: int = 1280,
-    height: int = 720
+    height: int = 720,
+    cache_key: Optional[str] = None
 ) -> bool:
-    """Send to destination"""
+    """
+    Send to destination
+    🆕 v11.2 - with cache_key, the sent file_ids are stored for instant re-sends
+    """
     try:
+        sent = []
+        
         if file_type == 'video':
-            return await upload_video(
+            success = await upload_video(
                 client, destination_id, file_path, caption,
-                progress_msg, thumb_path, duration, width, height
+                progress_msg, thumb_path, duration, width, height, sent
             )
         
         elif file_type == 'image':
-            return await upload_photo(
-                client, destination_id, file_path, caption, progress_msg
+            success = await upload_photo(
+                client, destination_id, file_path, caption, progress_msg, sent
             )
         
         elif file_type == 'document':
-            return await upload_document(
-                client, destination_id, file_path, caption, progress_msg
+            success = await upload_document(
+                client, destination_id, file_path, caption, progress_msg, sent
             )
         
-        return False
+        else:
+            return False
+        
+        if success and cache_key:
+            media_cache.record(cache_key, sent)
+        
+        return success
         
     except Exception as e:
         logger.error(f"Destination error: {e}")
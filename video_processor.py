@@ -1,52 +1,157 @@
 import os
 import json
-import subprocess
+import math
+import struct
+import asyncio
 import logging
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from config import (
     THUMBNAIL_TIME, THUMBNAIL_SIZE, THUMBNAIL_QUALITY,
     WATERMARK_ENABLED, WATERMARK_FONT, WATERMARK_FONT_SIZE,
     WATERMARK_COLOR, WATERMARK_POSITION, WATERMARK_OPACITY,
-    QUALITY_SETTINGS
+    QUALITY_SETTINGS, PROBE_CACHE_SIZE, SMART_TRANSCODE,
+    TRANSCODE_HEIGHT_TOLERANCE, TRANSCODE_BITRATE_HEADROOM,
+    SAFE_SPLIT_SIZE, SPLIT_SIZE_MARGIN, FUSED_SIZE_MARGIN
 )
+from ffmpeg_runner import run_process, ProcessTimeout
+from transcode_scheduler import transcode_slot, TranscodeSlot
 
 logger = logging.getLogger(__name__)
 
+# (abspath, size, mtime_ns) -> probe task, most recent last
+_probe_cache: "OrderedDict[tuple, asyncio.Task]" = OrderedDict()
 
-def get_video_info(filepath: str) -> Dict:
+
+def _parse_keyframes(packets: list) -> tuple:
+    """[(pts_time, bytes_before_keyframe)] of the first video stream + total packet bytes"""
+    keyframes = []
+    total = 0
+    video_index = None
+    
+    for packet in packets:
+        try:
+            size = int(packet.get('size', 0))
+        except ValueError:
+            continue
+        
+        if packet.get('codec_type') == 'video':
+            if video_index is None:
+                video_index = packet.get('stream_index')
+            
+            if (packet.get('stream_index') == video_index
+                    and 'K' in packet.get('flags', '')
+                    and packet.get('pts_time', 'N/A') != 'N/A'):
+                keyframes.append((float(packet['pts_time']), total))
+        
+        total += size
+    
+    return keyframes, total
+
+
+async def _run_probe(filepath: str, keyframes: bool) -> Optional[Dict]:
+    cmd = [
+        'ffprobe', '-v', 'quiet',
+        '-print_format', 'json',
+        '-show_format', '-show_streams'
+    ]
+    if keyframes:
+        cmd += ['-show_entries', 'packet=codec_type,stream_index,pts_time,size,flags']
+    cmd.append(filepath)
+    
+    # The packet table of a long file takes a while
+    result = await run_process(cmd, timeout=600 if keyframes else 30)
+    
+    if result.returncode != 0:
+        logger.error(f"FFprobe failed: {result.stderr[-300:]}")
+        return None
+    
+    data = json.loads(result.stdout)
+    
+    if keyframes:
+        data['keyframes'], data['packet_bytes'] = _parse_keyframes(data.pop('packets', []))
+    
+    return data
+
+
+async def probe(filepath: str, keyframes: bool = False) -> Optional[Dict]:
+    """
+    🆕 v11.2 - ONE ffprobe per file version
+    Format + streams (codec, bitrate, dimensions...), plus the keyframe
+    index when asked for ('keyframes', 'packet_bytes')
+    Cached by (path, size, mtime) - validation, info, codec checks, the
+    splitter and upload metadata all read the same result
+    Returns None if ffprobe can't read the file
+    """
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return None
+    
+    key = (os.path.abspath(filepath), stat.st_size, stat.st_mtime_ns)
+    task = _probe_cache.get(key)
+    
+    if task is not None:
+        _probe_cache.move_to_end(key)
+        data = await _await_probe(key, task)
+        
+        # A plain probe doesn't answer a keyframe request
+        if data is None or not keyframes or 'keyframes' in data:
+            return data
+    
+    # Concurrent callers for the same file share one ffprobe
+    task = asyncio.ensure_future(_run_probe(filepath, keyframes))
+    _probe_cache[key] = task
+    
+    while len(_probe_cache) > PROBE_CACHE_SIZE:
+        _probe_cache.popitem(last=False)
+    
+    return await _await_probe(key, task)
+
+
+async def _await_probe(key: tuple, task: asyncio.Task) -> Optional[Dict]:
+    try:
+        # Shielded - one caller giving up doesn't kill the shared probe
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        if _probe_cache.get(key) is task:
+            del _probe_cache[key]
+        logger.error(f"FFprobe error: {e}")
+        return None
+
+
+def video_stream(data: Optional[Dict]) -> Dict:
+    """First video stream of a probe result ({} if none)"""
+    return next(
+        (s for s in (data or {}).get('streams', []) if s.get('codec_type') == 'video'),
+        {}
+    )
+
+
+async def get_video_info(filepath: str) -> Dict:
     """Get video duration and dimensions with enhanced error handling"""
     try:
-        cmd = [
-            'ffprobe', '-v', 'quiet',
-            '-print_format', 'json',
-            '-show_format', '-show_streams',
-            filepath
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        data = await probe(filepath)
         
-        if result.returncode != 0:
-            logger.error(f"FFprobe failed: {result.stderr}")
+        if data is None:
             return {'duration': 0, 'width': 1280, 'height': 720}
         
-        data = json.loads(result.stdout)
-        
         # Get duration
         duration = 0
         if 'format' in data and 'duration' in data['format']:
             duration = int(float(data['format']['duration']))
         
         # Get video stream
-        video_stream = next(
-            (s for s in data.get('streams', []) if s.get('codec_type') == 'video'), 
-            {}
-        )
+        stream = video_stream(data)
         
-        width = video_stream.get('width', 1280)
-        height = video_stream.get('height', 720)
+        width = stream.get('width', 1280)
+        height = stream.get('height', 720)
         
-        if duration == 0 and 'duration' in video_stream:
-            duration = int(float(video_stream['duration']))
+        if duration == 0 and 'duration' in stream:
+            duration = int(float(stream['duration']))
         
         if width <= 0 or height <= 0:
             width, height = 1280, 720
@@ -63,7 +168,48 @@ def get_video_info(filepath: str) -> Dict:
         return {'duration': 0, 'width': 1280, 'height': 720}
 
 
-def generate_thumbnail_with_text(
+def _thumbnail_time(video_duration: int) -> int:
+    """Determine best time for thumbnail"""
+    if video_duration > 10:
+        return min(video_duration // 4, 15)
+    elif video_duration > 5:
+        return 3
+    return 1
+
+
+def _thumbnail_filter(watermark_text: str = "") -> str:
+    """Scale to THUMBNAIL_SIZE + optional text overlay"""
+    filter_parts = [f'scale={THUMBNAIL_SIZE}:force_original_aspect_ratio=decrease']
+    
+    if watermark_text and WATERMARK_ENABLED:
+        # Position mapping
+        positions = {
+            'top_left': 'x=10:y=10',
+            'top_right': 'x=w-tw-10:y=10',
+            'bottom_left': 'x=10:y=h-th-10',
+            'bottom_right': 'x=w-tw-10:y=h-th-10',
+            'center': 'x=(w-tw)/2:y=(h-th)/2'
+        }
+        
+        pos = positions.get(WATERMARK_POSITION, positions['bottom_right'])
+        
+        # Escape special characters in text
+        escaped_text = watermark_text.replace("'", "'\\\\\\''").replace(":", "\\:")
+        
+        text_filter = (
+            f"drawtext=text='{escaped_text}':"
+            f"fontfile=/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf:"
+            f"fontsize={WATERMARK_FONT_SIZE}:"
+            f"fontcolor={WATERMARK_COLOR}@{WATERMARK_OPACITY}:"
+            f"{pos}:"
+            f"box=1:boxcolor=black@0.5:boxborderw=5"
+        )
+        filter_parts.append(text_filter)
+    
+    return ','.join(filter_parts)
+
+
+async def generate_thumbnail_with_text(
     video_path: str, 
     thumb_path: str, 
     watermark_text: str = "",
@@ -74,45 +220,11 @@ def generate_thumbnail_with_text(
     6 FALLBACK METHODS + Text overlay support
     """
     try:
-        # Determine best time for thumbnail
-        if video_duration > 10:
-            thumb_time = min(video_duration // 4, 15)
-        elif video_duration > 5:
-            thumb_time = 3
-        else:
-            thumb_time = 1
-        
+        thumb_time = _thumbnail_time(video_duration)
         thumb_time_str = f"00:00:{thumb_time:02d}"
         
         # Build filter complex for thumbnail + text overlay
-        filter_parts = [f'scale={THUMBNAIL_SIZE}:force_original_aspect_ratio=decrease']
-        
-        if watermark_text and WATERMARK_ENABLED:
-            # Position mapping
-            positions = {
-                'top_left': 'x=10:y=10',
-                'top_right': 'x=w-tw-10:y=10',
-                'bottom_left': 'x=10:y=h-th-10',
-                'bottom_right': 'x=w-tw-10:y=h-th-10',
-                'center': 'x=(w-tw)/2:y=(h-th)/2'
-            }
-            
-            pos = positions.get(WATERMARK_POSITION, positions['bottom_right'])
-            
-            # Escape special characters in text
-            escaped_text = watermark_text.replace("'", "'\\\\\\''").replace(":", "\\:")
-            
-            text_filter = (
-                f"drawtext=text='{escaped_text}':"
-                f"fontfile=/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf:"
-                f"fontsize={WATERMARK_FONT_SIZE}:"
-                f"fontcolor={WATERMARK_COLOR}@{WATERMARK_OPACITY}:"
-                f"{pos}:"
-                f"box=1:boxcolor=black@0.5:boxborderw=5"
-            )
-            filter_parts.append(text_filter)
-        
-        filter_complex = ','.join(filter_parts)
+        filter_complex = _thumbnail_filter(watermark_text)
         
         # Method 1: Primary extraction with text overlay
         cmd = [
@@ -126,7 +238,7 @@ def generate_thumbnail_with_text(
         ]
         
         logger.info(f"🎨 Thumbnail Method 1: {thumb_time_str} with text overlay")
-        result = subprocess.run(cmd, capture_output=True, timeout=60)
+        result = await run_process(cmd, timeout=60)
         
         if os.path.exists(thumb_path) and os.path.getsize(thumb_path) > 2048:
             logger.info(f"✅ Thumbnail created: {os.path.getsize(thumb_path)} bytes")
@@ -135,7 +247,7 @@ def generate_thumbnail_with_text(
         # Method 2: Try without seeking
         logger.warning("Method 1 failed, trying Method 2")
         cmd[1] = '00:00:00'
-        subprocess.run(cmd, capture_output=True, timeout=60)
+        await run_process(cmd, timeout=60)
         
         if os.path.exists(thumb_path) and os.path.getsize(thumb_path) > 2048:
             logger.info("✅ Method 2 success")
@@ -146,7 +258,7 @@ def generate_thumbnail_with_text(
             mid_time = f"00:00:{video_duration // 2:02d}"
             logger.warning(f"Trying Method 3: {mid_time}")
             cmd[1] = mid_time
-            subprocess.run(cmd, capture_output=True, timeout=60)
+            await run_process(cmd, timeout=60)
             
             if os.path.exists(thumb_path) and os.path.getsize(thumb_path) > 2048:
                 logger.info("✅ Method 3 success")
@@ -162,24 +274,24 @@ def generate_thumbnail_with_text(
             thumb_path,
             '-y'
         ]
-        subprocess.run(simple_cmd, capture_output=True, timeout=60)
+        await run_process(simple_cmd, timeout=60)
         
         if os.path.exists(thumb_path) and os.path.getsize(thumb_path) > 2048:
             logger.info("✅ Method 4 success")
             # Add text overlay separately if needed
             if watermark_text and WATERMARK_ENABLED:
-                add_text_to_thumbnail(thumb_path, watermark_text)
+                await add_text_to_thumbnail(thumb_path, watermark_text)
             return True
         
         # Method 5: Raw extraction
         logger.warning("Trying Method 5: Raw")
         raw_cmd = ['ffmpeg', '-i', video_path, '-vframes', '1', thumb_path, '-y']
-        subprocess.run(raw_cmd, capture_output=True, timeout=60)
+        await run_process(raw_cmd, timeout=60)
         
         if os.path.exists(thumb_path) and os.path.getsize(thumb_path) > 2048:
             logger.info("✅ Method 5 success")
             if watermark_text and WATERMARK_ENABLED:
-                add_text_to_thumbnail(thumb_path, watermark_text)
+                await add_text_to_thumbnail(thumb_path, watermark_text)
             return True
         
         # Method 6: End of video
@@ -187,12 +299,12 @@ def generate_thumbnail_with_text(
             end_time = f"00:00:{max(video_duration - 5, 1):02d}"
             logger.warning(f"Trying Method 6: {end_time}")
             cmd[1] = end_time
-            subprocess.run(cmd, capture_output=True, timeout=60)
+            await run_process(cmd, timeout=60)
             
             if os.path.exists(thumb_path) and os.path.getsize(thumb_path) > 2048:
                 logger.info("✅ Method 6 success")
                 if watermark_text and WATERMARK_ENABLED:
-                    add_text_to_thumbnail(thumb_path, watermark_text)
+                    await add_text_to_thumbnail(thumb_path, watermark_text)
                 return True
         
         logger.error("❌ All thumbnail methods failed")
@@ -203,7 +315,7 @@ def generate_thumbnail_with_text(
         return False
 
 
-def add_text_to_thumbnail(thumb_path: str, text: str) -> bool:
+async def add_text_to_thumbnail(thumb_path: str, text: str) -> bool:
     """Add text overlay to existing thumbnail"""
     try:
         temp_path = thumb_path + ".temp.jpg"
@@ -233,7 +345,7 @@ def add_text_to_thumbnail(thumb_path: str, text: str) -> bool:
             '-y'
         ]
         
-        result = subprocess.run(cmd, capture_output=True, timeout=30)
+        result = await run_process(cmd, timeout=30)
         
         if result.returncode == 0 and os.path.exists(temp_path):
             os.replace(temp_path, thumb_path)
@@ -247,15 +359,53 @@ def add_text_to_thumbnail(thumb_path: str, text: str) -> bool:
         return False
 
 
+def _scale_filter(height: int) -> str:
+    """Short side to height (portrait too), never upscaled, -2 keeps aspect + even"""
+    return (
+        f"scale='if(gt(iw,ih),-2,min(iw,{height}))'"
+        f":'if(gt(iw,ih),min(ih,{height}),-2)'"
+    )
+
+
+async def _run_conversion(
+    input_path: str, output_path: str, height: int,
+    video_bitrate: str, audio_bitrate: str, preset: str,
+    slot: TranscodeSlot
+):
+    """libx264 encode limited to the slot's thread budget and CPUs"""
+    cmd = [
+        'ffmpeg', '-filter_threads', str(slot.threads),
+        '-i', input_path,
+        '-vf', _scale_filter(height),
+        '-c:v', 'libx264',  # H.264 codec
+        '-b:v', video_bitrate,
+        '-maxrate', video_bitrate,
+        '-bufsize', f"{int(video_bitrate[:-1]) * 2}k",
+        '-preset', preset,
+        '-c:a', 'aac',
+        '-b:a', audio_bitrate,
+        '-movflags', '+faststart',
+        '-threads', str(slot.threads),  # Slot budget, not every core
+        output_path,
+        '-y'
+    ]
+    
+    return await run_process(slot.prefix + cmd, timeout=3600)  # 1 hour max
+
+
 async def convert_video_quality(
     input_path: str,
     output_path: str,
     quality: str,
-    progress_callback=None
+    progress_callback=None,
+    priority: Optional[float] = None
 ) -> bool:
     """
     ADVANCED quality conversion with real encoding
     Actually changes video quality, not just resolution
+    🆕 v11.2 - runs in a transcode scheduler slot (thread budget + nice/affinity)
+    priority: lower runs first, defaults to input size (short clips don't
+    queue behind hour-long encodes)
     """
     try:
         if quality not in QUALITY_SETTINGS:
@@ -270,28 +420,14 @@ async def convert_video_quality(
         
         logger.info(f"🎬 Converting to {quality}: {height}p, {video_bitrate} video, {audio_bitrate} audio")
         
-        cmd = [
-            'ffmpeg', '-i', input_path,
-            '-vf', f'scale=-2:{height}',  # -2 maintains aspect ratio
-            '-c:v', 'libx264',  # H.264 codec
-            '-b:v', video_bitrate,
-            '-maxrate', video_bitrate,
-            '-bufsize', f"{int(video_bitrate[:-1]) * 2}k",
-            '-preset', preset,
-            '-c:a', 'aac',
-            '-b:a', audio_bitrate,
-            '-movflags', '+faststart',
-            '-threads', '0',  # Use all CPU threads
-            output_path,
-            '-y'
-        ]
+        if priority is None:
+            priority = os.path.getsize(input_path)
         
-        result = subprocess.run(
-            cmd, 
-            capture_output=True, 
-            text=True,
-            timeout=3600  # 1 hour max
-        )
+        async with transcode_slot(priority) as slot:
+            result = await _run_conversion(
+                input_path, output_path, height, video_bitrate,
+                audio_bitrate, preset, slot
+            )
         
         if result.returncode == 0 and os.path.exists(output_path):
             input_size = os.path.getsize(input_path) / (1024 * 1024)
@@ -299,10 +435,10 @@ async def convert_video_quality(
             logger.info(f"✅ Quality conversion complete: {input_size:.2f}MB → {output_size:.2f}MB")
             return True
         else:
-            logger.error(f"FFmpeg conversion failed: {result.stderr}")
+            logger.error(f"FFmpeg conversion failed: {result.stderr[-500:]}")
             return False
         
-    except subprocess.TimeoutExpired:
+    except ProcessTimeout:
         logger.error("Video conversion timeout")
         return False
     except Exception as e:
@@ -310,7 +446,7 @@ async def convert_video_quality(
         return False
 
 
-def validate_video_file(filepath: str) -> bool:
+async def validate_video_file(filepath: str) -> bool:
     """Validate if video file is playable"""
     try:
         if not os.path.exists(filepath):
@@ -322,26 +458,15 @@ def validate_video_file(filepath: str) -> bool:
             logger.error(f"File too small: {file_size} bytes")
             return False
         
-        cmd = [
-            'ffprobe', '-v', 'error',
-            '-select_streams', 'v:0',
-            '-show_entries', 'stream=codec_type',
-            '-of', 'json',
-            filepath
-        ]
-        result = subprocess.run(cmd, capture_output=True, timeout=15)
+        data = await probe(filepath)
         
-        if result.returncode != 0:
+        if data is None:
             logger.error("Video validation failed")
             return False
         
-        try:
-            data = json.loads(result.stdout)
-            if 'streams' in data and len(data['streams']) > 0:
-                logger.info(f"✅ Video validated: {filepath}")
-                return True
-        except:
-            pass
+        if video_stream(data):
+            logger.info(f"✅ Video validated: {filepath}")
+            return True
         
         return False
         
@@ -350,31 +475,297 @@ def validate_video_file(filepath: str) -> bool:
         return False
 
 
-def get_video_codec_info(filepath: str) -> Dict:
+async def get_video_codec_info(filepath: str) -> Dict:
     """Get detailed codec information"""
     try:
-        cmd = [
-            'ffprobe', '-v', 'quiet',
-            '-print_format', 'json',
-            '-show_streams',
-            '-select_streams', 'v:0',
-            filepath
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=20)
-        
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            if 'streams' in data and len(data['streams']) > 0:
-                stream = data['streams'][0]
-                return {
-                    'codec': stream.get('codec_name', 'unknown'),
-                    'profile': stream.get('profile', 'unknown'),
-                    'bit_rate': stream.get('bit_rate', '0'),
-                    'fps': eval(stream.get('r_frame_rate', '0/1'))
-                }
+        stream = video_stream(await probe(filepath))
+        
+        if stream:
+            return {
+                'codec': stream.get('codec_name', 'unknown'),
+                'profile': stream.get('profile', 'unknown'),
+                'bit_rate': stream.get('bit_rate', '0'),
+                'fps': eval(stream.get('r_frame_rate', '0/1'))
+            }
         
         return {}
         
     except Exception as e:
         logger.error(f"Codec info error: {e}")
         return {}
+
+
+# 🆕 v11.2 - Transcode-skip decision engine
+TRANSCODE_ACTIONS = {
+    'none': "✅ Already Telegram-ready",
+    'remux': "📦 Remuxing (faststart MP4)",
+    'audio': "🔊 Re-encoding audio only",
+    'transcode': "⚙️ Converting"
+}
+
+STREAMABLE_VIDEO_CODECS = ('h264',)
+STREAMABLE_PIXEL_FORMATS = ('yuv420p', 'yuvj420p')
+STREAMABLE_AUDIO_CODECS = ('aac', 'mp3')
+
+
+def _bitrate_value(rate: str) -> int:
+    """'2500k' -> 2500000"""
+    rate = str(rate).lower()
+    if rate.endswith('k'):
+        return int(float(rate[:-1]) * 1000)
+    if rate.endswith('m'):
+        return int(float(rate[:-1]) * 1000000)
+    return int(float(rate))
+
+
+def _moov_first(filepath: str) -> bool:
+    """True if the MP4 moov atom comes before mdat (plays while downloading)"""
+    try:
+        with open(filepath, 'rb') as f:
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    return False
+                
+                size, kind = struct.unpack('>I4s', header)
+                if kind == b'moov':
+                    return True
+                if kind == b'mdat':
+                    return False
+                
+                if size == 1:
+                    size = struct.unpack('>Q', f.read(8))[0]
+                    f.seek(size - 16, 1)
+                elif size >= 8:
+                    f.seek(size - 8, 1)
+                else:
+                    return False
+    except:
+        return False
+
+
+async def plan_transcode(filepath: str, quality: str) -> Dict:
+    """
+    Pick the cheapest action that makes the file fit the quality and
+    stream in Telegram: none / remux / audio / transcode
+    Never upscales - sources at or below the target keep their resolution
+    Returns {'action', 'reason'}
+    """
+    settings = QUALITY_SETTINGS[quality]
+    target = settings['height']
+    
+    data = await probe(filepath)
+    video = video_stream(data)
+    
+    if not video:
+        return {'action': 'none', 'reason': "no video stream"}
+    
+    width, height = video.get('width', 0), video.get('height', 0)
+    
+    if not SMART_TRANSCODE:
+        # Pre-v11.2 rule
+        if height != target:
+            return {'action': 'transcode', 'reason': f"{height}p != {target}p"}
+        return {'action': 'none', 'reason': f"already {target}p"}
+    
+    # Short side, so 1080x1920 portrait counts as 1080p
+    short_side = min(width, height) or height
+    
+    if short_side > target * (1 + TRANSCODE_HEIGHT_TOLERANCE):
+        return {'action': 'transcode', 'reason': f"{short_side}p > {target}p"}
+    
+    codec = video.get('codec_name', '')
+    pix_fmt = video.get('pix_fmt', '')
+    
+    if codec not in STREAMABLE_VIDEO_CODECS or pix_fmt not in STREAMABLE_PIXEL_FORMATS:
+        return {'action': 'transcode', 'reason': f"{codec}/{pix_fmt} doesn't stream"}
+    
+    try:
+        bitrate = int(video.get('bit_rate') or data['format'].get('bit_rate') or 0)
+    except:
+        bitrate = 0
+    
+    if bitrate > _bitrate_value(settings['bitrate']) * TRANSCODE_BITRATE_HEADROOM:
+        return {'action': 'transcode', 'reason': f"{bitrate // 1000}k > {settings['bitrate']} budget"}
+    
+    audio = next(
+        (s for s in data.get('streams', []) if s.get('codec_type') == 'audio'),
+        None
+    )
+    
+    if audio and audio.get('codec_name') not in STREAMABLE_AUDIO_CODECS:
+        return {'action': 'audio', 'reason': f"{audio.get('codec_name')} audio"}
+    
+    container = data.get('format', {}).get('format_name', '')
+    
+    if 'mp4' not in container or not filepath.lower().endswith('.mp4') or not _moov_first(filepath):
+        return {'action': 'remux', 'reason': f"{container or 'unknown'} container / no faststart"}
+    
+    return {'action': 'none', 'reason': f"h264 {short_side}p ≤ {target}p"}
+
+
+async def remux_video(input_path: str, output_path: str, quality: str, reencode_audio: bool = False) -> bool:
+    """
+    Stream-copy video into a faststart MP4
+    reencode_audio: AAC at the quality's audio bitrate (video still copied)
+    """
+    try:
+        cmd = [
+            'ffmpeg', '-i', input_path,
+            '-map', '0:v:0', '-map', '0:a:0?',
+            '-c:v', 'copy'
+        ]
+        
+        if reencode_audio:
+            cmd += ['-c:a', 'aac', '-b:a', QUALITY_SETTINGS[quality]['audio_bitrate']]
+        else:
+            cmd += ['-c:a', 'copy']
+        
+        cmd += ['-movflags', '+faststart', output_path, '-y']
+        
+        result = await run_process(cmd, timeout=1800)
+        
+        if result.returncode == 0 and os.path.exists(output_path):
+            logger.info(f"✅ {'Audio re-encode' if reencode_audio else 'Remux'} complete: {output_path}")
+            return True
+        
+        logger.error(f"Remux failed: {result.stderr[-500:]}")
+        return False
+        
+    except Exception as e:
+        logger.error(f"Remux error: {e}")
+        return False
+
+
+async def apply_transcode_plan(plan: Dict, input_path: str, output_path: str, quality: str) -> bool:
+    """Run the action plan_transcode picked ('none' has nothing to run)"""
+    if plan['action'] == 'transcode':
+        return await convert_video_quality(input_path, output_path, quality)
+    if plan['action'] in ('remux', 'audio'):
+        return await remux_video(input_path, output_path, quality, plan['action'] == 'audio')
+    return False
+
+
+async def fused_transcode(
+    input_path: str,
+    output_path: str,
+    quality: str,
+    thumb_path: str,
+    watermark_text: str = "",
+    duration: int = 0,
+    max_part_mb: int = SAFE_SPLIT_SIZE
+) -> Optional[Tuple[List[str], bool]]:
+    """
+    🆕 v11.2 - Single-pass post-processing
+    ONE decode of the source feeds a filter graph that produces:
+    - the scaled H.264/AAC faststart encode
+    - the watermarked thumbnail (same frame time as generate_thumbnail_with_text)
+    - size-bounded parts (segment muxer + forced keyframes at the cuts)
+      when the encode would not fit in one Telegram message
+    Parts are named <output>_partNNN_of_MMM.mp4 so find_all_parts picks them up
+    Returns (video paths, thumbnail made) or None
+    """
+    settings = QUALITY_SETTINGS[quality]
+    video_rate = _bitrate_value(settings['bitrate'])
+    audio_rate = _bitrate_value(settings['audio_bitrate'])
+    
+    if duration <= 0:
+        duration = (await get_video_info(input_path))['duration']
+    
+    thumb_time = _thumbnail_time(duration)
+    
+    # -maxrate caps the encode, so its size is predictable up front
+    budget = max_part_mb * 1024 * 1024 * SPLIT_SIZE_MARGIN * FUSED_SIZE_MARGIN
+    expected = duration * (video_rate + audio_rate) / 8
+    num_parts = max(1, math.ceil(expected / budget)) if duration else 1
+    
+    graph = (
+        f"[0:v]{_scale_filter(settings['height'])},split=2[enc][th];"
+        f"[th]trim=start={thumb_time},setpts=PTS-STARTPTS,"
+        f"{_thumbnail_filter(watermark_text)}[thumb]"
+    )
+    
+    if num_parts > 1:
+        segment_time = duration / num_parts
+        name, ext = os.path.splitext(output_path)
+        pattern = f"{name}_part%03d_of_{num_parts:03d}{ext}"
+        outputs = [pattern % i for i in range(1, num_parts + 1)]
+        
+        logger.info(f"🎞️ Fused pass: {num_parts} parts of {segment_time:.1f}s")
+    else:
+        outputs = [output_path]
+        logger.info(f"🎞️ Fused pass: single {quality} output")
+    
+    async with transcode_slot(os.path.getsize(input_path)) as slot:
+        cmd = [
+            'ffmpeg', '-y',
+            '-filter_threads', str(slot.threads),
+            '-i', input_path,
+            '-filter_complex', graph,
+            
+            # Thumbnail branch - one frame, then that output closes
+            '-map', '[thumb]',
+            '-frames:v', '1',
+            '-q:v', str(THUMBNAIL_QUALITY),
+            thumb_path,
+            
+            # Encode branch
+            '-map', '[enc]', '-map', '0:a:0?',
+            '-c:v', 'libx264',
+            '-b:v', settings['bitrate'],
+            '-maxrate', settings['bitrate'],
+            '-bufsize', f"{int(settings['bitrate'][:-1]) * 2}k",
+            '-preset', settings['preset'],
+            '-c:a', 'aac',
+            '-b:a', settings['audio_bitrate'],
+            '-threads', str(slot.threads)
+        ]
+        
+        if num_parts > 1:
+            cmd += [
+                # Keyframe exactly on every cut so parts stay even and self-contained
+                '-force_key_frames', f"expr:gte(t,n_forced*{segment_time:.3f})",
+                '-f', 'segment',
+                '-segment_time', f"{segment_time:.3f}",
+                '-segment_start_number', '1',
+                '-segment_format', 'mp4',
+                '-segment_format_options', 'movflags=+faststart',
+                '-reset_timestamps', '1',
+                pattern
+            ]
+        else:
+            cmd += ['-movflags', '+faststart', output_path]
+        
+        try:
+            result = await run_process(slot.prefix + cmd, timeout=3600)  # 1 hour max
+            ok = result.returncode == 0
+            if not ok:
+                logger.error(f"Fused pass failed: {result.stderr[-500:]}")
+        except ProcessTimeout:
+            logger.error("Fused pass timeout")
+            ok = False
+    
+    # The segment muxer decides the final count - trust the disk, not the estimate
+    produced = [p for p in outputs if os.path.exists(p)]
+    if num_parts > 1:
+        extra = num_parts + 1
+        while os.path.exists(pattern % extra):
+            produced.append(pattern % extra)
+            extra += 1
+    
+    if not ok or not produced:
+        for path in produced + [thumb_path]:
+            try:
+                os.remove(path)
+            except:
+                pass
+        return None
+    
+    has_thumb = os.path.exists(thumb_path) and os.path.getsize(thumb_path) > 2048
+    
+    logger.info(
+        f"✅ Fused pass complete: {len(produced)} file(s), "
+        f"{sum(os.path.getsize(p) for p in produced) / (1024 * 1024):.1f}MB, "
+        f"thumbnail {'✓' if has_thumb else '✗'}"
+    )
+    return produced, has_thumb